@@ -3,33 +3,75 @@ import asyncio
 import time
 import json
 
-from datetime import datetime, date
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from typing import List, Optional
-from sqlalchemy import select
+from datetime import date
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import Response
 
-from backend.app.core.database import get_db
+from backend.app.core.config import settings
+from backend.app.core.database import get_db, AsyncSessionLocal
+from backend.app.core.resources import resource_governor
 from backend.app.schemas.schemas import (
     ProductCreate, ProductResponse, OCRResult, 
-    SaveProductResponse, BatchResponse
+    SaveProductResponse, BatchResponse, ScanJobResponse
 )
 from backend.app.models.models import Product, ProductBatch, OCRLog
-from backend.app.services import (
-    ocr_service,
-    image_service,
-    normalizer_service,
-    deduplicator_service,
-    ai_extractor_service,
-    voice_service,
-    vector_service
-    
-)
+from backend.app.services import services, OCRBusyError, JobQueueFullError
+from backend.app.services.job_service import ScanJob
+from backend.app.services.image_service import ImageTooLargeError
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/inventory", tags=["Inventory"])
 
+# Campo multipart → vista del producto
+# Lote de los escaneos sin número de lote legible
+NO_BATCH_NUMBER = "SIN-LOTE"
+
+PHOTO_FIELDS = {
+    "photo_0": "front",
+    "photo_1": "left",
+    "photo_2": "right",
+}
+
+
+def _collect_uploads(
+    photo_0: Optional[UploadFile],
+    photo_1: Optional[UploadFile],
+    photo_2: Optional[UploadFile]
+) -> Tuple[List[UploadFile], List[str]]:
+    """Empareja cada foto recibida con su vista (front/left/right)"""
+    files = []
+    image_types = []
+    
+    if photo_0:
+        files.append(photo_0)
+        image_types.append("front")
+    if photo_1:
+        files.append(photo_1)
+        image_types.append("left")
+    if photo_2:
+        files.append(photo_2)
+        image_types.append("right")
+    
+    return files, image_types
+
+
+def _require_ocr_service():
+    """
+    503 si el OCR no se pudo inicializar (p.ej. modelos ausentes): el
+    servicio es None y el escaneo no puede continuar.
+    """
+    if services.ocr_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail="El servicio de OCR no está disponible",
+            headers={"Retry-After": str(settings.OCR_RETRY_AFTER)}
+        )
+
+
 @router.post("/from-images", response_model=OCRResult)
 async def process_images_from_camera(
     photo_0: Optional[UploadFile] = File(None),
@@ -39,258 +81,612 @@ async def process_images_from_camera(
 ):
     try:
         logger.info("📸 Iniciando procesamiento...")
-        start_total = time.time()
         
-        files = []
-        image_types = []
-        
-        if photo_0:
-            files.append(photo_0)
-            image_types.append("front")
-        if photo_1:
-            files.append(photo_1)
-            image_types.append("left")
-        if photo_2:
-            files.append(photo_2)
-            image_types.append("right")
+        files, image_types = _collect_uploads(photo_0, photo_1, photo_2)
         if not files:
             raise HTTPException(status_code=400, detail="No se recibieron imágenes")
         
-        # Guardar imágenes
-        logger.info("💾 Guardando imágenes...")
-        start = time.time()
-        saved_images = await image_service.save_multiple_images_async(files, image_types)
-        logger.info(f"⏱️ Guardado: {time.time()-start:.2f}s")
+        # Backpressure: rechazar rápido si el OCR ya está saturado
+        if not services.ocr_executor.has_capacity():
+            raise OCRBusyError(services.ocr_executor.retry_after)
         
-        logger.info("🔍 Ejecutando OCR...")
+        # Leer imágenes a memoria (el guardado a disco corre en segundo plano)
+        logger.info("💾 Recibiendo imágenes...")
+        timings = {}
         start = time.time()
-        ocr_data = ocr_service.extract_from_multiple_images(saved_images)
-        logger.info(f"⏱️ OCR: {time.time()-start:.2f}s")
+        image_buffers, saved_images, images_hash = await services.image_service.receive_uploads(files, image_types)
+        timings["read"] = time.time() - start
+        logger.info(f"⏱️ Lectura: {timings['read']:.2f}s")
         
-        # 🔍 DEBUG - Ver estructura OCR
-        logger.debug(f"OCR Data: {json.dumps(ocr_data, indent=2, ensure_ascii=False)[:500]}")
+        result = await _run_scan_once(
+            images_hash, saved_images, db, timings,
+            image_buffers=image_buffers
+        )
+        return OCRResult(**result)
+
+        # ============================================================================
+        # MANEJO DE ERRORES GLOBAL
+        # ============================================================================
+    except OCRBusyError as e:
+        logger.warning(f"🚦 Escaneo rechazado: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="El servicio de OCR está ocupado, intente nuevamente",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error crítico en procesamiento: {e}", exc_info=True)
+        await db.rollback()
+            
+        # Proporcionar error más descriptivo al usuario
+        error_detail = str(e)
+        if "unique constraint" in error_detail.lower():
+            error_detail = "El producto ya existe en el sistema"
+        elif "foreign key" in error_detail.lower():
+            error_detail = "Error de relación en base de datos"
+            
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al procesar el producto: {error_detail}"
+        )
+
+
+# ============================================================================
+# INGESTA EN STREAMING: OCR MIENTRAS SUBEN LAS FOTOS
+# ============================================================================
+@router.post("/from-images/stream", response_model=OCRResult)
+async def process_images_streaming(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Mismo contrato que /from-images (multipart photo_0..photo_2), pero el body
+    se parsea a medida que llega: cada foto se decodifica en memoria y entra
+    al OCR apenas termina de subir, mientras las siguientes siguen llegando.
+    El guardado en disco corre como rama aparte.
+    
+    Latencia ≈ max(subida, OCR) en lugar de subida + OCR.
+    """
+    ocr_tasks: Dict[str, asyncio.Task] = {}
+    ocr_slot = None
+    
+    try:
+        logger.info("📸 Iniciando procesamiento en streaming...")
         
+        _require_ocr_service()
+        # Un solo turno por escaneo (cola acotada → 503); las vistas corren dentro
+        ocr_slot = services.ocr_executor.admit()
         
-        # EXTRACCIÓN MULTIPLE
-        # Opción 1: Usar Gemini (si falla → Mock)
-        # Opción 2: Usar Llama (si falla → Mock)
-        logger.info("🤖 Extrayendo información con IA...")
-        logger.info(
-            f"[AI] ▶ Iniciando extracción async | strategy=llama "
-            f"| ocr_conf={ocr_data.get('overall_confidence', 'N/A')}"
-        )
+        timings = {}
+        saved_images = {}
+        image_buffers = {}
+        image_hashes = {}
         start = time.time()
-        product_info = await asyncio.to_thread(
-            ai_extractor_service.extract_product_info,
-            ocr_data,
-            strategy = 'llama' ,
-        )
-        elapsed = time.time() - start
-        logger.info(
-            f"[AI] ✅ Extracción completada | strategy=llama "
-            f"| tiempo_total={elapsed:.3f}s "
-            f"| completeness={product_info.get('_completeness', 'N/A')}"
-        )   
         
-        logger.info(f"⏱️ IA Extracción: {time.time()-start:.2f}s")
+        try:
+            async for field, filename, data, digest in services.image_service.iter_multipart_images(
+                request.stream(),
+                request.headers.get("content-type", ""),
+                max_part_size=settings.STREAM_MAX_IMAGE_BYTES
+            ):
+                img_type = PHOTO_FIELDS.get(field)
+                if not img_type or not data or img_type in ocr_tasks:
+                    continue
+                
+                # OCR desde memoria, dentro del turno ya admitido del escaneo
+                ocr_tasks[img_type] = asyncio.create_task(
+                    ocr_slot.run(services.ocr_service.extract_from_buffer, img_type, data)
+                )
+                # Disco como rama lateral
+                saved_images[img_type] = services.image_service.schedule_write(img_type, data, filename)
+                image_buffers[img_type] = data
+                image_hashes[img_type] = digest
+                logger.info(
+                    f"📥 {img_type} recibida ({len(data)} bytes) en "
+                    f"{time.time() - start:.2f}s → OCR iniciado"
+                )
+        except ImageTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        timings["upload"] = time.time() - start
         
-        # 🔍 DEBUG - Ver producto extraído
-        logger.debug(f"Product Info: {json.dumps(product_info, indent=2, ensure_ascii=False)[:500]}")
+        if not ocr_tasks:
+            raise HTTPException(status_code=400, detail="No se recibieron imágenes")
+        # El turno se libera al terminar el OCR, no al final del pipeline (IA, BD)
+        asyncio.gather(*ocr_tasks.values(), return_exceptions=True).add_done_callback(
+            lambda _: ocr_slot.release()
+        )
         
-        # 4️⃣ BUSCAR DUPLICADOS
-        logger.info("🔍 Buscando duplicados...")
-        duplicates = []
+        result = await _run_scan_once(
+            services.image_service.image_set_hash(image_hashes),
+            saved_images,
+            db,
+            timings,
+            ocr_tasks=ocr_tasks,
+            image_buffers=image_buffers
+        )
+        return OCRResult(**result)
+    
+    except OCRBusyError as e:
+        logger.warning(f"🚦 Escaneo rechazado: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="El servicio de OCR está ocupado, intente nuevamente",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error crítico en procesamiento: {e}", exc_info=True)
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al procesar el producto: {e}"
+        )
+    finally:
+        # Escaneo repetido o error: no dejar OCR pendiente
+        for task in ocr_tasks.values():
+            task.cancel()
+        await asyncio.gather(*ocr_tasks.values(), return_exceptions=True)
+        if ocr_slot:
+            ocr_slot.release()
 
-        if any([
-            product_info.get("barcode"),
-            product_info.get("name"),
-            product_info.get("brand")
-        ]):
-            duplicates = await deduplicator_service.find_similar_products(
-                db=db,
-                name=product_info.get("name", ""),
-                brand=product_info.get("brand", ""),
-                barcode=product_info.get("barcode"),
-                size=product_info.get("size", "")
-            )
 
-        # 5️⃣ DETERMINAR SI ES DUPLICADO REAL
-        is_duplicate = False
-        best_match = None
+# ============================================================================
+# MODO ASÍNCRONO: ENCOLAR Y CONSULTAR
+# ============================================================================
+@router.post("/from-images/jobs", response_model=ScanJobResponse, status_code=202)
+async def submit_images_job(
+    photo_0: Optional[UploadFile] = File(None),
+    photo_1: Optional[UploadFile] = File(None),
+    photo_2: Optional[UploadFile] = File(None)
+):
+    """
+    Guarda las fotos y encola el pipeline OCR → IA → duplicados → BD.
+    Retorna el job_id de inmediato; el resultado se consulta en /jobs/{job_id}.
+    """
+    files, image_types = _collect_uploads(photo_0, photo_1, photo_2)
+    if not files:
+        raise HTTPException(status_code=400, detail="No se recibieron imágenes")
+    
+    # Rechazar antes de tocar el disco si la cola ya está llena
+    if not services.job_service.has_capacity():
+        raise HTTPException(
+            status_code=503,
+            detail="Cola de escaneo llena, intente nuevamente",
+            headers={"Retry-After": "5"}
+        )
+    
+    start = time.time()
+    image_buffers, saved_images, images_hash = await services.image_service.receive_uploads(files, image_types)
+    read_time = time.time() - start
+    
+    # Mismas fotos ya procesadas → resultado guardado, sin encolar
+    cached = services.idempotency_service.cached(images_hash)
+    if cached:
+        services.image_service.discard(saved_images)
+        # El trabajo original (si aún se conserva) o uno nuevo ya terminado:
+        # el job_id devuelto siempre se puede consultar en /jobs/{job_id}
+        job = services.job_service.get(cached["job_id"]) if cached["job_id"] else None
+        if job is None or job.status != "done":
+            job = services.job_service.record_done(cached["result"])
+        return _job_response(job)
+    
+    # Mismas fotos en un trabajo aún en curso → devolver ese trabajo
+    pending = services.idempotency_service.inflight(images_hash)
+    existing_job = services.job_service.get(pending["job_id"]) if pending and pending["job_id"] else None
+    if existing_job:
+        services.image_service.discard(saved_images)
+        return _job_response(existing_job)
+    
+    try:
+        job = services.job_service.submit({
+            "image_buffers": image_buffers,
+            "saved_images": saved_images,
+            "images_hash": images_hash,
+            "read_time": read_time,
+            # Si ya hay un escaneo síncrono idéntico en curso, el worker lo espera
+            "registered": pending is None
+        })
+    except JobQueueFullError as e:
+        services.image_service.discard(saved_images)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    if pending is None:
+        services.idempotency_service.start(images_hash, job_id=job.id)
+    
+    return _job_response(job)
 
-        if duplicates:
-            best_match = duplicates[0]
-            similarity = best_match.get("similarity", 0)
-            match_type = best_match.get("match_type", "")
-            
-            # ✅ CRITERIOS DE DUPLICADO (más flexibles):
-            # - Similarity >= 0.75 (75%) - umbral rebajado
-            # - Match type debe indicar que es el mismo producto
-            
-            if similarity >= 0.75:
-                # Tipos que SÍ son duplicados
-                if match_type in ["barcode", "name_brand_size", "name_brand_no_size"]:
-                    is_duplicate = True
-                    logger.info(
-                        f"🔄 DUPLICADO detectado: {best_match['name']} | "
-                        f"Similarity: {similarity*100:.1f}% | Type: {match_type}"
-                    )
-                
-                # Tipo que NO es duplicado (diferente presentación)
-                elif match_type == "related_product":
-                    logger.info(
-                        f"ℹ️ Producto RELACIONADO (no duplicado): {best_match['name']} | "
-                        f"Probablemente diferente presentación/tamaño"
-                    )
-                    is_duplicate = False
-            else:
-                logger.info(f"ℹ️ Similitud baja ({similarity*100:.1f}%), no es duplicado")
-
-        # 6️⃣ SI ES DUPLICADO → GESTIONAR LOTES
-        if is_duplicate and best_match:
-            existing_id = best_match["id"]
-            
-            # Obtener producto existente
-            stmt = select(Product).where(Product.id == existing_id)
-            result = await db.execute(stmt)
-            existing_product = result.scalar_one()
-            
-            # ============================================
-            # GESTIÓN DE LOTES
-            # ============================================
-            batch_number = product_info.get("batch")
-            
-            # Si no hay número de lote, generar uno temporal
-            if not batch_number:
-                batch_number = f"AUTO-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                logger.warning(f"⚠️ No hay número de lote, usando: {batch_number}")
-            
-            # Buscar si ya existe este lote
-            stmt_batch = select(ProductBatch).where(
-                ProductBatch.product_id == existing_product.id,
-                ProductBatch.batch_number == batch_number
+
+@router.get("/jobs/stats")
+async def get_jobs_stats():
+    """Profundidad de cola y tiempos promedio por etapa (para dimensionar el pool)"""
+    return {
+        **services.job_service.stats(),
+        "resources": resource_governor.allocation(),
+        "ocr_executor": services.ocr_executor.stats(),
+        "ocr_memory": services.ocr_service.memory_budget.stats() if services.ocr_service else None,
+        "ocr_pool": services.ocr_service.pool.stats() if services.ocr_service and services.ocr_service.pool else None,
+        "ocr_batching": services.ocr_service.batcher.stats() if services.ocr_service and services.ocr_service.batcher else None,
+        "ocr_progressive": services.ocr_service.progressive_stats() if services.ocr_service else None,
+        "ocr_cache": services.ocr_service.cache.stats() if services.ocr_service and services.ocr_service.cache else None,
+        "llm_cache": services.extraction_cache.stats() if services.extraction_cache else None,
+        "llm": services.peek("llama_client").stats() if services.peek("llama_client") else None,
+        "llm_compaction": services.peek("text_compactor").stats() if services.peek("text_compactor") else None,
+        "llm_hybrid": services.peek("ai_extractor_service").hybrid_stats() if services.peek("ai_extractor_service") else None,
+        "idempotency": services.idempotency_service.stats()
+    }
+
+
+@router.get("/jobs/{job_id}", response_model=ScanJobResponse)
+async def get_job_status(job_id: str):
+    job = services.job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    
+    return _job_response(job)
+
+
+def _job_response(job: ScanJob) -> ScanJobResponse:
+    data = job.to_dict()
+    return ScanJobResponse(
+        job_id=data["job_id"],
+        status=data["status"],
+        timings=data["timings"],
+        result=data["result"],
+        error=data["error"],
+        queue_depth=services.job_service.stats()["queue_depth"]
+    )
+
+
+async def process_scan_job(job: ScanJob) -> Dict:
+    """Handler del JobService: ejecuta el pipeline con su propia sesión de BD"""
+    job.timings["read"] = job.payload["read_time"]
+    
+    async with AsyncSessionLocal() as db:
+        try:
+            return await _run_scan_once(
+                job.payload["images_hash"],
+                job.payload["saved_images"],
+                db,
+                job.timings,
+                wait_for_ocr=True,  # la cola de trabajos ya aplica backpressure
+                registered=job.payload["registered"],
+                image_buffers=job.payload["image_buffers"]
             )
-            
-            result_batch = await db.execute(stmt_batch)
-            existing_batch = result_batch.scalar_one_or_none()
-            
-            if existing_batch:
-                # 🔁 LOTE EXISTENTE: Incrementar stock
-                existing_batch.stock_quantity += 1
-                await db.commit()
-                await db.refresh(existing_batch)
-                batch = existing_batch
+        except Exception:
+            await db.rollback()
+            raise
+
+
+async def _run_scan_once(
+    images_hash: str,
+    saved_images: Dict[str, str],
+    db: AsyncSession,
+    timings: Dict[str, float],
+    wait_for_ocr: bool = False,
+    registered: bool = False,
+    ocr_tasks: Optional[Dict[str, asyncio.Task]] = None,
+    image_buffers: Optional[Dict[str, bytes]] = None
+) -> Dict:
+    """
+    Ejecuta el pipeline una sola vez por conjunto de imágenes.
+    
+    - Resultado reciente con el mismo hash → se reutiliza
+    - Mismo hash en curso → se espera ese resultado; si ese escaneo se
+      cancela, esta petición lo vuelve a intentar (o espera a otra que ya
+      lo retomó)
+    - registered=True → el llamador ya registró el escaneo como en curso
+    """
+    while not registered:
+        cached = services.idempotency_service.cached(images_hash)
+        if cached:
+            services.image_service.discard(saved_images)
+            return cached["result"]
+        
+        pending = services.idempotency_service.inflight(images_hash)
+        if pending:
+            outcome = await asyncio.shield(pending["future"])
+            if outcome is services.idempotency_service.RETRY:
+                continue
+            services.image_service.discard(saved_images)
+            return outcome
+        
+        services.idempotency_service.start(images_hash)
+        break
+    
+    try:
+        result = await _run_scan_pipeline(
+            saved_images, db, timings,
+            wait_for_ocr=wait_for_ocr,
+            ocr_tasks=ocr_tasks,
+            image_buffers=image_buffers
+        )
+    except BaseException as e:
+        services.idempotency_service.finish(images_hash, error=e)
+        raise
+    
+    result = result.model_dump()
+    services.idempotency_service.finish(images_hash, result=result)
+    return result
+
+
+# ============================================================================
+# PIPELINE: OCR → IA → DUPLICADOS → PERSISTENCIA
+# ============================================================================
+async def _run_scan_pipeline(
+    saved_images: Dict[str, str],
+    db: AsyncSession,
+    timings: Dict[str, float],
+    wait_for_ocr: bool = False,
+    ocr_tasks: Optional[Dict[str, asyncio.Task]] = None,
+    image_buffers: Optional[Dict[str, bytes]] = None
+) -> OCRResult:
+    """
+    Ejecuta el pipeline completo sobre las imágenes de un escaneo.
+    Registra la duración de cada etapa en `timings`.
+    
+    Args:
+        saved_images: Rutas en disco (pueden estar escribiéndose aún)
+        ocr_tasks: OCR por vista ya lanzado (ingesta en streaming)
+        image_buffers: Bytes de cada vista; el OCR decodifica desde memoria
+                       en lugar de releer el archivo
+    
+    Raises:
+        OCRBusyError: Si el executor de OCR está lleno y wait_for_ocr=False
+    """
+    start_total = time.time()
+    
+    # 0️⃣ CÓDIGO DE BARRAS: producto conocido → sin OCR ni IA
+    if image_buffers and settings.BARCODE_FAST_PATH:
+        known_product = await _barcode_fast_path(
+            image_buffers, db, timings,
+            wait_for_ocr=wait_for_ocr or bool(ocr_tasks)
+        )
+        if known_product:
+            logger.info(f"⚡ Escaneo resuelto por código de barras | {time.time() - start_total:.3f}s")
+            return known_product
+    
+    _require_ocr_service()
+    logger.info("🔍 Ejecutando OCR...")
+    start = time.time()
+    if ocr_tasks:
+        # Solo se espera la parte del OCR que no se solapó con la subida
+        results = dict(await asyncio.gather(*ocr_tasks.values()))
+        ocr_data = services.ocr_service.combine_results(results, start)
+    elif image_buffers and settings.OCR_PROGRESSIVE:
+        # Frontal primero; laterales solo si faltan campos
+        ocr_data = await services.ocr_executor.run(
+            services.ocr_service.extract_progressive,
+            image_buffers,
+            _front_view_is_enough,
+            wait=wait_for_ocr
+        )
+    elif image_buffers:
+        ocr_data = await services.ocr_executor.run(
+            services.ocr_service.extract_from_multiple_buffers,
+            image_buffers,
+            wait=wait_for_ocr
+        )
+    else:
+        ocr_data = await services.ocr_executor.run(
+            services.ocr_service.extract_from_multiple_images,
+            saved_images,
+            wait=wait_for_ocr
+        )
+    timings["ocr"] = time.time() - start
+    logger.info(f"⏱️ OCR: {timings['ocr']:.2f}s")
+    
+    # 🔍 DEBUG - Ver estructura OCR
+    logger.debug(f"OCR Data: {json.dumps(ocr_data, indent=2, ensure_ascii=False)[:500]}")
+    
+    
+    # EXTRACCIÓN MULTIPLE
+    # Opción 1: Usar Gemini (si falla → Mock)
+    # Opción 2: Usar Llama (si falla → Mock)
+    # Opción 3: Híbrida, regex primero (Llama solo para los campos que falten)
+    logger.info("🤖 Extrayendo información con IA...")
+    logger.info(
+        f"[AI] ▶ Iniciando extracción async | strategy={settings.LLM_STRATEGY} "
+        f"| ocr_conf={ocr_data.get('overall_confidence', 'N/A')}"
+    )
+    start = time.time()
+    # Llama directo a Ollama por httpx async: no ocupa un hilo mientras genera
+    # (hybrid: regex primero, Llama solo para los campos requeridos que falten)
+    product_info = await services.ai_extractor_service.aextract_product_info(
+        ocr_data,
+        strategy=settings.LLM_STRATEGY,
+        timings=timings,
+    )
+    elapsed = time.time() - start
+    timings["ai"] = elapsed
+    logger.info(
+        f"[AI] ✅ Extracción completada | strategy={settings.LLM_STRATEGY} "
+        f"| tiempo_total={elapsed:.3f}s "
+        f"| completeness={product_info.get('_completeness', 'N/A')}"
+    )   
+    
+    logger.info(f"⏱️ IA Extracción: {time.time()-start:.2f}s")
+    
+    # 🔍 DEBUG - Ver producto extraído
+    logger.debug(f"Product Info: {json.dumps(product_info, indent=2, ensure_ascii=False)[:500]}")
+    
+    # 4️⃣ BUSCAR DUPLICADOS
+    logger.info("🔍 Buscando duplicados...")
+    start = time.time()
+    duplicates = []
+
+    if any([
+        product_info.get("barcode"),
+        product_info.get("name"),
+        product_info.get("brand")
+    ]):
+        duplicates = await services.deduplicator_service.find_similar_products(
+            db=db,
+            name=product_info.get("name", ""),
+            brand=product_info.get("brand", ""),
+            barcode=product_info.get("barcode"),
+            size=product_info.get("size", "")
+        )
+
+    # 5️⃣ DETERMINAR SI ES DUPLICADO REAL
+    is_duplicate = False
+    best_match = None
+
+    if duplicates:
+        best_match = duplicates[0]
+        similarity = best_match.get("similarity", 0)
+        match_type = best_match.get("match_type", "")
+        
+        # ✅ CRITERIOS DE DUPLICADO (más flexibles):
+        # - Similarity >= 0.75 (75%) - umbral rebajado
+        # - Match type debe indicar que es el mismo producto
+        
+        if similarity >= 0.75:
+            # Tipos que SÍ son duplicados
+            if match_type in ["barcode", "name_brand_size", "name_brand_no_size"]:
+                is_duplicate = True
                 logger.info(
-                    f"📦 Stock incrementado | Lote: {batch_number} | "
-                    f"Nuevo stock: {batch.stock_quantity}"
+                    f"🔄 DUPLICADO detectado: {best_match['name']} | "
+                    f"Similarity: {similarity*100:.1f}% | Type: {match_type}"
                 )
-            else:
-                # 🆕 NUEVO LOTE: Crear registro
-                batch = ProductBatch(
-                    product_id=existing_product.id,
-                    batch_number=batch_number,
-                    expiry_date=product_info.get("expiry_date"),
-                    manufacturing_date=product_info.get("manufacturing_date"),
-                    price=product_info.get("price"),
-                    stock_quantity=1
-                )
-                db.add(batch)
-                await db.commit()
-                await db.refresh(batch)
-                logger.info(f"🆕 Nuevo lote creado: {batch_number}")
             
-            # ============================================
-            # RETORNAR PRODUCTO EXISTENTE
-            # ============================================
-            return OCRResult(
-                confidence=ocr_data["overall_confidence"],
-                product={
-                    "id": existing_product.id,
-                    "name": existing_product.name,
-                    "brand": existing_product.brand,
-                    "presentation": existing_product.presentation,
-                    "size": existing_product.size,
-                    "barcode": existing_product.barcode,
-                    "category": existing_product.category,
-                    "image_front": existing_product.image_front,
-                    "image_left": existing_product.image_left,
-                    "image_right": existing_product.image_right,
-                    # 👇 Datos del LOTE ACTUAL
-                    "batch": batch.batch_number,
-                    "expiry_date": str(batch.expiry_date) if batch.expiry_date else None,
-                    "manufacturing_date": str(batch.manufacturing_date) if batch.manufacturing_date else None,
-                    "price": float(batch.price) if batch.price else None,
-                    "stock_quantity": batch.stock_quantity,
-                    
-                    
-                    
-                },
-                ocr_raw={
-                    "front": ocr_data["images"].get("front", {}).get("text", ""),
-                    "left": ocr_data["images"].get("left", {}).get("text", ""),
-                    "right": ocr_data["images"].get("right", {}).get("text", "")
-                },
-                missing_fields=[],
-                duplicates=duplicates,
-                is_duplicate=True
-            )
+            # Tipo que NO es duplicado (diferente presentación)
+            elif match_type == "related_product":
+                logger.info(
+                    f"ℹ️ Producto RELACIONADO (no duplicado): {best_match['name']} | "
+                    f"Probablemente diferente presentación/tamaño"
+                )
+                is_duplicate = False
+        else:
+            logger.info(f"ℹ️ Similitud baja ({similarity*100:.1f}%), no es duplicado")
 
-        # 7️⃣ SI NO ES DUPLICADO → Continuar con creación de producto nuevo...
-        
-        # ============================================================================
-        # 7️⃣ SI NO ES DUPLICADO → CREAR PRODUCTO NUEVO
-        # ============================================================================
+    timings["dedup"] = time.time() - start
+    start_persist = time.time()
 
-        logger.info("🆕 Creando producto nuevo...")
-
-        # ────────────────────────────────────────────────────────────────────────
-        # 7.1 - AGREGAR RUTAS DE IMÁGENES
-        # ────────────────────────────────────────────────────────────────────────
-        product_info["image_front"] = saved_images.get("front")
-        product_info["image_left"] = saved_images.get("left")
-        product_info["image_right"] = saved_images.get("right")
-
-        # Verificar que al menos tengamos una imagen
-        if not any(saved_images.values()):
-            logger.error("❌ No se guardaron imágenes del producto")
-            raise HTTPException(
-                status_code=400,
-                detail="Error al procesar las imágenes. Por favor, intente nuevamente."
-            )
+    # Las rutas se guardan en BD: asegurar que los archivos ya estén escritos
+    await services.image_service.wait_written(saved_images)
 
-        # ────────────────────────────────────────────────────────────────────────
-        # 7.2 - VALIDAR CAMPOS OBLIGATORIOS
-        # ────────────────────────────────────────────────────────────────────────
-        required_fields = ["name", "brand", "size"]
-        missing_required = [
-            field for field in required_fields
-            if not product_info.get(field)
-        ]
-
-        if missing_required:
-            logger.warning(f"⚠️ Campos obligatorios faltantes: {missing_required}")
-
-        # GARANTIZAR campo NAME (crítico)
-        if not product_info.get("name"):
-            logger.error("❌ No se pudo extraer el nombre del producto")
-            raise HTTPException(
-                status_code=400,
-                detail="No se pudo identificar el producto. Por favor, tome fotos más claras del producto."
+    # 6️⃣ SI ES DUPLICADO → GESTIONAR LOTES
+    if is_duplicate and best_match:
+        # El deduplicador ya cargó el producto: no se vuelve a consultar
+        existing_product = best_match
+        
+        # ============================================
+        # GESTIÓN DE LOTES (upsert atómico)
+        # ============================================
+        batch_number = _resolve_batch_number(product_info)
+        
+        batch = await _upsert_batch(db, existing_product["id"], batch_number, product_info)
+        await db.commit()
+        
+        if batch.inserted:
+            logger.info(f"🆕 Nuevo lote creado: {batch_number}")
+        else:
+            logger.info(
+                f"📦 Stock incrementado | Lote: {batch_number} | "
+                f"Nuevo stock: {batch.stock_quantity}"
             )
+        
+        timings["persist"] = time.time() - start_persist
+        
+        # ============================================
+        # RETORNAR PRODUCTO EXISTENTE
+        # ============================================
+        return _existing_product_result(
+            existing_product,
+            batch,
+            confidence=ocr_data["overall_confidence"],
+            ocr_raw={
+                "front": ocr_data["images"].get("front", {}).get("text", ""),
+                "left": ocr_data["images"].get("left", {}).get("text", ""),
+                "right": ocr_data["images"].get("right", {}).get("text", "")
+            },
+            duplicates=duplicates
+        )
 
-        # GARANTIZAR campos NOT NULL con valores por defecto
-        if not product_info.get("brand"):
-            product_info["brand"] = "Sin Marca"
-            logger.warning("⚠️ Marca no detectada, usando 'Sin Marca'")
+    # 7️⃣ SI NO ES DUPLICADO → Continuar con creación de producto nuevo...
+    
+    # ============================================================================
+    # 7️⃣ SI NO ES DUPLICADO → CREAR PRODUCTO NUEVO
+    # ============================================================================
+
+    logger.info("🆕 Creando producto nuevo...")
 
-        if not product_info.get("size"):
-            product_info["size"] = "N/A"
-            logger.warning("⚠️ Tamaño no detectado, usando 'N/A'")
+    # ────────────────────────────────────────────────────────────────────────
+    # 7.1 - AGREGAR RUTAS DE IMÁGENES
+    # ────────────────────────────────────────────────────────────────────────
+    product_info["image_front"] = saved_images.get("front")
+    product_info["image_left"] = saved_images.get("left")
+    product_info["image_right"] = saved_images.get("right")
 
-        # ────────────────────────────────────────────────────────────────────────
-        # 7.3 - CREAR REGISTRO DE PRODUCTO
-        # ────────────────────────────────────────────────────────────────────────
-        new_product = Product(
+    # Verificar que al menos tengamos una imagen
+    if not any(saved_images.values()):
+        logger.error("❌ No se guardaron imágenes del producto")
+        raise HTTPException(
+            status_code=400,
+            detail="Error al procesar las imágenes. Por favor, intente nuevamente."
+        )
+
+    # ────────────────────────────────────────────────────────────────────────
+    # 7.2 - VALIDAR CAMPOS OBLIGATORIOS
+    # ────────────────────────────────────────────────────────────────────────
+    required_fields = ["name", "brand", "size"]
+    missing_required = [
+        field for field in required_fields
+        if not product_info.get(field)
+    ]
+
+    if missing_required:
+        logger.warning(f"⚠️ Campos obligatorios faltantes: {missing_required}")
+
+    # GARANTIZAR campo NAME (crítico)
+    if not product_info.get("name"):
+        logger.error("❌ No se pudo extraer el nombre del producto")
+        raise HTTPException(
+            status_code=400,
+            detail="No se pudo identificar el producto. Por favor, tome fotos más claras del producto."
+        )
+
+    # GARANTIZAR campos NOT NULL con valores por defecto
+    if not product_info.get("brand"):
+        product_info["brand"] = "Sin Marca"
+        logger.warning("⚠️ Marca no detectada, usando 'Sin Marca'")
+
+    if not product_info.get("size"):
+        product_info["size"] = "N/A"
+        logger.warning("⚠️ Tamaño no detectado, usando 'N/A'")
+
+    # ────────────────────────────────────────────────────────────────────────
+    # 7.3 - DETECTAR TODOS LOS CAMPOS FALTANTES (para reporte)
+    # ────────────────────────────────────────────────────────────────────────
+    all_fields = [
+        "name", "brand", "size", "category", "presentation",
+        "barcode", "batch", "expiry_date", "price"
+    ]
+
+    missing_all_fields = [
+        field for field in all_fields
+        if not product_info.get(field) or product_info.get(field) in ["N/A", "Sin Marca"]
+    ]
+
+    if missing_all_fields:
+        logger.info(f"ℹ️ Campos sin detectar: {missing_all_fields}")
+
+    batch_number = _resolve_batch_number(product_info)
+
+    # ────────────────────────────────────────────────────────────────────────
+    # 7.4 - UNA SOLA TRANSACCIÓN: PRODUCTO + LOTE + LOG DE OCR
+    # ────────────────────────────────────────────────────────────────────────
+    product_stmt = (
+        pg_insert(Product)
+        .values(
             name=product_info.get("name"),
             brand=product_info.get("brand"),
             presentation=product_info.get("presentation"),
@@ -301,171 +697,331 @@ async def process_images_from_camera(
             image_left=product_info.get("image_left"),
             image_right=product_info.get("image_right"),
         )
+        .returning(
+            Product.id, Product.name, Product.brand, Product.presentation,
+            Product.size, Product.category, Product.barcode,
+            Product.image_front, Product.image_left, Product.image_right
+        )
+    )
+    new_product = (await db.execute(product_stmt)).one()
 
-        db.add(new_product)
-        await db.commit()
-        await db.refresh(new_product)
+    new_batch = await _upsert_batch(db, new_product.id, batch_number, product_info)
 
-        logger.info(f"✅ Producto creado con ID: {new_product.id}")
+    formatted_ocr = json.dumps(ocr_data, indent=2, ensure_ascii=False)
+    await db.execute(
+        pg_insert(OCRLog).values(
+            image_path=",".join(saved_images.values()),
+            raw_text=formatted_ocr,  # JSON formateado para debugging
+            confidence=ocr_data["overall_confidence"],
+            ocr_engine=ocr_data.get("engine") or services.ocr_service.engine
+        )
+    )
 
-        # ────────────────────────────────────────────────────────────────────────
-        # 7.4 - GUARDAR EMBEDDING VECTORIAL (para búsqueda semántica)
-        # ────────────────────────────────────────────────────────────────────────
-        try:
-            embedding_text = " ".join(
-                filter(None, [
-                    new_product.name,
-                    new_product.brand,
-                    new_product.size,
-                    new_product.presentation,
-                    new_product.category
-                ])
-            )
-            
-            vector_service.add_product(
-                product_id=new_product.id,
-                embedding_text=embedding_text
-            )
-            logger.info("✅ Embedding guardado correctamente")
-            
-        except Exception as e:
-            logger.warning(f"⚠️ No se pudo guardar embedding: {e}")
-            # No es crítico, continuamos
+    await db.commit()
+    timings["persist"] = time.time() - start_persist
 
-        # ────────────────────────────────────────────────────────────────────────
-        # 7.5 - CREAR PRIMER LOTE DEL PRODUCTO
-        # ────────────────────────────────────────────────────────────────────────
-        batch_number = product_info.get("batch")
+    logger.info(
+        f"✅ Producto creado con ID: {new_product.id} | "
+        f"Lote: {batch_number} | Stock: {new_batch.stock_quantity} | Log de OCR guardado"
+    )
 
-        # Si no hay número de lote, generar uno automático
-        if not batch_number:
-            batch_number = f"AUTO-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            logger.warning(f"⚠️ Lote no detectado, generando automático: {batch_number}")
+    # ────────────────────────────────────────────────────────────────────────
+    # 7.5 - VALIDAR FECHA DE VENCIMIENTO (alerta si está vencido)
+    # ────────────────────────────────────────────────────────────────────────
+    if new_batch.expiry_date:
+        if new_batch.expiry_date < date.today():
+            logger.warning(
+                f"⚠️ PRODUCTO VENCIDO | "
+                f"Vencimiento: {new_batch.expiry_date} | "
+                f"Producto: {new_product.name}"
+            )
 
-        new_batch = ProductBatch(
+    # ────────────────────────────────────────────────────────────────────────
+    # 8️⃣ GUARDAR EMBEDDING VECTORIAL (para búsqueda semántica)
+    # ────────────────────────────────────────────────────────────────────────
+    try:
+        embedding_text = " ".join(
+            filter(None, [
+                new_product.name,
+                new_product.brand,
+                new_product.size,
+                new_product.presentation,
+                new_product.category
+            ])
+        )
+        
+        services.vector_service.add_product(
             product_id=new_product.id,
-            batch_number=batch_number,
-            expiry_date=product_info.get("expiry_date"),
-            manufacturing_date=product_info.get("manufacturing_date"),
-            price=product_info.get("price"),
-            stock_quantity=1  # Stock inicial
+            embedding_text=embedding_text
         )
+        logger.info("✅ Embedding guardado correctamente")
+        
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo guardar embedding: {e}")
+        # No es crítico, continuamos
 
-        db.add(new_batch)
-        await db.commit()
-        await db.refresh(new_batch)
-
-        logger.info(f"✅ Lote creado: {batch_number} | Stock: 1")
-
-        # ────────────────────────────────────────────────────────────────────────
-        # 7.6 - VALIDAR FECHA DE VENCIMIENTO (alerta si está vencido)
-        # ────────────────────────────────────────────────────────────────────────
-        if new_batch.expiry_date:
-            if new_batch.expiry_date < date.today():
-                logger.warning(
-                    f"⚠️ PRODUCTO VENCIDO | "
-                    f"Vencimiento: {new_batch.expiry_date} | "
-                    f"Producto: {new_product.name}"
-                )
-
-        # ────────────────────────────────────────────────────────────────────────
-        # 7.7 - DETECTAR TODOS LOS CAMPOS FALTANTES (para reporte)
-        # ────────────────────────────────────────────────────────────────────────
-        all_fields = [
-            "name", "brand", "size", "category", "presentation",
-            "barcode", "batch", "expiry_date", "price"
-        ]
+    # ────────────────────────────────────────────────────────────────────────
+    # 9️⃣ MÉTRICAS FINALES Y RESPUESTA
+    # ────────────────────────────────────────────────────────────────────────
+    total_time = time.time() - start_total
 
-        missing_all_fields = [
-            field for field in all_fields
-            if not product_info.get(field) or product_info.get(field) in ["N/A", "Sin Marca"]
-        ]
+    logger.info(
+        f"✅ PROCESAMIENTO COMPLETO | Tiempo: {total_time:.2f}s\n"
+        f"   📦 Producto: {new_product.name}\n"
+        f"   🏷️  Marca: {new_product.brand}\n"
+        f"   📏 Tamaño: {new_product.size}\n"
+        f"   🔖 Categoría: {new_product.category or 'N/A'}\n"
+        f"   📊 Confianza OCR: {ocr_data['overall_confidence'] * 100:.2f}%\n"
+        f"   🔍 Duplicados encontrados: {len(duplicates)}\n"
+        f"   ⚠️  Campos faltantes: {len(missing_all_fields)}"
+    )
 
-        if missing_all_fields:
-            logger.info(f"ℹ️ Campos sin detectar: {missing_all_fields}")
+    return OCRResult(
+        confidence=ocr_data["overall_confidence"],
+        product={
+            "id": new_product.id,
+            "name": new_product.name,
+            "brand": new_product.brand,
+            "presentation": new_product.presentation,
+            "size": new_product.size,
+            "category": new_product.category,
+            "barcode": new_product.barcode,
+            # Datos del lote
+            "batch": new_batch.batch_number,
+            "expiry_date": str(new_batch.expiry_date) if new_batch.expiry_date else None,
+            "manufacturing_date": str(new_batch.manufacturing_date) if new_batch.manufacturing_date else None,
+            "price": float(new_batch.price) if new_batch.price else None,
+            "stock_quantity": new_batch.stock_quantity,
+            # Imágenes
+            "image_front": new_product.image_front,
+            "image_left": new_product.image_left,
+            "image_right": new_product.image_right,
+        },
+        ocr_raw={
+            "front": ocr_data["images"].get("front", {}).get("text", ""),
+            "left": ocr_data["images"].get("left", {}).get("text", ""),
+            "right": ocr_data["images"].get("right", {}).get("text", "")
+        },
+        missing_fields=missing_all_fields,
+        duplicates=duplicates,
+        is_duplicate=False
+    )
 
-        # ────────────────────────────────────────────────────────────────────────
-        # 8️⃣ GUARDAR LOG DE OCR
-        # ────────────────────────────────────────────────────────────────────────
-        formatted_ocr = json.dumps(ocr_data, indent=2, ensure_ascii=False)
 
-        ocr_log = OCRLog(
-            image_path=",".join(saved_images.values()),
-            raw_text=formatted_ocr,  # JSON formateado para debugging
-            confidence=ocr_data["overall_confidence"],
-            ocr_engine=ocr_service.engine
+async def _barcode_fast_path(
+    image_buffers: Dict[str, bytes],
+    db: AsyncSession,
+    timings: Dict[str, float],
+    wait_for_ocr: bool = False
+) -> Optional[OCRResult]:
+    """
+    Lee EAN/UPC antes del OCR. Si coincide con un producto activo que tiene
+    un único lote abierto, le suma una unidad y retorna sin OCR ni
+    extracción con IA. Con varios lotes abiertos (o ninguno) la unidad
+    puede ser de otro lote: se sigue con el OCR, que lee lote y vencimiento.
+    
+    Returns:
+        OCRResult del producto existente, o None para seguir con el OCR
+    """
+    start = time.time()
+    barcode = await services.ocr_executor.run(services.barcode_service.detect, image_buffers, wait=wait_for_ocr)
+    match = None
+    if barcode:
+        match = await services.deduplicator_service.find_by_barcode(db, services.barcode_service.variants(barcode))
+    timings["barcode"] = time.time() - start
+    
+    if not match:
+        return None
+    
+    start = time.time()
+    # Sin OCR no hay número de lote: solo es seguro con un único lote abierto
+    batch = await _increment_open_batch(db, match["id"])
+    if batch is None:
+        await db.rollback()
+        logger.info(
+            f"ℹ️ Código de barras conocido ({match['name']}) sin un único lote abierto, "
+            f"se sigue con OCR para leer lote y vencimiento"
         )
+        return None
+    await db.commit()
+    timings["persist"] = time.time() - start
+    
+    logger.info(
+        f"📦 Stock incrementado por código de barras | {match['name']} | "
+        f"Lote: {batch.batch_number} | Nuevo stock: {batch.stock_quantity}"
+    )
+    
+    return _existing_product_result(
+        match,
+        batch,
+        confidence=1.0,
+        ocr_raw={"front": "", "left": "", "right": ""},
+        duplicates=[match]
+    )
 
-        db.add(ocr_log)
-        await db.commit()
 
-        logger.info("✅ Log de OCR guardado")
+def _front_view_is_enough(text: str, confidence: float) -> bool:
+    """Chequeo del modo progresivo: confianza suficiente y campos clave por regex"""
+    if confidence < settings.OCR_PROGRESSIVE_MIN_CONFIDENCE:
+        return False
+    missing = services.ai_extractor_service.missing_fields(text, settings.OCR_PROGRESSIVE_FIELDS)
+    if missing:
+        logger.info(f"ℹ️ Vista frontal incompleta, faltan: {missing}")
+    return not missing
 
-        # ────────────────────────────────────────────────────────────────────────
-        # 9️⃣ MÉTRICAS FINALES Y RESPUESTA
-        # ────────────────────────────────────────────────────────────────────────
-        total_time = time.time() - start_total
 
-        logger.info(
-            f"✅ PROCESAMIENTO COMPLETO | Tiempo: {total_time:.2f}s\n"
-            f"   📦 Producto: {new_product.name}\n"
-            f"   🏷️  Marca: {new_product.brand}\n"
-            f"   📏 Tamaño: {new_product.size}\n"
-            f"   🔖 Categoría: {new_product.category or 'N/A'}\n"
-            f"   📊 Confianza OCR: {ocr_data['overall_confidence'] * 100:.2f}%\n"
-            f"   🔍 Duplicados encontrados: {len(duplicates)}\n"
-            f"   ⚠️  Campos faltantes: {len(missing_all_fields)}"
-        )
+def _existing_product_result(
+    existing_product: Dict,
+    batch,
+    confidence: float,
+    ocr_raw: Dict[str, str],
+    duplicates: List[Dict]
+) -> OCRResult:
+    """Respuesta para un producto ya registrado con los datos del lote actual"""
+    return OCRResult(
+        confidence=confidence,
+        product={
+            "id": existing_product["id"],
+            "name": existing_product["name"],
+            "brand": existing_product["brand"],
+            "presentation": existing_product.get("presentation"),
+            "size": existing_product["size"],
+            "barcode": existing_product["barcode"],
+            "category": existing_product.get("category"),
+            "image_front": existing_product.get("image_front"),
+            "image_left": existing_product.get("image_left"),
+            "image_right": existing_product.get("image_right"),
+            # 👇 Datos del LOTE ACTUAL
+            "batch": batch.batch_number,
+            "expiry_date": str(batch.expiry_date) if batch.expiry_date else None,
+            "manufacturing_date": str(batch.manufacturing_date) if batch.manufacturing_date else None,
+            "price": float(batch.price) if batch.price else None,
+            "stock_quantity": batch.stock_quantity,
+        },
+        ocr_raw=ocr_raw,
+        missing_fields=[],
+        duplicates=duplicates,
+        is_duplicate=True
+    )
 
-        return OCRResult(
-            confidence=ocr_data["overall_confidence"],
-            product={
-                "id": new_product.id,
-                "name": new_product.name,
-                "brand": new_product.brand,
-                "presentation": new_product.presentation,
-                "size": new_product.size,
-                "category": new_product.category,
-                "barcode": new_product.barcode,
-                # Datos del lote
-                "batch": new_batch.batch_number,
-                "expiry_date": str(new_batch.expiry_date) if new_batch.expiry_date else None,
-                "manufacturing_date": str(new_batch.manufacturing_date) if new_batch.manufacturing_date else None,
-                "price": float(new_batch.price) if new_batch.price else None,
-                "stock_quantity": new_batch.stock_quantity,
-                # Imágenes
-                "image_front": new_product.image_front,
-                "image_left": new_product.image_left,
-                "image_right": new_product.image_right,
-            },
-            ocr_raw={
-                "front": ocr_data["images"].get("front", {}).get("text", ""),
-                "left": ocr_data["images"].get("left", {}).get("text", ""),
-                "right": ocr_data["images"].get("right", {}).get("text", "")
-            },
-            missing_fields=missing_all_fields,
-            duplicates=duplicates,
-            is_duplicate=False
-        )
 
-        # ============================================================================
-        # MANEJO DE ERRORES GLOBAL
-        # ============================================================================
-    except Exception as e:
-        logger.error(f"❌ Error crítico en procesamiento: {e}", exc_info=True)
-        await db.rollback()
-            
-        # Proporcionar error más descriptivo al usuario
-        error_detail = str(e)
-        if "unique constraint" in error_detail.lower():
-            error_detail = "El producto ya existe en el sistema"
-        elif "foreign key" in error_detail.lower():
-            error_detail = "Error de relación en base de datos"
-            
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error al procesar el producto: {error_detail}"
+def _as_date(value) -> Optional[date]:
+    """Convierte 'YYYY-MM-DD' (salida de la IA) a date; None si no es válido"""
+    if not value or isinstance(value, date):
+        return value or None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        logger.warning(f"⚠️ Fecha inválida ignorada: {value}")
+        return None
+
+
+def _resolve_batch_number(product_info: Dict) -> str:
+    """
+    Número de lote del escaneo. Sin lote detectado se usa uno estable
+    (SIN-LOTE, o SIN-LOTE-<vencimiento> si se leyó la fecha): con NULL o
+    un valor por timestamp el ON CONFLICT nunca coincide y cada escaneo
+    crearía un lote nuevo en lugar de sumar stock.
+    """
+    batch_number = str(product_info.get("batch") or "").strip()
+    if batch_number:
+        return batch_number
+
+    expiry = _as_date(product_info.get("expiry_date"))
+    batch_number = f"{NO_BATCH_NUMBER}-{expiry:%Y%m%d}" if expiry else NO_BATCH_NUMBER
+    logger.warning(f"⚠️ Lote no detectado, usando: {batch_number}")
+    return batch_number
+
+
+def _batch_upsert_statement(product_id: int, batch_number: Optional[str], product_info: Dict):
+    """INSERT ... ON CONFLICT (product_id, batch_number) DO UPDATE stock + 1 ... RETURNING"""
+    stmt = pg_insert(ProductBatch).values(
+        product_id=product_id,
+        # NULL nunca choca en ON CONFLICT
+        batch_number=batch_number or NO_BATCH_NUMBER,
+        expiry_date=_as_date(product_info.get("expiry_date")),
+        manufacturing_date=_as_date(product_info.get("manufacturing_date")),
+        price=product_info.get("price"),
+        stock_quantity=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProductBatch.product_id, ProductBatch.batch_number],
+        set_={
+            "stock_quantity": ProductBatch.stock_quantity + 1,
+            "updated_at": func.now()
+        }
+    ).returning(
+        ProductBatch.id,
+        ProductBatch.batch_number,
+        ProductBatch.expiry_date,
+        ProductBatch.manufacturing_date,
+        ProductBatch.price,
+        ProductBatch.stock_quantity,
+        # xmax = 0 solo en filas recién insertadas
+        literal_column("(xmax = 0)").label("inserted")
+    )
+    return stmt
+
+
+async def _upsert_batch(db: AsyncSession, product_id: int, batch_number: Optional[str], product_info: Dict):
+    """
+    INSERT ... ON CONFLICT (product_id, batch_number) DO UPDATE stock + 1.
+    
+    El incremento lo hace PostgreSQL, así que escaneos concurrentes del mismo
+    lote no pierden unidades. No hace commit: forma parte de la transacción
+    del escaneo. Requiere la restricción uq_product_batch (ver
+    core/database.py: apply_schema_upgrades).
+    
+    Returns:
+        Row con los datos del lote y `inserted` (True si el lote es nuevo)
+    """
+    result = await db.execute(_batch_upsert_statement(product_id, batch_number, product_info))
+    return result.one()
+
+
+def _open_batch_increment_statement(product_id: int):
+    """
+    UPDATE stock + 1 del único lote abierto (stock > 0) del producto.
+    Con cero o varios lotes abiertos no toca ninguna fila: sin OCR no se
+    sabe de qué lote es la unidad.
+    """
+    open_batches = (
+        select(func.count())
+        .select_from(ProductBatch)
+        .where(ProductBatch.product_id == product_id, ProductBatch.stock_quantity > 0)
+        .scalar_subquery()
+    )
+    return (
+        update(ProductBatch)
+        .where(
+            ProductBatch.product_id == product_id,
+            ProductBatch.stock_quantity > 0,
+            open_batches == 1
+        )
+        .values(
+            stock_quantity=ProductBatch.stock_quantity + 1,
+            updated_at=func.now()
+        )
+        .returning(
+            ProductBatch.id,
+            ProductBatch.batch_number,
+            ProductBatch.expiry_date,
+            ProductBatch.manufacturing_date,
+            ProductBatch.price,
+            ProductBatch.stock_quantity
         )
+    )
+
+
+async def _increment_open_batch(db: AsyncSession, product_id: int):
+    """
+    Suma una unidad al lote abierto del producto si es el único. No hace commit.
+    
+    Returns:
+        Row con los datos del lote, o None si no hay exactamente un lote abierto
+    """
+    result = await db.execute(_open_batch_increment_statement(product_id))
+    return result.one_or_none()
 
 
 @router.post("/save", response_model=SaveProductResponse)
@@ -491,7 +1047,7 @@ async def save_product(
 
         # 🆕 Si no existe → crear nuevo
         else:
-            normalized_value, normalized_unit = normalizer_service.normalize_size(
+            normalized_value, normalized_unit = services.normalizer_service.normalize_size(
                 product_data.size
             )
 
@@ -584,7 +1140,7 @@ async def voice_confirmation(data: dict):
     
     text = f"Producto {product_name} registrado correctamente en el inventario"
     
-    audio = voice_service.generate_audio(text)
+    audio = services.voice_service.generate_audio(text)
     
     if audio:
         return Response(
@@ -1,3 +1,4 @@
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,6 +7,110 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str
     ELEVENLABS_API_KEY: str  
     VOICE_ID_API_KEY:str
+
+    # Trabajos asíncronos de escaneo (/inventory/from-images/jobs)
+    SCAN_JOB_WORKERS: int = 2          # Workers que ejecutan el pipeline en paralelo
+    SCAN_JOB_QUEUE_SIZE: int = 20      # Trabajos en espera antes de rechazar (503)
+    SCAN_JOB_RETENTION: int = 200      # Trabajos terminados que se conservan para consulta
+
+    # Servicios precalentados en el arranque (el resto se crea al primer uso)
+    SERVICES_WARMUP: List[str] = ["ocr_pool", "ocr_service", "ai_extractor_service", "vector_service"]
+
+    # Extracción con IA del endpoint de escaneo
+    LLM_STRATEGY: str = "llama"           # "llama" | "hybrid" (regex primero) | "gemini" | "openai" | "mock"
+    LLM_HYBRID_REQUIRED_FIELDS: List[str] = ["name", "brand", "size"]  # Si el regex no los saca → Llama solo para ellos
+
+    # Llama/Ollama
+    LLM_STRUCTURED_OUTPUT: bool = True    # JSON schema del producto en "format" (Ollama >= 0.5)
+    LLM_STREAMING: bool = True            # Parser incremental (tiempo hasta cada campo)
+    LLM_STREAM_STOP_FIELDS: List[str] = []  # Cortar antes si estos campos ya tienen valor
+
+    # Compactación del texto OCR antes del prompt (duplicados entre vistas, ruido, presupuesto)
+    LLM_COMPACTION: bool = True
+    LLM_PROMPT_TOKEN_BUDGET: int = 600         # Tokens máximos de texto OCR en el prompt
+    LLM_MIN_LINE_CONFIDENCE: float = 0.3       # Líneas por debajo se descartan (salvo EAN, tamaño, fecha...)
+    LLM_TOKEN_ENCODING: str = "cl100k_base"    # tiktoken (offline: BPE en TIKTOKEN_CACHE_DIR)
+
+    # Caché de extracciones del LLM (texto OCR normalizado + estrategia + versión de prompt)
+    LLM_CACHE: bool = True
+    LLM_CACHE_PATH: str = "cache/llm/extractions.sqlite3"  # Nivel en disco, compartido entre workers
+    LLM_CACHE_MEMORY_ENTRIES: int = 256        # LRU en memoria por proceso
+    LLM_CACHE_MEMORY_TTL: int = 3600           # Segundos en memoria
+    LLM_CACHE_DISK_TTL: int = 30 * 24 * 3600   # Segundos en disco
+    LLM_CACHE_DISK_MAX_ENTRIES: int = 20000
+
+    # Reparto de CPU (ver core/resources.py)
+    CPU_CORES: int = 0                 # 0 = automático (afinidad y cuota del contenedor)
+    CPU_RESERVED_CORES: int = 0        # Núcleos que no usa la app (p.ej. Ollama en la misma máquina)
+    IO_THREADS: int = 4                # Escrituras de imágenes a disco
+    LLM_THREADS: int = 0               # Llamadas al LLM en paralelo; 0 = una por escaneo en OCR
+
+    # Executor de OCR (EasyOCR fuera del event loop)
+    OCR_MAX_CONCURRENCY: int = 0       # Escaneos con OCR en ejecución simultánea; 0 = según núcleos
+    OCR_MAX_QUEUE: int = 4             # Escaneos en espera antes de responder 503
+    OCR_RETRY_AFTER: int = 5           # Segundos sugeridos en el header Retry-After
+
+    # Idempotencia por contenido (mismas fotos reenviadas)
+    SCAN_DEDUP_TTL: int = 600          # Segundos que se reutiliza un resultado
+    SCAN_DEDUP_MAX_ENTRIES: int = 500  # Resultados guardados en memoria
+
+    # Ingesta en streaming (/inventory/from-images/stream)
+    STREAM_MAX_IMAGE_BYTES: int = 20 * 1024 * 1024  # Tamaño máximo por foto
+
+    # Decodificación y memoria de imágenes en OCR
+    OCR_BLUR_THRESHOLD: float = 100.0  # Varianza mínima del Laplaciano (sobre miniatura)
+    OCR_BLUR_THUMBNAIL_DIM: int = 512  # Lado mayor de la miniatura del blur check
+    OCR_IMAGE_MEMORY_MB: int = 256     # Presupuesto por proceso para imágenes en vuelo
+
+    # Pool de procesos de OCR (un Reader de EasyOCR por proceso)
+    OCR_PROCESS_POOL: bool = True      # False → un solo Reader compartido por hilos
+    OCR_PROCESSES: int = 0             # 0 = automático (presupuesto de núcleos / 2)
+    OCR_POOL_START_METHOD: str = "spawn"  # spawn es seguro con torch; fork arranca más rápido
+
+    # Lotes de OCR (readtext_batched entre vistas y escaneos concurrentes)
+    OCR_BATCHING: bool = True          # False → una llamada a readtext por imagen
+    OCR_BATCH_MAX_IMAGES: int = 6      # Imágenes máximas por lote (2 escaneos de 3 vistas)
+    OCR_BATCH_WINDOW_MS: int = 30      # Espera máxima para completar un lote
+
+    # Código de barras antes del OCR (productos ya registrados)
+    # Opcional: sin OCR no se lee el lote; solo aplica si el producto tiene un único lote abierto
+    BARCODE_FAST_PATH: bool = False    # EAN/UPC conocido → solo se actualiza el stock
+
+    # OCR progresivo (frontal primero, laterales solo si faltan datos)
+    # Opcional hasta medirlo: si la frontal no basta, son dos rondas de OCR en vez de una
+    OCR_PROGRESSIVE: bool = False
+    OCR_PROGRESSIVE_MIN_CONFIDENCE: float = 0.6  # Confianza mínima de la vista frontal
+    OCR_PROGRESSIVE_FIELDS: List[str] = ["name", "brand", "size", "barcode"]  # Lote y vencimiento casi nunca van al frente
+
+    # Escalera de resolución (pasada gruesa + relectura de regiones dudosas)
+    OCR_COARSE_TO_FINE: bool = True
+    OCR_COARSE_DIM: int = 960          # Lado mayor de la pasada gruesa
+    OCR_REFINE_CONFIDENCE: float = 0.5 # Regiones por debajo se releen a 1600px
+
+    # Perfiles de preprocesamiento/EasyOCR (ver services/ocr/ocr_profiles.py)
+    OCR_DEFAULT_PROFILE: str = "grayscale"   # Más detecciones que CLAHE y Otsu en el notebook 02 (ver ocr_profiles.py)
+    OCR_VIEW_PROFILES: Dict[str, str] = {}   # p.ej. {"left": "small_print", "right": "small_print"}
+
+    # Caché de OCR por hash perceptual (fotos repetidas del mismo producto)
+    OCR_CACHE: bool = True
+    OCR_CACHE_DIR: str = "cache/ocr"   # Un JSON por resultado
+    OCR_CACHE_MAX_MB: int = 64         # Tope en disco; se desaloja LRU
+    OCR_CACHE_MAX_DISTANCE: int = 4    # Bits distintos (de 64) aceptados como la misma foto
+    OCR_CACHE_VIEWS: List[str] = ["front"]  # Las laterales llevan lote/vencimiento: el pHash no los distingue
+
+    # Motor rápido antes de EasyOCR ("" = solo EasyOCR, "tesseract")
+    OCR_FAST_ENGINE: str = ""
+    OCR_FAST_ENGINE_MIN_CONFIDENCE: float = 0.75  # Por debajo, la vista se relee con EasyOCR
+
+    # Almacén local de modelos de EasyOCR, sin descargas en el arranque (opcional)
+    # (empaquetar con: python -m backend.app.services.ocr.model_store models/easyocr
+    #  y activar con OCR_MODEL_DIR=models/easyocr; "" = carga normal de EasyOCR)
+    OCR_MODEL_DIR: str = ""
+    OCR_MODEL_MMAP: bool = True          # pesos mapeados desde disco, compartidos entre procesos
+
+    # EasyOCR sobre ONNX Runtime int8 (exportar con: python -m backend.app.services.ocr.onnx_backend)
+    OCR_ONNX: bool = False
+    OCR_ONNX_DIR: str = "models/onnx"
     
     class Config:
         env_file = ".env"
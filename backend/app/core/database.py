@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from typing import AsyncGenerator
@@ -20,6 +22,54 @@ AsyncSessionLocal = sessionmaker(
 
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
+
+# 🔹 Cambios de esquema que create_all no aplica a tablas ya existentes.
+# Idempotentes: se ejecutan en cada arranque, después de create_all
+SCHEMA_UPGRADES = [
+    (
+        "uq_product_batch",
+        # Lotes repetidos de versiones anteriores: se suman en el de menor id
+        # (la restricción no se puede crear mientras existan duplicados)
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_product_batch') THEN
+                UPDATE product_batches AS keep
+                SET stock_quantity = dup.total
+                FROM (
+                    SELECT MIN(id) AS id, SUM(COALESCE(stock_quantity, 0)) AS total
+                    FROM product_batches
+                    WHERE batch_number IS NOT NULL
+                    GROUP BY product_id, batch_number
+                    HAVING COUNT(*) > 1
+                ) AS dup
+                WHERE keep.id = dup.id;
+
+                DELETE FROM product_batches AS extra
+                USING product_batches AS keep
+                WHERE extra.product_id = keep.product_id
+                  AND extra.batch_number = keep.batch_number
+                  AND extra.id > keep.id;
+
+                ALTER TABLE product_batches
+                    ADD CONSTRAINT uq_product_batch UNIQUE (product_id, batch_number);
+            END IF;
+        END
+        $$;
+        """,
+    ),
+]
+
+
+def apply_schema_upgrades():
+    """Aplica SCHEMA_UPGRADES con el engine sync (una transacción por cambio)"""
+    for name, statement in SCHEMA_UPGRADES:
+        with engine.begin() as conn:
+            conn.execute(text(statement))
+        logger.info(f"✅ Esquema al día: {name}")
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
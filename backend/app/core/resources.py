@@ -0,0 +1,157 @@
+import logging
+import math
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def available_cores() -> int:
+    """
+    Núcleos asignados a este proceso.
+
+    Respeta taskset/cpuset (sched_getaffinity) y la cuota de CPU del
+    contenedor (cgroup v2 cpu.max), que os.cpu_count() ignora.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cores = min(cores, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+class ResourceGovernor:
+    """
+    Reparto único de núcleos entre todo lo que compite por CPU.
+
+    Sin reparto, cada pieza se dimensiona sola: torch y OpenCV usan un
+    hilo por núcleo en cada proceso, cada escaneo abre su propio pool de
+    hilos para las vistas y asyncio.to_thread usa el executor por defecto
+    (núcleos + 4). Con varios escaneos a la vez eso son varias veces más
+    hilos activos que núcleos.
+
+    - budget: núcleos del proceso menos los reservados (p.ej. para Ollama)
+    - OCR con pool: ocr_processes procesos x ocr_threads hilos (torch + cv2)
+    - OCR sin pool: ocr_concurrency escaneos x ocr_threads hilos
+    - El proceso principal solo decodifica/lee códigos: cv2 a 1 hilo si
+      el OCR pesado corre en el pool
+    - Executors compartidos (vistas, E/S, LLM) en lugar de uno por llamada
+    """
+
+    VIEWS_PER_SCAN = 3
+
+    def __init__(
+        self,
+        cores: int = 0,
+        reserved_cores: int = 0,
+        process_pool: bool = True,
+        ocr_processes: int = 0,
+        ocr_concurrency: int = 0,
+        io_threads: int = 4,
+        llm_threads: int = 0
+    ):
+        self.cores = cores or available_cores()
+        self.budget = max(1, self.cores - reserved_cores)
+        self.process_pool = process_pool
+
+        if process_pool:
+            self.ocr_processes = ocr_processes or max(1, self.budget // 2)
+            self.ocr_threads = max(1, self.budget // self.ocr_processes)
+            # Un escaneo en OCR por proceso: más solo esperaría en cola
+            self.ocr_concurrency = ocr_concurrency or self.ocr_processes
+            self.main_threads = 1
+        else:
+            self.ocr_processes = 0
+            self.ocr_concurrency = ocr_concurrency or max(1, self.budget // 4)
+            self.ocr_threads = max(1, self.budget // self.ocr_concurrency)
+            self.main_threads = self.ocr_threads
+
+        self.view_threads = self.ocr_concurrency * self.VIEWS_PER_SCAN
+        self.io_threads = io_threads
+        # Las llamadas al LLM esperan red; basta una por escaneo en curso
+        self.llm_threads = llm_threads or max(2, self.ocr_concurrency)
+
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def apply(self):
+        """Fija hilos de torch y OpenCV en el proceso actual"""
+        import cv2
+
+        cv2.setNumThreads(self.main_threads)
+        try:
+            import torch
+            torch.set_num_threads(self.main_threads)
+        except ImportError:
+            pass
+        logger.info(
+            f"⚙️ Recursos | núcleos={self.cores} | presupuesto={self.budget} | "
+            f"ocr_procesos={self.ocr_processes} x {self.ocr_threads} hilos | "
+            f"ocr_concurrencia={self.ocr_concurrency} | hilos_principal={self.main_threads}"
+        )
+
+    def executor(self, name: str) -> ThreadPoolExecutor:
+        """
+        Executor compartido por nombre: "views", "io" o "llm".
+
+        Raises:
+            ValueError: Si el nombre no corresponde a ningún executor
+        """
+        sizes = {"views": self.view_threads, "io": self.io_threads, "llm": self.llm_threads}
+        if name not in sizes:
+            raise ValueError(f"Executor desconocido: '{name}'")
+
+        with self._lock:
+            executor = self._executors.get(name)
+            if executor is None:
+                executor = self._executors[name] = ThreadPoolExecutor(
+                    max_workers=sizes[name],
+                    thread_name_prefix=name
+                )
+            return executor
+
+    def allocation(self) -> Dict:
+        return {
+            "cores": self.cores,
+            "budget": self.budget,
+            "process_pool": self.process_pool,
+            "ocr_processes": self.ocr_processes,
+            "ocr_threads": self.ocr_threads,
+            "ocr_concurrency": self.ocr_concurrency,
+            "main_threads": self.main_threads,
+            "executors": {
+                "views": self.view_threads,
+                "io": self.io_threads,
+                "llm": self.llm_threads,
+            },
+        }
+
+    def shutdown(self):
+        with self._lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._executors.clear()
+
+
+resource_governor = ResourceGovernor(
+    cores=settings.CPU_CORES,
+    reserved_cores=settings.CPU_RESERVED_CORES,
+    process_pool=settings.OCR_PROCESS_POOL,
+    ocr_processes=settings.OCR_PROCESSES,
+    ocr_concurrency=settings.OCR_MAX_CONCURRENCY,
+    io_threads=settings.IO_THREADS,
+    llm_threads=settings.LLM_THREADS
+)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from backend.app.core.database import Base
@@ -32,6 +32,10 @@ class Product(Base):
 
 class ProductBatch(Base):
     __tablename__ = "product_batches"
+    __table_args__ = (
+        # Requerido por el upsert de stock (ON CONFLICT)
+        UniqueConstraint("product_id", "batch_number", name="uq_product_batch"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
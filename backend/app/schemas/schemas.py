@@ -70,6 +70,17 @@ class OCRResult(BaseModel):
     class Config:
         from_attributes = True
 
+# ========================================
+# SCAN JOB SCHEMAS
+# ========================================
+class ScanJobResponse(BaseModel):
+    job_id: str
+    status: str  # queued | running | done | failed
+    timings: Dict[str, float] = Field(default_factory=dict)
+    result: Optional[OCRResult] = None
+    error: Optional[str] = None
+    queue_depth: Optional[int] = None
+
 # ========================================
 # SAVE PRODUCT RESPONSE
 # ========================================
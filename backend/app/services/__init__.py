@@ -1,23 +1,107 @@
+from backend.app.core.config import settings
+from backend.app.core.resources import resource_governor
+
+from .registry import ServiceRegistry
 from .image_service import ImageService
 from .deduplicator_service import DeduplicatorService
+from .job_service import JobService, JobQueueFullError
+from .idempotency_service import IdempotencyService
+
+from .ocr import (
+    OCRBusyError,
+    NormalizerService,
+    BarcodeService,
+    create_image_memory_budget,
+    create_ocr_cache,
+    create_model_store,
+    create_ocr_pool,
+    create_ocr_service,
+    create_ocr_executor,
+)
+
+
+# Clientes de IA, chromadb y ElevenLabs son pesados de importar:
+# el import ocurre al crear el servicio, no al importar el paquete
+def _llama_client():
+    from .ai import create_llama_client
+    return create_llama_client()
+
+
+def _extraction_cache():
+    from .ai.extraction_cache import create_extraction_cache
+    return create_extraction_cache()
+
+
+def _text_compactor():
+    from .ai.text_compactor import create_text_compactor
+    return create_text_compactor()
+
+
+def _ai_extractor_service():
+    from .ai import AIExtractorService
+    return AIExtractorService(
+        llama_client=services.llama_client,
+        cache=services.extraction_cache,
+        executor=resource_governor.executor("llm"),
+        compactor=services.text_compactor,
+        required_fields=settings.LLM_HYBRID_REQUIRED_FIELDS
+    )
+
+
+def _vector_service():
+    from .vector_service import VectorService
+    return VectorService()
+
+
+def _voice_service():
+    from .voice.voice_service import VoiceService
+    return VoiceService()
+
+
+# ========================================
+# REGISTRO DE SERVICIOS (creación perezosa, una vez por proceso)
+# ========================================
+services = ServiceRegistry()
+
+services.register("image_service", lambda: ImageService(executor=resource_governor.executor("io")))
+services.register("deduplicator_service", DeduplicatorService)
+services.register("job_service", lambda: JobService(
+    max_workers=settings.SCAN_JOB_WORKERS,
+    max_queue=settings.SCAN_JOB_QUEUE_SIZE,
+    retention=settings.SCAN_JOB_RETENTION
+))
+services.register("idempotency_service", lambda: IdempotencyService(
+    ttl=settings.SCAN_DEDUP_TTL,
+    max_entries=settings.SCAN_DEDUP_MAX_ENTRIES
+))
 
-from .ocr import ocr_service, normalizer_service
-from .ai import ai_extractor_service
-from .voice.voice_service import VoiceService
-from .vector_service import VectorService
+# OCR
+services.register("image_memory_budget", create_image_memory_budget)
+services.register("ocr_cache", create_ocr_cache)
+# Precalentar el pool arranca sus procesos y carga un Reader en cada uno
+services.register("model_store", create_model_store)
+services.register("ocr_pool", lambda: create_ocr_pool(services.model_store), warmup=lambda pool: pool.start())
+services.register("ocr_service", lambda: create_ocr_service(
+    services.ocr_pool,
+    services.image_memory_budget,
+    services.ocr_cache,
+    services.model_store
+))
+services.register("ocr_executor", create_ocr_executor)
+services.register("normalizer_service", NormalizerService)
+services.register("barcode_service", BarcodeService)
 
-image_service = ImageService()
-deduplicator_service = DeduplicatorService()
-voice_service = VoiceService()
-vector_service = VectorService()
+# IA y servicios externos
+services.register("llama_client", _llama_client)
+services.register("extraction_cache", _extraction_cache)
+services.register("text_compactor", _text_compactor)
+services.register("ai_extractor_service", _ai_extractor_service)
+services.register("vector_service", _vector_service)
+services.register("voice_service", _voice_service)
 
 __all__ = [
-    "ocr_service",
-    "normalizer_service",
-    "ai_extractor_service",
-    "image_service",
-    "deduplicator_service",
-    "voice_service",
-    "vector_service",
-    
-]
\ No newline at end of file
+    "services",
+    "ServiceRegistry",
+    "OCRBusyError",
+    "JobQueueFullError",
+]
@@ -1,16 +1,14 @@
-import logging
-
 from .ai_extractor_service import AIExtractorService
-from .llama_client import LlamaClient
-
-logger = logging.getLogger(__name__)
-
-llama_client = LlamaClient()
-ai_extractor_service = AIExtractorService()
-
-logger.info("✅ AI services inicializados")
+from .llama_client import LlamaClient, create_llama_client
+from .extraction_cache import ExtractionCache, create_extraction_cache
+from .text_compactor import OCRTextCompactor, create_text_compactor
 
 __all__ = [
-    "llama_client",
-    "ai_extractor_service"
+    "AIExtractorService",
+    "LlamaClient",
+    "create_llama_client",
+    "ExtractionCache",
+    "create_extraction_cache",
+    "OCRTextCompactor",
+    "create_text_compactor"
 ]
\ No newline at end of file
@@ -1,9 +1,11 @@
+import asyncio
+import functools
 import logging
 import json
 import re
 import time
 
-from typing import Dict, Union
+from typing import Dict, List, Optional, Tuple, Union
 from google import genai
 from backend.app.core.config import settings
 from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
@@ -20,12 +22,6 @@ logging.basicConfig(
 # IMPORTAR CLIENTES OPCIONALES
 # ========================================
 
-try:
-    from .llama_client import llama_client
-except ImportError:
-    logger.warning("⚠️ LlamaClient no disponible")
-    llama_client = None
-
 try:
     import openai
     OPENAI_AVAILABLE = True
@@ -33,9 +29,47 @@ except ImportError:
     logger.warning("⚠️ OpenAI no disponible. Instala con: pip install openai")
     OPENAI_AVAILABLE = False
 
+# Versión de los prompts (Gemini, OpenAI y el template de llama_client).
+# Subirla al cambiar cualquiera: las extracciones cacheadas dejan de usarse
+PROMPT_VERSION = 1
+
+# Estrategias que llaman a un modelo (y por tanto se cachean)
+MODEL_STRATEGIES = ("gemini", "openai", "llama", "hybrid")
+
+# Valores de relleno del extractor regex: cuentan como campo vacío
+PLACEHOLDER_PREFIXES = ("N/A", "Sin Marca")
+
+
 class AIExtractorService:
     
-    def __init__(self):
+    def __init__(
+        self,
+        llama_client=None,
+        cache=None,
+        executor=None,
+        compactor=None,
+        required_fields: Optional[List[str]] = None
+    ):
+        # Cliente Llama/Ollama (None si no está disponible)
+        self.llama_client = llama_client
+
+        # Executor de las estrategias síncronas en aextract_product_info
+        # (None = el executor por defecto de asyncio)
+        self.executor = executor
+
+        # Caché de extracciones por texto OCR normalizado (None = desactivada)
+        self.cache = cache
+
+        # Compactación del texto OCR antes del prompt (None = texto completo)
+        self.compactor = compactor
+
+        # Estrategia híbrida: campos que, si el regex no los encuentra, se piden a Llama
+        self.required_fields = required_fields or ["name", "brand", "size"]
+        self._hybrid_regex_only = 0      # El regex bastó, sin llamar al modelo
+        self._hybrid_with_llm = 0        # Llama completó los campos faltantes
+        self._hybrid_llm_failed = 0      # Faltaban campos y Llama falló/no estaba
+        self._hybrid_fields_requested = 0
+
         # Cliente Gemini
         self.gemini_client = genai.Client(api_key=settings.GEMINI_API_KEY)
         
@@ -55,37 +89,18 @@ class AIExtractorService:
         
         Args:
             ocr_data: Datos del OCR (dict o JSON string)
-            strategy: "gemini" | "openai" | "llama" | "mock"
+            strategy: "gemini" | "openai" | "llama" | "hybrid" | "mock"
         
         Returns:
             Dict con información del producto extraída
         """
         service_start = time.time()
         logger.info(f"[AI] ▶ extract_product_info | strategy={strategy}")
-        # Blindaje contra JSON serializado
-        if isinstance(ocr_data, str):
-            try:
-                ocr_data = json.loads(ocr_data)
-            except Exception:
-                logger.error("OCR data no es JSON válido")
-                return self._empty_product_info()
-        logger.debug(f"[AI] OCR type={type(ocr_data).__name__}")
-        all_text = self._combine_ocr_text(ocr_data)
-        logger.info(
-            f"[AI] OCR combinado | length={len(all_text)} "
-            f"| overall_conf={ocr_data.get('overall_confidence', 'N/A')}"
-        )
-        if not all_text.strip():
-            logger.info("⚠️ OCR vacío, retornando estructura vacía")
-            return self._empty_product_info()
+        all_text, cache_key, early, compaction = self._prepare(ocr_data, strategy, service_start)
+        if early is not None:
+            return early
 
         try:
-            logger.info(
-                f"🧾 OCR combinado | length={len(all_text)} "
-                f"| overall_conf={ocr_data.get('overall_confidence', 'N/A')} "
-                f"| strategy={strategy}"
-            )
-            
             # ============================================
             # EJECUTAR LA ESTRATEGIA ELEGIDA
             # ============================================
@@ -100,43 +115,166 @@ class AIExtractorService:
             elif strategy == "llama":
                 result = self._extract_with_llama(all_text)
                 result["_extracted_with"] = "llama"
+
+            elif strategy == "hybrid":
+                result, used_llm = self._extract_hybrid(all_text)
+                if not used_llm:
+                    cache_key = None
                 
             else:
                 logger.warning(f"⚠️ Estrategia desconocida: '{strategy}'. Usando mock.")
                 return self._extract_with_mock(all_text)
             
-            # Calcular completitud
-            result["_completeness"] = self._calculate_completeness(result)
-            
-            filled_fields = sum(1 for k, v in result.items() 
-                              if v and k not in ["nutritional_info", "_extracted_with", "_completeness"])
-            logger.info(
-                f"✅ Extraction Success | method={result.get('_extracted_with')} "
-                f"| filled_fields={filled_fields}/9"
+            return self._finish(result, strategy, cache_key, service_start, compaction)
+
+        except Exception as e:
+            return self._fallback(strategy, all_text, e)
+
+    async def aextract_product_info(
+        self,
+        ocr_data: Union[Dict, str],
+        strategy: str = "llama",
+        timings: Optional[Dict[str, float]] = None
+    ) -> Dict:
+        """
+        Versión async de extract_product_info (la que espera el endpoint).
+
+        Llama (y la parte de Llama de "hybrid") va directo a Ollama con el
+        httpx.AsyncClient compartido del LlamaClient: no ocupa un hilo
+        mientras el modelo genera y, si se cancela la tarea, se corta la
+        petición. Gemini, OpenAI y mock usan SDKs síncronos y corren en el
+        executor del LLM.
+
+        Args:
+            ocr_data: Datos del OCR (dict o JSON string)
+            strategy: "gemini" | "openai" | "llama" | "hybrid" | "mock"
+            timings: Tiempos por etapa del escaneo (Llama añade tiempo hasta
+                el resultado y, en streaming, primer token y cada campo;
+                hybrid añade ai_regex)
+
+        Returns:
+            Dict con información del producto extraída
+        """
+        if strategy not in ("llama", "hybrid"):
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                functools.partial(self.extract_product_info, ocr_data, strategy)
             )
-            
-            return result
 
-        # ============================================
-        # MANEJO DE ERRORES → FALLBACK A MOCK
-        # ============================================
-        except (ResourceExhausted, ServiceUnavailable) as e:
+        service_start = time.time()
+        logger.info(f"[AI] ▶ aextract_product_info | strategy={strategy}")
+        all_text, cache_key, early, compaction = self._prepare(ocr_data, strategy, service_start)
+        if early is not None:
+            return early
+
+        try:
+            if strategy == "hybrid":
+                result, used_llm = await self._aextract_hybrid(all_text, timings)
+                if not used_llm:
+                    cache_key = None
+            else:
+                result = await self._aextract_with_llama(all_text, timings)
+                result["_extracted_with"] = "llama"
+            return self._finish(result, strategy, cache_key, service_start, compaction)
+
+        except Exception as e:
+            return self._fallback(strategy, all_text, e)
+
+    def _prepare(
+        self,
+        ocr_data: Union[Dict, str],
+        strategy: str,
+        service_start: float
+    ) -> Tuple[str, Optional[str], Optional[Dict], Optional[Dict]]:
+        """
+        Texto combinado (compactado si hay compactor), clave de caché, el
+        resultado a devolver si no hace falta llamar al modelo (OCR
+        vacío/inválido o hit de caché) y el informe de compactación.
+        """
+        # Blindaje contra JSON serializado
+        if isinstance(ocr_data, str):
+            try:
+                ocr_data = json.loads(ocr_data)
+            except Exception:
+                logger.error("OCR data no es JSON válido")
+                return "", None, self._empty_product_info(), None
+        logger.debug(f"[AI] OCR type={type(ocr_data).__name__}")
+        compaction = None
+        if self.compactor:
+            all_text, compaction = self.compactor.compact(ocr_data)
+        else:
+            all_text = self._combine_ocr_text(ocr_data)
+        logger.info(
+            f"[AI] OCR combinado | length={len(all_text)} "
+            f"| overall_conf={ocr_data.get('overall_confidence', 'N/A')} "
+            f"| strategy={strategy}"
+        )
+        if not all_text.strip():
+            logger.info("⚠️ OCR vacío, retornando estructura vacía")
+            return all_text, None, self._empty_product_info(), compaction
+
+        cache_key = None
+        if self.cache and strategy in MODEL_STRATEGIES:
+            cache_key = self.cache.key(all_text, self._cache_strategy(strategy), PROMPT_VERSION)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(
+                    f"✅ Extraction Success (caché) | method={cached.get('_extracted_with')} "
+                    f"| tiempo={time.time() - service_start:.3f}s"
+                )
+                return all_text, cache_key, cached, compaction
+
+        return all_text, cache_key, None, compaction
+
+    def _finish(
+        self,
+        result: Dict,
+        strategy: str,
+        cache_key: Optional[str],
+        service_start: float,
+        compaction: Optional[Dict] = None
+    ) -> Dict:
+        """Completitud, caché y log de una extracción correcta del modelo"""
+        # Calcular completitud
+        result["_completeness"] = self._calculate_completeness(result)
+
+        # Tokens del texto OCR enviados al prompt y ahorrados por la compactación
+        if compaction:
+            result["_prompt_tokens"] = compaction["tokens_after"]
+            result["_prompt_tokens_saved"] = compaction["tokens_saved"]
+
+        # Solo se cachean respuestas válidas del modelo (nunca el mock ni el regex solo)
+        if cache_key:
+            self.cache.put(
+                cache_key, self._cache_strategy(strategy), result, time.time() - service_start
+            )
+        
+        filled_fields = sum(1 for k, v in result.items() 
+                          if v and not k.startswith("_") and k != "nutritional_info")
+        logger.info(
+            f"✅ Extraction Success | method={result.get('_extracted_with')} "
+            f"| filled_fields={filled_fields}/9"
+        )
+        
+        return result
+
+    # ============================================
+    # MANEJO DE ERRORES → FALLBACK A MOCK
+    # ============================================
+    def _fallback(self, strategy: str, all_text: str, error: Exception) -> Dict:
+        if isinstance(error, (ResourceExhausted, ServiceUnavailable)):
             logger.warning(
-                f"⚠️ {strategy.upper()} no disponible ({e.__class__.__name__}). "
+                f"⚠️ {strategy.upper()} no disponible ({error.__class__.__name__}). "
                 f"Usando mock directamente."
             )
-            return self._extract_with_mock(all_text)
-
-        except json.JSONDecodeError as e:
+        elif isinstance(error, json.JSONDecodeError):
             logger.warning(
                 f"⚠️ {strategy.upper()} devolvió JSON inválido. "
                 f"Usando mock directamente."
             )
-            return self._extract_with_mock(all_text)
-
-        except Exception as e:
-            logger.exception(f"❌ Error inesperado en {strategy}: {e}. Usando mock.")
-            return self._extract_with_mock(all_text)
+        else:
+            logger.exception(f"❌ Error inesperado en {strategy}: {error}. Usando mock.")
+        return self._extract_with_mock(all_text)
         
     # ========================================
     # GEMINI EXTRACTION
@@ -339,39 +477,172 @@ REGLAS:
     # ========================================
     def _extract_with_llama(self, text: str) -> Dict:
         """Extracción con Llama (local o API)"""
-        if not llama_client or not llama_client.llm:
+        if not self.llama_client or not self.llama_client.llm:
             raise ServiceUnavailable("Llama no está disponible")
         logger.info(
             f"[LLAMA] ▶ Inicio extracción | text_length={len(text)}"
         )
         llama_start = time.time()
         try:
-            result = llama_client.extract(text)
-            llama_elapsed = time.time() - llama_start
-            logger.info(f"[LLAMA] Respuesta recibida | tiempo={llama_elapsed:.3f}s")
+            result = self.llama_client.extract(text)
+            return self._check_llama_result(result, llama_start)
+        except Exception as e:
+            logger.error(f"Error en Llama: {e}")
+            raise
 
-            # Validar estructura completa
-            required_keys = [
-                "name", "brand", "presentation", "size", "barcode",
-                "batch", "expiry_date", "price", "category", "nutritional_info"
-            ]
-            
-            if not all(key in result for key in required_keys):
-                raise ValueError("Estructura incompleta de Llama")
-            non_null_fields = sum(
-                1 for k, v in result.items()
-                if v and k != "nutritional_info"
-            )
-            logger.info(
-                f"[LLAMA] ✅ Validación OK | campos_no_nulos={non_null_fields}/9"
-            )
-            
-            return result
-            
+    async def _aextract_with_llama(self, text: str, timings: Optional[Dict[str, float]] = None) -> Dict:
+        """Extracción con Llama vía httpx async (sin LangChain ni hilos)"""
+        if not self.llama_client or not self.llama_client.is_available():
+            raise ServiceUnavailable("Llama no está disponible")
+        logger.info(
+            f"[LLAMA] ▶ Inicio extracción async | text_length={len(text)}"
+        )
+        llama_start = time.time()
+        try:
+            result = await self.llama_client.aextract(text, timings=timings)
+            return self._check_llama_result(result, llama_start)
         except Exception as e:
             logger.error(f"Error en Llama: {e}")
             raise
+
+    def _check_llama_result(self, result: Dict, llama_start: float) -> Dict:
+        """Valida la respuesta de Llama (misma estructura en sync y async)"""
+        llama_elapsed = time.time() - llama_start
+        logger.info(f"[LLAMA] Respuesta recibida | tiempo={llama_elapsed:.3f}s")
+
+        # Validar estructura completa
+        required_keys = [
+            "name", "brand", "presentation", "size", "barcode",
+            "batch", "expiry_date", "price", "category", "nutritional_info"
+        ]
+        
+        if not all(key in result for key in required_keys):
+            raise ValueError("Estructura incompleta de Llama")
+        non_null_fields = sum(
+            1 for k, v in result.items()
+            if v and k != "nutritional_info"
+        )
+        logger.info(
+            f"[LLAMA] ✅ Validación OK | campos_no_nulos={non_null_fields}/9"
+        )
+        
+        return result
     
+    # ========================================
+    # HÍBRIDA: REGEX PRIMERO, LLAMA SOLO PARA LO QUE FALTE
+    # ========================================
+    def _regex_pass(self, text: str, timings: Optional[Dict[str, float]] = None) -> Tuple[Dict, Optional[str], List[str]]:
+        """
+        Extracción regex (sin rellenos) y los campos requeridos que quedaron vacíos.
+
+        El nombre solo cuenta como encontrado si sale de una línea con
+        palabras de producto: "primera línea larga" es una suposición
+        (p.ej. "Contenido neto") y ese campo se le pide a Llama.
+
+        Returns:
+            (producto, nombre supuesto por el mock, campos faltantes)
+        """
+        regex_start = time.time()
+        product = self._clear_placeholders(self._extract_with_mock(text))
+        product["_extracted_with"] = "regex"
+        guessed_name = product["name"]
+        product["name"] = self._keyword_name(text)
+        missing = [field for field in self.required_fields if not product.get(field)]
+        if timings is not None:
+            timings["ai_regex"] = time.time() - regex_start
+        logger.info(
+            f"[AI] 🔎 Pasada regex | faltantes={missing or '-'} "
+            f"| {time.time() - regex_start:.3f}s"
+        )
+        return product, guessed_name, missing
+
+    @staticmethod
+    def _keep_guessed_name(product: Dict, guessed_name: Optional[str]) -> Dict:
+        """Si ni el regex ni Llama dieron nombre, queda la suposición del mock"""
+        if not product.get("name"):
+            product["name"] = guessed_name
+        return product
+
+    def _merge_llm_fields(self, product: Dict, llm_result: Dict, missing: List[str]) -> Dict:
+        """Los campos del regex se conservan; Llama solo rellena los faltantes"""
+        filled = []
+        for field in missing:
+            value = llm_result.get(field)
+            if value not in (None, ""):
+                product[field] = value
+                filled.append(field)
+        product["_extracted_with"] = "regex+llama"
+        self._hybrid_with_llm += 1
+        logger.info(f"[AI] 🧩 Llama completó {len(filled)}/{len(missing)} campos | {filled or '-'}")
+        return product
+
+    def _hybrid_llm_error(self, product: Dict, error: Exception) -> Tuple[Dict, bool]:
+        """Sin Llama se devuelve lo que encontró el regex (no se cachea)"""
+        self._hybrid_llm_failed += 1
+        logger.warning(f"⚠️ Llama no completó los campos faltantes ({error}). Solo regex.")
+        return product, False
+
+    def _extract_hybrid(self, text: str) -> Tuple[Dict, bool]:
+        """
+        Híbrida síncrona. LangChain no tiene el prompt reducido: si faltan
+        campos se hace la extracción completa y se toman solo esos.
+
+        Returns:
+            (producto, si se llamó al modelo con éxito)
+        """
+        product, guessed_name, missing = self._regex_pass(text)
+        if not missing:
+            self._hybrid_regex_only += 1
+            return self._keep_guessed_name(product, guessed_name), False
+
+        self._hybrid_fields_requested += len(missing)
+        try:
+            llm_result = self._extract_with_llama(text)
+        except Exception as e:
+            return self._hybrid_llm_error(self._keep_guessed_name(product, guessed_name), e)
+        product = self._merge_llm_fields(product, llm_result, missing)
+        return self._keep_guessed_name(product, guessed_name), True
+
+    async def _aextract_hybrid(self, text: str, timings: Optional[Dict[str, float]] = None) -> Tuple[Dict, bool]:
+        """
+        Híbrida async: el regex saca código de barras, tamaño, precio, lote
+        y vencimiento sin coste; a Llama solo se le piden los campos
+        requeridos que falten, con prompt y esquema reducidos.
+
+        Returns:
+            (producto, si se llamó al modelo con éxito)
+        """
+        product, guessed_name, missing = self._regex_pass(text, timings)
+        if not missing:
+            self._hybrid_regex_only += 1
+            return self._keep_guessed_name(product, guessed_name), False
+
+        self._hybrid_fields_requested += len(missing)
+        if not self.llama_client or not self.llama_client.is_available():
+            return self._hybrid_llm_error(
+                self._keep_guessed_name(product, guessed_name),
+                ServiceUnavailable("Llama no está disponible")
+            )
+        logger.info(f"[LLAMA] ▶ Pidiendo solo {missing} | text_length={len(text)}")
+        try:
+            llm_result = await self.llama_client.aextract(text, timings=timings, fields=missing)
+        except Exception as e:
+            return self._hybrid_llm_error(self._keep_guessed_name(product, guessed_name), e)
+        product = self._merge_llm_fields(product, llm_result, missing)
+        return self._keep_guessed_name(product, guessed_name), True
+
+    def hybrid_stats(self) -> Dict:
+        calls = self._hybrid_with_llm + self._hybrid_llm_failed
+        total = self._hybrid_regex_only + calls
+        return {
+            "required_fields": self.required_fields,
+            "regex_only": self._hybrid_regex_only,
+            "regex_llm": self._hybrid_with_llm,
+            "llm_failed": self._hybrid_llm_failed,
+            "regex_only_ratio": round(self._hybrid_regex_only / total, 3) if total else 0.0,
+            "avg_fields_requested": round(self._hybrid_fields_requested / calls, 2) if calls else 0.0,
+        }
+
     # ========================================
     # MOCK EXTRACTION (REGEX FALLBACK)
     # ========================================
@@ -479,23 +750,9 @@ REGLAS:
         # 8. NOMBRE (inteligente)
         lines = [l.strip() for l in text.split('\n') if len(l.strip()) > 8]
         
-        product_lines = []
-        for line in lines[:5]:
-            line_upper = line.upper()
-            # Descartar números, fechas, códigos
-            if re.match(r'^[\d\s/\-:]+$', line):
-                continue
-            # Descartar metadatos
-            if any(word in line_upper for word in ['CONF', 'FRONT', 'LEFT', 'RIGHT', 'DEBUG']):
-                continue
-            # Buscar palabras de producto
-            if any(word in line_upper for word in ['JABÓN', 'JABON', 'LECHE', 'GASEOSA', 'AGUA', 'GALLETA']):
-                product_lines.append(line)
-        
-        if product_lines:
-            best_name = min(product_lines, key=len)
-            best_name = re.sub(r'[^\w\sáéíóúñÁÉÍÓÚÑ-]', '', best_name)
-            product["name"] = best_name[:80].strip()
+        keyword_name = self._keyword_name(text)
+        if keyword_name:
+            product["name"] = keyword_name
         elif lines:
             first_line = re.sub(r'[^\w\sáéíóúñÁÉÍÓÚÑ-]', '', lines[0])
             product["name"] = first_line[:80].strip()
@@ -524,9 +781,63 @@ REGLAS:
         
         return product
     
+    def _keyword_name(self, text: str) -> Optional[str]:
+        """Nombre desde una línea con palabras de producto (LECHE, JABÓN...), o None"""
+        lines = [l.strip() for l in text.split('\n') if len(l.strip()) > 8]
+        
+        product_lines = []
+        for line in lines[:5]:
+            line_upper = line.upper()
+            # Descartar números, fechas, códigos
+            if re.match(r'^[\d\s/\-:]+$', line):
+                continue
+            # Descartar metadatos
+            if any(word in line_upper for word in ['CONF', 'FRONT', 'LEFT', 'RIGHT', 'DEBUG']):
+                continue
+            # Buscar palabras de producto
+            if any(word in line_upper for word in ['JABÓN', 'JABON', 'LECHE', 'GASEOSA', 'AGUA', 'GALLETA']):
+                product_lines.append(line)
+        
+        if not product_lines:
+            return None
+        best_name = min(product_lines, key=len)
+        best_name = re.sub(r'[^\w\sáéíóúñÁÉÍÓÚÑ-]', '', best_name)
+        return best_name[:80].strip()
+
     # ========================================
     # UTILIDADES
     # ========================================
+    def missing_fields(self, text: str, fields: List[str]) -> List[str]:
+        """
+        Chequeo barato (regex, sin IA) de qué campos aún no aparecen en el texto.
+        Los valores de relleno del mock ("N/A", "Sin Marca") cuentan como faltantes,
+        y el nombre solo cuenta si sale de una línea con palabras de producto
+        (la "primera línea larga" del mock es una suposición).
+        """
+        if not text.strip():
+            return list(fields)
+
+        product = self._clear_placeholders(self._extract_with_mock(text))
+        product["name"] = self._keyword_name(text)
+        return [field for field in fields if not product.get(field)]
+
+    @staticmethod
+    def _clear_placeholders(product: Dict) -> Dict:
+        for field, value in product.items():
+            if isinstance(value, str) and value.startswith(PLACEHOLDER_PREFIXES):
+                product[field] = None
+        return product
+
+    def _cache_strategy(self, strategy: str) -> str:
+        """Estrategia + modelo local: cambiar de modelo o de modo de salida no reutiliza extracciones"""
+        if strategy == "llama" and self.llama_client:
+            return f"llama:{self.llama_client.mode()}"
+        if strategy == "hybrid":
+            # Otros campos requeridos → otro prompt reducido
+            mode = self.llama_client.mode() if self.llama_client else "-"
+            return f"hybrid:{mode}:{','.join(self.required_fields)}"
+        return strategy
+
     def _combine_ocr_text(self, ocr_data: Dict) -> str:
         """Combina texto de todas las imágenes OCR"""
         parts = []
@@ -571,9 +882,3 @@ REGLAS:
                 filled += 1
 
         return filled / total_fields
-
-
-# ========================================
-# INSTANCIA GLOBAL
-# ========================================
-ai_extractor_service = AIExtractorService()
@@ -0,0 +1,218 @@
+import copy
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """
+    Caché de dos niveles para las extracciones del LLM.
+
+    El mismo texto de etiqueta llega muchas veces (fotos repetidas del
+    mismo SKU, reintentos). La clave es el sha256 del texto OCR
+    normalizado (espacios y mayúsculas) + estrategia + versión de prompt:
+    cambiar un prompt invalida sus entradas sin borrar nada.
+
+    - Nivel 1: LRU en memoria con TTL (por proceso)
+    - Nivel 2: tabla SQLite local, compartida entre workers y reinicios;
+      un hit en disco se sube a memoria
+    - Se guarda la latencia del modelo de cada entrada: cada hit suma
+      ese tiempo como latencia ahorrada
+
+    El nivel en disco es un archivo SQLite local y no una tabla en
+    Postgres: la consulta va antes de cada llamada al modelo, y un
+    archivo local responde sin ida y vuelta por red ni conexiones extra
+    del pool de la base de datos. Además no requiere tocar el esquema.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        memory_entries: int = 256,
+        memory_ttl: int = 3600,
+        disk_ttl: int = 30 * 24 * 3600,
+        disk_max_entries: int = 20000
+    ):
+        self.path = Path(path)
+        self.memory_entries = memory_entries
+        self.memory_ttl = memory_ttl
+        self.disk_ttl = disk_ttl
+        self.disk_max_entries = disk_max_entries
+        self._lock = threading.Lock()
+
+        # clave → {"result", "latency", "expires_at"}
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._saved_seconds = 0.0
+
+        self._db = self._connect()
+
+    # ========================================
+    # CLAVE
+    # ========================================
+    @staticmethod
+    def normalize(text: str) -> str:
+        return re.sub(r"\s+", " ", text).strip().lower()
+
+    @classmethod
+    def key(cls, text: str, strategy: str, prompt_version: int) -> str:
+        payload = f"{strategy}|{prompt_version}|{cls.normalize(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ========================================
+    # CONSULTA / REGISTRO
+    # ========================================
+    def get(self, key: str) -> Optional[Dict]:
+        """Producto estructurado guardado (copia) o None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry["expires_at"] < now:
+                self._memory.pop(key, None)
+                entry = None
+
+            tier = "memoria"
+            if entry:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+            else:
+                entry = self._disk_get(key, now)
+                if entry is None:
+                    self._misses += 1
+                    return None
+                tier = "disco"
+                self._disk_hits += 1
+                self._remember(key, entry["result"], entry["latency"])
+
+            self._saved_seconds += entry["latency"]
+
+        logger.info(
+            f"[LLM-CACHE] ♻️ Hit en {tier} | key={key[:12]} | "
+            f"ahorrado={entry['latency']:.2f}s"
+        )
+        result = copy.deepcopy(entry["result"])
+        result["_cached"] = True
+        return result
+
+    def put(self, key: str, strategy: str, result: Dict, latency: float):
+        """Guarda una extracción correcta del modelo y cuánto tardó"""
+        stored = {k: v for k, v in result.items() if k != "_cached"}
+        with self._lock:
+            self._remember(key, copy.deepcopy(stored), latency)
+            self._stores += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO extractions (key, strategy, result, latency, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, strategy, json.dumps(stored, ensure_ascii=False, default=str), latency, time.time())
+                )
+                self._db.execute(
+                    "DELETE FROM extractions WHERE key NOT IN "
+                    "(SELECT key FROM extractions ORDER BY created_at DESC LIMIT ?)",
+                    (self.disk_max_entries,)
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"[LLM-CACHE] No se pudo guardar en disco: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self._memory_hits + self._disk_hits
+            lookups = hits + self._misses
+            return {
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_count(),
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+                "stores": self._stores,
+                "saved_seconds": round(self._saved_seconds, 2),
+            }
+
+    # ========================================
+    # MEMORIA
+    # ========================================
+    def _remember(self, key: str, result: Dict, latency: float):
+        self._memory[key] = {
+            "result": result,
+            "latency": latency,
+            "expires_at": time.time() + self.memory_ttl,
+        }
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # ========================================
+    # DISCO (SQLite)
+    # ========================================
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=5)
+            # WAL: varios workers de uvicorn leen mientras otro escribe
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "key TEXT PRIMARY KEY, strategy TEXT, result TEXT, "
+                "latency REAL, created_at REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS extractions_created_at ON extractions (created_at)")
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            logger.warning(f"[LLM-CACHE] Sin nivel en disco ({self.path}): {e}. Solo memoria")
+            return None
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT result, latency FROM extractions WHERE key = ? AND created_at >= ?",
+                (key, now - self.disk_ttl)
+            ).fetchone()
+            if row is None:
+                return None
+            return {"result": json.loads(row[0]), "latency": row[1]}
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"[LLM-CACHE] Entrada ilegible, se ignora | key={key[:12]}: {e}")
+            return None
+
+    def _disk_count(self) -> int:
+        if self._db is None:
+            return 0
+        try:
+            return self._db.execute("SELECT COUNT(*) FROM extractions").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+
+def create_extraction_cache() -> Optional[ExtractionCache]:
+    if not settings.LLM_CACHE:
+        return None
+    return ExtractionCache(
+        settings.LLM_CACHE_PATH,
+        memory_entries=settings.LLM_CACHE_MEMORY_ENTRIES,
+        memory_ttl=settings.LLM_CACHE_MEMORY_TTL,
+        disk_ttl=settings.LLM_CACHE_DISK_TTL,
+        disk_max_entries=settings.LLM_CACHE_DISK_MAX_ENTRIES
+    )
@@ -0,0 +1,99 @@
+import json
+
+from typing import Any, Dict, List
+
+
+class IncrementalJSONParser:
+    """
+    Parser incremental del objeto JSON que va generando el LLM.
+
+    Se alimenta con los fragmentos del stream de Ollama y, en cuanto el
+    valor de una clave de primer nivel termina (llega la "," o el "}" que
+    lo cierra), lo parsea y lo deja en `fields`. Así se sabe qué campos ya
+    están completos sin esperar al final de la generación.
+
+    - Ignora lo que venga antes del primer "{" (p.ej. ```json)
+    - Respeta strings con llaves, comas y escapes
+    - Los valores anidados (nutritional_info) se parsean completos al cerrarse
+    - `done` pasa a True al cerrarse el objeto de primer nivel
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Añade un fragmento y avanza el análisis.
+
+        Returns:
+            Claves cuyo valor quedó completo con este fragmento
+        """
+        self.text += chunk
+        completed = []
+
+        while self._pos < len(self.text) and not self.done:
+            char = self.text[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._reading_key():
+                        self._key = json.loads(self.text[self._key_start:self._pos + 1])
+
+            elif self._depth == 0:
+                # Antes del objeto: solo importa la llave de apertura
+                if char == "{":
+                    self._depth = 1
+
+            elif char == '"':
+                self._in_string = True
+                if self._reading_key():
+                    self._key_start = self._pos
+
+            elif char in "{[":
+                self._depth += 1
+
+            elif char in "}]":
+                if self._depth == 1:
+                    self._close_value(completed)
+                    self.done = True
+                self._depth -= 1
+
+            elif char == ":" and self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = self._pos + 1
+
+            elif char == "," and self._depth == 1:
+                self._close_value(completed)
+
+            self._pos += 1
+
+        return completed
+
+    def _reading_key(self) -> bool:
+        return self._depth == 1 and self._value_start is None and self._key is None
+
+    def _close_value(self, completed: List[str]):
+        if self._key is not None and self._value_start is not None:
+            raw = self.text[self._value_start:self._pos].strip()
+            try:
+                self.fields[self._key] = json.loads(raw)
+                completed.append(self._key)
+            except json.JSONDecodeError:
+                pass
+        self._key = None
+        self._key_start = None
+        self._value_start = None
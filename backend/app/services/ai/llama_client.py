@@ -1,8 +1,10 @@
+import asyncio
 import json
 import logging
+import random
 import re
 import time
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from datetime import datetime
 
 try:
@@ -13,11 +15,48 @@ except ImportError:
     LANGCHAIN_AVAILABLE = False
     logging.warning("⚠️ langchain-ollama no instalado. Usa: pip install langchain-ollama")
 
+import httpx
 import requests
 
+from .json_stream import IncrementalJSONParser
+
 logger = logging.getLogger(__name__)
 
 
+# ========================================
+# ESQUEMA DE SALIDA (structured outputs de Ollama, parámetro "format")
+# ========================================
+# Ollama (>= 0.5) convierte el JSON schema en una gramática: el modelo solo
+# puede emitir un objeto con estas claves, sin markdown ni texto extra
+_TEXT = {"type": ["string", "null"]}
+_NUTRIENT = {"type": ["number", "string", "null"]}
+NUTRITIONAL_KEYS = ["calories", "protein", "carbs", "fat", "sodium"]
+
+PRODUCT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": _TEXT,
+        "brand": _TEXT,
+        "presentation": _TEXT,
+        "size": _TEXT,
+        "barcode": _TEXT,
+        "batch": _TEXT,
+        "expiry_date": _TEXT,
+        "price": {"type": ["number", "null"]},
+        "category": _TEXT,
+        "nutritional_info": {
+            "type": "object",
+            "properties": {key: _NUTRIENT for key in NUTRITIONAL_KEYS},
+            "required": NUTRITIONAL_KEYS,
+        },
+    },
+    "required": [
+        "name", "brand", "presentation", "size", "barcode",
+        "batch", "expiry_date", "price", "category", "nutritional_info"
+    ],
+}
+
+
 class LlamaClient:
     """
     Cliente para extraer información de productos usando Llama local.
@@ -41,13 +80,80 @@ class LlamaClient:
         "llama3.1:8b",    # Más preciso (más lento)
         "llama3.2",       # Alias de 3b
     ]
+
+    # Mismo prompt para LangChain (PromptTemplate) y para /api/generate (str.format)
+    PROMPT_TEMPLATE = """Eres un experto en análisis de productos de consumo.
+
+Extrae información estructurada del siguiente texto OCR.
+El texto puede contener errores de OCR y estar desordenado.
+
+TEXTO OCR:
+{ocr_text}
+
+INSTRUCCIONES:
+1. Corrige errores de OCR
+2. Extrae toda la información posible
+3. Si no encuentras un valor, usa null
+4. Responde SOLO con JSON válido (sin markdown, sin explicaciones)
+
+ESTRUCTURA JSON REQUERIDA:
+{{
+  "name": null,
+  "brand": null,
+  "presentation": null,
+  "size": null,
+  "barcode": null,
+  "batch": null,
+  "expiry_date": null,
+  "price": null,
+  "category": null,
+  "nutritional_info": {{
+    "calories": null,
+    "protein": null,
+    "carbs": null,
+    "fat": null,
+    "sodium": null
+  }}
+}}
+
+JSON:"""
+
+    # Prompt reducido de la estrategia híbrida: solo los campos que el regex no encontró
+    FIELDS_PROMPT_TEMPLATE = """Del siguiente texto OCR de un producto de consumo (puede tener errores de OCR), extrae SOLO estos campos:
+{fields}
+
+TEXTO OCR:
+{ocr_text}
+
+Si no encuentras un valor, usa null. Responde SOLO con JSON válido, con esta estructura:
+{skeleton}
+
+JSON:"""
+
+    FIELD_HINTS = {
+        "name": "nombre comercial del producto",
+        "brand": "marca",
+        "presentation": "presentación (botella, lata, caja, bolsa...)",
+        "size": "contenido neto con unidad (p.ej. 1L, 500g)",
+        "barcode": "código de barras EAN/UPC (solo dígitos)",
+        "batch": "lote",
+        "expiry_date": "fecha de vencimiento en formato YYYY-MM-DD",
+        "price": "precio, número sin símbolos",
+        "category": "categoría del producto",
+        "nutritional_info": "objeto con calories, protein, carbs, fat y sodium",
+    }
     
     def __init__(
         self,
         model: str = "llama3.2:latest",
         base_url: str = "http://localhost:11434",
         timeout: int = 60,
-        max_retries: int = 2
+        max_retries: int = 2,
+        max_connections: int = 4,
+        retry_backoff: float = 1.0,
+        structured_output: bool = True,
+        streaming: bool = True,
+        stop_fields: Optional[List[str]] = None
     ):
         """
         Inicializa el cliente Llama.
@@ -57,19 +163,41 @@ class LlamaClient:
             base_url: URL del servidor Ollama
             timeout: Tiempo máximo de espera (segundos)
             max_retries: Reintentos en caso de error
+            max_connections: Conexiones keep-alive a Ollama (camino async);
+                las peticiones de más esperan turno en el pool
+            retry_backoff: Espera base entre reintentos (se duplica y lleva jitter)
+            structured_output: Enviar PRODUCT_SCHEMA en "format" (camino async):
+                JSON válido por construcción y respuestas más cortas
+            streaming: Leer el stream de Ollama con un parser incremental
+                (tiempo hasta cada campo)
+            stop_fields: Cortar la generación cuando estos campos ya tienen
+                valor (los que falten quedan en null)
         """
         self.model = model
         self.base_url = base_url
         self.timeout = timeout
         self.max_retries = max_retries
+        self.max_connections = max_connections
+        self.retry_backoff = retry_backoff
+        self.structured_output = structured_output
+        self.streaming = streaming
+        self.stop_fields = stop_fields or []
         self.llm = None
         self.prompt = None
-        
-        # Verificar que LangChain está disponible
-        if not LANGCHAIN_AVAILABLE:
-            logger.error("❌ LangChain no está instalado")
-            logger.info("💡 Instala con: pip install langchain-ollama")
-            return
+        self.available = False
+
+        # Cliente HTTP async compartido (se crea en el event loop al primer uso)
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+        # Métricas del camino async (ver stats())
+        self._calls = 0
+        self._retries = 0
+        self._repairs = 0
+        self._failures = 0
+        self._seconds = 0.0
+        self._output_tokens = 0
+        self._token_calls = 0      # llamadas con eval_count real (sin corte)
+        self._early_stops = 0
         
         # Verificar que Ollama está corriendo
         if not self._check_ollama_server():
@@ -83,6 +211,14 @@ class LlamaClient:
             logger.info(f"💡 Descarga con: ollama pull {model}")
             self._suggest_alternative_models()
             return
+
+        self.available = True
+
+        # LangChain solo hace falta para extract() (camino síncrono)
+        if not LANGCHAIN_AVAILABLE:
+            logger.warning("⚠️ LangChain no está instalado: solo extracción async (aextract)")
+            logger.info("💡 Instala con: pip install langchain-ollama")
+            return
         
         # Inicializar LLM
         try:
@@ -146,45 +282,11 @@ class LlamaClient:
         except Exception:
             pass
     
-    def _create_prompt_template(self) -> PromptTemplate:
+    def _create_prompt_template(self) -> "PromptTemplate":
         """Crea el template del prompt para extracción"""
         return PromptTemplate(
             input_variables=["ocr_text"],
-            template="""Eres un experto en análisis de productos de consumo.
-
-Extrae información estructurada del siguiente texto OCR.
-El texto puede contener errores de OCR y estar desordenado.
-
-TEXTO OCR:
-{ocr_text}
-
-INSTRUCCIONES:
-1. Corrige errores de OCR
-2. Extrae toda la información posible
-3. Si no encuentras un valor, usa null
-4. Responde SOLO con JSON válido (sin markdown, sin explicaciones)
-
-ESTRUCTURA JSON REQUERIDA:
-{{
-  "name": null,
-  "brand": null,
-  "presentation": null,
-  "size": null,
-  "barcode": null,
-  "batch": null,
-  "expiry_date": null,
-  "price": null,
-  "category": null,
-  "nutritional_info": {{
-    "calories": null,
-    "protein": null,
-    "carbs": null,
-    "fat": null,
-    "sodium": null
-  }}
-}}
-
-JSON:"""
+            template=self.PROMPT_TEMPLATE
         )
     
     def extract(self, ocr_text: str) -> Dict:
@@ -252,13 +354,298 @@ JSON:"""
                 logger.warning(f"⚠️  Intento {attempt} falló: {e}")
                 
                 if attempt < self.max_retries:
-                    wait_time = attempt * 2  # Backoff exponencial
-                    logger.info(f"⏳ Reintentando en {wait_time}s...")
+                    wait_time = self._backoff(attempt)
+                    logger.info(f"⏳ Reintentando en {wait_time:.1f}s...")
                     time.sleep(wait_time)
         
         # Si llegamos aquí, todos los intentos fallaron
         logger.error(f"❌ Llama falló después de {self.max_retries} intentos")
         raise last_error
+
+    # ========================================
+    # EXTRACCIÓN ASYNC (httpx directo a /api/generate)
+    # ========================================
+    async def aextract(
+        self,
+        ocr_text: str,
+        timings: Optional[Dict[str, float]] = None,
+        stop_fields: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Igual que extract(), pero sin LangChain ni hilos: llama a
+        /api/generate con el httpx.AsyncClient compartido (keep-alive).
+
+        Los reintentos esperan con asyncio.sleep. Si la tarea se cancela
+        (cliente desconectado, shutdown), la petición HTTP se corta y
+        Ollama deja de generar.
+
+        Args:
+            ocr_text: Texto extraído por OCR
+            timings: Tiempos por etapa del escaneo; se añaden ai_result
+                (tiempo hasta el resultado) y, en streaming, ai_first_token
+                y ai_field_<campo> (segundos desde el inicio de la llamada)
+            stop_fields: Reemplaza a self.stop_fields en esta llamada
+            fields: Pedir solo estos campos (prompt y esquema reducidos,
+                menos tokens de entrada y de salida)
+
+        Returns:
+            Dict con información del producto (solo `fields` si se pasan)
+
+        Raises:
+            Exception: Si Llama no está disponible o falla la extracción
+        """
+        if not self.available:
+            raise Exception(
+                "Llama no está disponible. "
+                "Verifica que Ollama esté corriendo y el modelo descargado."
+            )
+
+        if not ocr_text or not ocr_text.strip():
+            raise ValueError("OCR text está vacío")
+
+        logger.info(f"🦙 Extrayendo con Llama (async) | Texto length: {len(ocr_text)}")
+        client = self._get_async_client()
+        if fields:
+            unknown = [field for field in fields if field not in self.FIELD_HINTS]
+            if unknown:
+                raise ValueError(f"Campos desconocidos: {unknown}")
+        payload = self._generate_payload(ocr_text, fields)
+        stop_fields = self.stop_fields if stop_fields is None else stop_fields
+        last_error = None
+        self._calls += 1
+
+        for attempt in range(1, self.max_retries + 1):
+            if attempt > 1:
+                self._retries += 1
+            try:
+                start_time = time.time()
+                logger.info(f"🔄 Intento {attempt}/{self.max_retries}")
+                if self.streaming:
+                    result, data = await self._generate_stream(
+                        client, payload, start_time, timings, stop_fields
+                    )
+                else:
+                    response = await client.post("/api/generate", json=payload)
+                    response.raise_for_status()
+                    data = response.json()
+                    result = None
+
+                elapsed = time.time() - start_time
+                self._seconds += elapsed
+                if data.get("eval_count") is not None:
+                    self._output_tokens += data["eval_count"]
+                    self._token_calls += 1
+                logger.info(
+                    f"⏱️  Llama respondió en {elapsed:.2f}s | "
+                    f"tokens_prompt={data.get('prompt_eval_count')} | "
+                    f"tokens_salida={data.get('eval_count')}"
+                )
+
+                if result is None:
+                    result = self._parse_response(data.get("response", ""))
+                if fields:
+                    result = {field: result.get(field) for field in fields}
+                else:
+                    self._validate_result(result)
+                if timings is not None:
+                    timings["ai_result"] = elapsed
+
+                logger.info(f"✅ Extracción exitosa con Llama")
+                return result
+
+            except Exception as e:
+                last_error = e
+                logger.warning(f"⚠️  Intento {attempt} falló: {e}")
+
+                if attempt < self.max_retries:
+                    wait_time = self._backoff(attempt)
+                    logger.info(f"⏳ Reintentando en {wait_time:.1f}s...")
+                    await asyncio.sleep(wait_time)
+
+        self._failures += 1
+        logger.error(f"❌ Llama falló después de {self.max_retries} intentos")
+        raise last_error
+
+    async def _generate_stream(
+        self,
+        client: httpx.AsyncClient,
+        payload: Dict,
+        start_time: float,
+        timings: Optional[Dict[str, float]],
+        stop_fields: List[str]
+    ) -> Tuple[Optional[Dict], Dict]:
+        """
+        /api/generate en streaming. Cada fragmento pasa por el parser
+        incremental. Solo se corta antes de tiempo cuando todos los
+        stop_fields tienen valor: salir del stream cierra la conexión y
+        Ollama deja de generar. Si el objeto simplemente se cierra, se lee
+        hasta el mensaje final de Ollama para tener eval_count y
+        prompt_eval_count reales.
+
+        Returns:
+            (resultado, metadatos del último mensaje). Con corte anticipado
+            no hay mensaje final: los metadatos no traen conteo de tokens.
+            El resultado es None si el parser no llegó a cerrar el objeto:
+            entonces se parsea el texto completo (metadatos["response"])
+            como sin streaming
+        """
+        parser = IncrementalJSONParser()
+        meta: Dict = {}
+        fragments = 0
+        stopped_early = False
+
+        async with client.stream("POST", "/api/generate", json={**payload, "stream": True}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                message = json.loads(line)
+                if message.get("error"):
+                    raise ValueError(f"Ollama: {message['error']}")
+
+                fragment = message.get("response", "")
+                if fragment:
+                    fragments += 1
+                    if fragments == 1 and timings is not None:
+                        timings["ai_first_token"] = time.time() - start_time
+                    for key in parser.feed(fragment):
+                        if timings is not None:
+                            timings[f"ai_field_{key}"] = time.time() - start_time
+
+                if message.get("done"):
+                    meta = message
+                    break
+                if (
+                    stop_fields and not parser.done
+                    and all(parser.fields.get(field) not in (None, "") for field in stop_fields)
+                ):
+                    stopped_early = True
+                    break
+
+        if stopped_early:
+            self._early_stops += 1
+            logger.info(
+                f"✂️ Generación cortada | campos={len(parser.fields)} | "
+                f"fragmentos={fragments} | {time.time() - start_time:.2f}s"
+            )
+
+        if parser.done or stopped_early:
+            return self._fill_missing(parser.fields), meta
+        meta["response"] = parser.text
+        return None, meta
+
+    def _fill_missing(self, fields: Dict) -> Dict:
+        """Claves del esquema que el modelo no llegó a emitir → null"""
+        result = dict(fields)
+        for key in PRODUCT_SCHEMA["required"]:
+            result.setdefault(key, None)
+        if not isinstance(result["nutritional_info"], dict):
+            result["nutritional_info"] = {key: None for key in NUTRITIONAL_KEYS}
+        return result
+
+    def mode(self) -> str:
+        """Modelo y modo de salida (forma parte de la clave de caché)"""
+        mode = f"{self.model}:{'schema' if self.structured_output else 'text'}"
+        if self.streaming and self.stop_fields:
+            mode += f":stop={','.join(self.stop_fields)}"
+        return mode
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None or self._async_client.is_closed:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                # pool=None: sin conexión libre se espera turno (cancelable)
+                timeout=httpx.Timeout(self.timeout, connect=5.0, pool=None),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self._async_client
+
+    def _generate_payload(self, ocr_text: str, fields: Optional[List[str]] = None) -> Dict:
+        if fields:
+            return self._fields_payload(ocr_text, fields)
+        payload = {
+            "model": self.model,
+            "prompt": self.PROMPT_TEMPLATE.format(ocr_text=ocr_text),
+            "stream": False,
+            "options": {
+                "temperature": 0,    # Determinista
+                "num_predict": 1024, # Tokens máximos de respuesta
+            },
+        }
+        if self.structured_output:
+            payload["format"] = PRODUCT_SCHEMA
+            # El objeto completo ronda 150 tokens: sin margen para divagar
+            payload["options"]["num_predict"] = 384
+        return payload
+
+    def _fields_payload(self, ocr_text: str, fields: List[str]) -> Dict:
+        """Prompt, esquema y tope de tokens solo para `fields`"""
+        prompt = self.FIELDS_PROMPT_TEMPLATE.format(
+            fields="\n".join(f"- {field}: {self.FIELD_HINTS[field]}" for field in fields),
+            ocr_text=ocr_text,
+            skeleton=json.dumps({field: None for field in fields})
+        )
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "options": {
+                "temperature": 0,
+                # nutritional_info sola ya son ~50 tokens
+                "num_predict": 64 * len(fields),
+            },
+        }
+        if self.structured_output:
+            payload["format"] = {
+                "type": "object",
+                "properties": {field: PRODUCT_SCHEMA["properties"][field] for field in fields},
+                "required": list(fields),
+            }
+        return payload
+
+    def _parse_response(self, response: str) -> Dict:
+        """
+        Con salida estructurada la respuesta ya es el JSON: json.loads directo.
+        Si no (o si el servidor ignoró "format", Ollama < 0.5), limpieza con
+        _extract_json_from_response.
+        """
+        if self.structured_output:
+            try:
+                return json.loads(response)
+            except json.JSONDecodeError:
+                self._repairs += 1
+                logger.warning("⚠️ Respuesta fuera del esquema, se intenta limpiar (¿Ollama < 0.5?)")
+        return self._extract_json_from_response(response)
+
+    def stats(self) -> Dict:
+        """Métricas del camino async: latencia y tokens de salida por llamada"""
+        return {
+            "model": self.model,
+            "structured_output": self.structured_output,
+            "streaming": self.streaming,
+            "calls": self._calls,
+            "early_stops": self._early_stops,
+            "retries": self._retries,
+            "repairs": self._repairs,
+            "failures": self._failures,
+            "avg_seconds": round(self._seconds / self._calls, 3) if self._calls else 0.0,
+            # Solo llamadas completas: con corte anticipado Ollama no informa tokens
+            "avg_output_tokens": round(self._output_tokens / self._token_calls, 1) if self._token_calls else 0.0,
+        }
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial con jitter (evita reintentos sincronizados)"""
+        return self.retry_backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+    async def aclose(self):
+        """Cierra el pool de conexiones async (shutdown de la app)"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
     
     def _extract_json_from_response(self, response: str) -> Dict:
         """
@@ -345,7 +732,7 @@ JSON:"""
         Returns:
             Dict con metadata del modelo
         """
-        if not self.llm:
+        if not self.available:
             return {"error": "Llama no disponible"}
         
         try:
@@ -368,35 +755,51 @@ JSON:"""
         
         return {
             "model": self.model,
-            "available": self.llm is not None
+            "available": self.available
         }
     
     def is_available(self) -> bool:
-        """Verifica si Llama está listo para usar"""
-        return self.llm is not None
+        """Verifica si Llama está listo para usar (Ollama corriendo y modelo descargado)"""
+        return self.available
 
 
 # ========================================
-# INSTANCIA GLOBAL
+# FÁBRICA (la usa el ServiceRegistry)
 # ========================================
 
-try:
-    llama_client = LlamaClient(
-        model="llama3.2:latest",  # Cambia según tu modelo
-        timeout=60
-    )
-    
-    if llama_client.is_available():
-        logger.info("✅ LlamaClient global inicializado")
-        info = llama_client.get_model_info()
-        logger.info(f"📦 Modelo: {info.get('model')}")
-    else:
+def create_llama_client() -> Optional[LlamaClient]:
+    """
+    Crea el cliente y comprueba Ollama (/api/tags, /api/show).
+
+    Returns:
+        El cliente, o None si Ollama o el modelo no están disponibles
+    """
+    from backend.app.core.config import settings
+    from backend.app.core.resources import resource_governor
+
+    try:
+        client = LlamaClient(
+            model="llama3.2:latest",  # Cambia según tu modelo
+            timeout=60,
+            # Tantas conexiones a Ollama como llamadas al LLM en paralelo
+            max_connections=resource_governor.llm_threads,
+            structured_output=settings.LLM_STRUCTURED_OUTPUT,
+            streaming=settings.LLM_STREAMING,
+            stop_fields=settings.LLM_STREAM_STOP_FIELDS
+        )
+        
+        if client.is_available():
+            logger.info("✅ LlamaClient inicializado")
+            info = client.get_model_info()
+            logger.info(f"📦 Modelo: {info.get('model')}")
+            return client
+
         logger.warning("⚠️ LlamaClient no disponible")
-        llama_client = None
+        return None
         
-except Exception as e:
-    logger.error(f"❌ Error creando LlamaClient global: {e}")
-    llama_client = None
+    except Exception as e:
+        logger.error(f"❌ Error creando LlamaClient: {e}")
+        return None
 
 
 # ========================================
@@ -0,0 +1,211 @@
+import logging
+import re
+import threading
+
+from typing import Dict, List, Optional, Tuple
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OCRTextCompactor:
+    """
+    Compacta el texto OCR de las vistas antes de mandarlo al prompt.
+
+    Las vistas laterales repiten marca y nombre y traen listas de
+    ingredientes largas: todo eso son tokens de prompt (y prefill) que no
+    aportan campos. Pasos:
+
+    1. Ruido: líneas sin apenas letras/dígitos o con confianza de OCR por
+       debajo de min_confidence (salvo que parezcan un campo: EAN, tamaño,
+       fecha, lote, precio)
+    2. Duplicados entre vistas: misma línea normalizada → solo la primera
+       (frontal antes que laterales)
+    3. Presupuesto: si aún se pasa de token_budget (contado con tiktoken),
+       se quedan las líneas con más pistas de campos y se devuelven en su
+       orden original
+    """
+
+    # Pistas de campos del producto: (patrón, puntos)
+    FIELD_CUES = [
+        (re.compile(r"\b\d{8,14}\b"), 4),                                            # barcode
+        (re.compile(r"\b\d+[.,]?\d*\s?(ml|l|lt|g|gr|kg|oz|cc)\b", re.I), 4),         # size
+        (re.compile(r"(S/\.?|\$|PRECIO)\s*\d", re.I), 3),                            # price
+        (re.compile(r"\b(VENC|VTO|EXP|CAD|F\.?\s?V)\b|\d{2}[/-]\d{2}[/-]\d{2,4}", re.I), 3),  # expiry
+        (re.compile(r"\b(LOTE?|LOT|BATCH)\b", re.I), 3),                            # batch
+        (re.compile(r"\b(kcal|calor|prote|grasa|carbohidrat|sodio)", re.I), 1),     # nutrición
+    ]
+    # Listas de ingredientes y avisos legales: mucho texto, ningún campo
+    NOISE_CUES = re.compile(r"\b(INGREDIENTES|CONTIENE|PUEDE CONTENER|REG\.? ?SAN|HECHO EN|FABRICADO)\b", re.I)
+
+    def __init__(self, token_budget: int = 600, min_confidence: float = 0.3, encoding: str = "cl100k_base"):
+        self.token_budget = token_budget
+        self.min_confidence = min_confidence
+        self._encoder = self._load_encoder(encoding)
+        self._lock = threading.Lock()
+
+        self._scans = 0
+        self._tokens_before = 0
+        self._tokens_after = 0
+        self._duplicates = 0
+        self._noise = 0
+        self._over_budget = 0
+
+    def _load_encoder(self, encoding: str):
+        try:
+            import tiktoken
+            return tiktoken.get_encoding(encoding)
+        except Exception as e:
+            # Sin el BPE en caché (y sin red) se estima ~4 caracteres por token
+            logger.warning(f"⚠️ tiktoken no disponible ({e}), tokens estimados por longitud")
+            return None
+
+    def count_tokens(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoder is None:
+            return max(1, len(text) // 4)
+        return len(self._encoder.encode(text))
+
+    # ========================================
+    # COMPACTACIÓN
+    # ========================================
+    def compact(self, ocr_data: Dict) -> Tuple[str, Dict]:
+        """
+        Texto compacto de todas las vistas y el informe de la compactación.
+
+        Returns:
+            (texto, {"tokens_before", "tokens_after", "tokens_saved",
+                     "duplicates", "noise", "dropped_for_budget"})
+        """
+        views = [
+            (view, data) for view, data in ocr_data.get("images", {}).items()
+            if data.get("text", "").strip()
+        ]
+        original = "\n\n".join(data["text"].strip() for _, data in views)
+        tokens_before = self.count_tokens(original)
+
+        # (vista, posición, línea, puntaje)
+        kept: List[Tuple[int, int, str, int]] = []
+        seen = set()
+        duplicates = noise = 0
+        for view_index, (view, data) in enumerate(views):
+            lines = data["text"].split("\n")
+            confidences = data.get("line_confidences") or []
+            for position, line in enumerate(lines):
+                line = line.strip()
+                if not line:
+                    continue
+                score = self._score(line, view_index, position)
+                confidence = confidences[position] if position < len(confidences) else None
+                if self._is_noise(line, confidence, score):
+                    noise += 1
+                    continue
+                key = self._normalize(line)
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                kept.append((view_index, position, line, score))
+
+        text = self._join(kept)
+        dropped = 0
+        if self.count_tokens(text) > self.token_budget:
+            kept, dropped = self._fit_budget(kept)
+            text = self._join(kept)
+
+        report = {
+            "tokens_before": tokens_before,
+            "tokens_after": self.count_tokens(text),
+            "duplicates": duplicates,
+            "noise": noise,
+            "dropped_for_budget": dropped,
+        }
+        report["tokens_saved"] = report["tokens_before"] - report["tokens_after"]
+
+        with self._lock:
+            self._scans += 1
+            self._tokens_before += report["tokens_before"]
+            self._tokens_after += report["tokens_after"]
+            self._duplicates += duplicates
+            self._noise += noise
+            self._over_budget += 1 if dropped else 0
+
+        logger.info(
+            f"[AI] 🗜️ Texto compactado | tokens={report['tokens_before']}→{report['tokens_after']} "
+            f"| duplicadas={duplicates} | ruido={noise} | fuera_de_presupuesto={dropped}"
+        )
+        return text, report
+
+    def _score(self, line: str, view_index: int, position: int) -> int:
+        """Pistas de campos; nombre y marca suelen ser las primeras líneas del frente"""
+        score = sum(points for pattern, points in self.FIELD_CUES if pattern.search(line))
+        if view_index == 0:
+            score += 1
+            if position < 4:
+                score += 2
+        if self.NOISE_CUES.search(line) or line.count(",") >= 3:
+            score -= 3
+        return score
+
+    def _is_noise(self, line: str, confidence: Optional[float], score: int) -> bool:
+        if sum(char.isalnum() for char in line) < 3:
+            return True
+        # Baja confianza solo se descarta si la línea no parece un campo
+        return confidence is not None and confidence < self.min_confidence and score < 3
+
+    def _fit_budget(self, kept: List[Tuple[int, int, str, int]]) -> Tuple[List, int]:
+        """Mejores líneas por puntaje hasta llenar el presupuesto, en su orden original"""
+        selected = []
+        used = 0
+        for item in sorted(kept, key=lambda item: (-item[3], item[0], item[1])):
+            tokens = self.count_tokens(item[2]) + 1  # + salto de línea
+            if used + tokens > self.token_budget:
+                continue
+            selected.append(item)
+            used += tokens
+        selected.sort(key=lambda item: (item[0], item[1]))
+        return selected, len(kept) - len(selected)
+
+    @staticmethod
+    def _normalize(line: str) -> str:
+        return re.sub(r"[^0-9a-záéíóúñü]+", "", line.lower())
+
+    @staticmethod
+    def _join(kept: List[Tuple[int, int, str, int]]) -> str:
+        """Una línea por renglón; línea en blanco entre vistas (como antes)"""
+        parts = []
+        current_view = None
+        for view_index, _, line, _ in kept:
+            if current_view is not None and view_index != current_view:
+                parts.append("")
+            parts.append(line)
+            current_view = view_index
+        return "\n".join(parts)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            saved = self._tokens_before - self._tokens_after
+            return {
+                "scans": self._scans,
+                "token_budget": self.token_budget,
+                "tokens_before": self._tokens_before,
+                "tokens_after": self._tokens_after,
+                "tokens_saved": saved,
+                "avg_tokens_saved": round(saved / self._scans, 1) if self._scans else 0.0,
+                "saved_ratio": round(saved / self._tokens_before, 3) if self._tokens_before else 0.0,
+                "duplicates": self._duplicates,
+                "noise": self._noise,
+                "over_budget": self._over_budget,
+            }
+
+
+def create_text_compactor() -> Optional[OCRTextCompactor]:
+    if not settings.LLM_COMPACTION:
+        return None
+    return OCRTextCompactor(
+        token_budget=settings.LLM_PROMPT_TOKEN_BUDGET,
+        min_confidence=settings.LLM_MIN_LINE_CONFIDENCE,
+        encoding=settings.LLM_TOKEN_ENCODING
+    )
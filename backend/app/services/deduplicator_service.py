@@ -11,7 +11,43 @@ logger = logging.getLogger(__name__)
 class DeduplicatorService:
     def __init__(self, threshold: int = 0.85):
         self.SIMILARITY_THRESHOLD = threshold
-    
+
+    async def find_by_barcode(self, db: AsyncSession, barcodes: List[str]) -> Optional[Dict]:
+        """
+        Match exacto por código de barras entre productos activos.
+
+        Args:
+            barcodes: Formas equivalentes del mismo código (p.ej. UPC-A y EAN-13)
+        """
+        logger.info(f"🔍 Buscando por barcode: {', '.join(barcodes)}")
+
+        stmt = select(Product).where(
+            Product.is_active == True,
+            Product.barcode.in_(barcodes)
+        ).limit(1)
+        result = await db.execute(stmt)
+        product = result.scalar_one_or_none()
+
+        if not product:
+            return None
+
+        logger.info(f"✅ Match EXACTO por barcode: {product.name}")
+        return {
+            "id": product.id,
+            "name": product.name,
+            "brand": product.brand,
+            "size": product.size,
+            "barcode": product.barcode,
+            "presentation": product.presentation,
+            "category": product.category,
+            "image_front": product.image_front,
+            "image_left": product.image_left,
+            "image_right": product.image_right,
+            "similarity": 1.0,
+            "match_type": "barcode",
+            "is_exact_match": True
+        }
+
     async def find_similar_products(
     self, 
     db: AsyncSession, 
@@ -35,27 +71,9 @@ class DeduplicatorService:
             # ESTRATEGIA 1: BARCODE EXACTO = 100% MATCH
             # ============================================
             if barcode and len(barcode) >= 8:
-                logger.info(f"🔍 Buscando por barcode: {barcode}")
-                
-                stmt = select(Product).where(
-                    Product.is_active == True,
-                    Product.barcode == barcode
-                )
-                result = await db.execute(stmt)
-                product = result.scalar_one_or_none()
-                
-                if product:
-                    logger.info(f"✅ Match EXACTO por barcode: {product.name}")
-                    return [{
-                        "id": product.id,
-                        "name": product.name,
-                        "brand": product.brand,
-                        "size": product.size,
-                        "barcode": product.barcode,
-                        "similarity": 1.0,
-                        "match_type": "barcode",
-                        "is_exact_match": True
-                    }]
+                match = await self.find_by_barcode(db, [barcode])
+                if match:
+                    return [match]
             
             # ============================================
             # ESTRATEGIA 2: MARCA + NOMBRE (FUZZY)
@@ -161,6 +179,11 @@ class DeduplicatorService:
                         "brand": product.brand,
                         "size": product.size,
                         "barcode": product.barcode,
+                        "presentation": product.presentation,
+                        "category": product.category,
+                        "image_front": product.image_front,
+                        "image_left": product.image_left,
+                        "image_right": product.image_right,
                         "similarity": round(final_similarity, 2),
                         "match_type": match_type,
                         "is_exact_match": is_exact_match,
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyService:
+    """
+    Idempotencia por contenido para los escaneos.
+
+    La clave es el hash del conjunto de imágenes (ver ImageService):
+    - Escaneo completado hace poco → se devuelve el OCRResult guardado
+    - Escaneo idéntico aún en curso → se espera el mismo resultado
+      en lugar de lanzar un segundo pipeline
+    - Si el escaneo en curso se cancela (cliente desconectado), quienes
+      esperaban reciben RETRY y uno de ellos lo vuelve a ejecutar
+    """
+
+    # Resultado de la espera cuando el dueño del escaneo se canceló
+    RETRY = object()
+
+    def __init__(self, ttl: int = 600, max_entries: int = 500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # hash → {"result", "job_id", "expires_at"}
+        self._completed: "OrderedDict[str, Dict]" = OrderedDict()
+        # hash → {"future", "job_id"}
+        self._inflight: Dict[str, Dict] = {}
+
+        self._hits = 0
+        self._coalesced = 0
+        self._misses = 0
+
+    # ========================================
+    # CONSULTA
+    # ========================================
+    def cached(self, key: str) -> Optional[Dict]:
+        """Entrada completada y vigente ({"result", "job_id"}) o None"""
+        entry = self._completed.get(key)
+        if not entry:
+            return None
+
+        if entry["expires_at"] < time.time():
+            self._completed.pop(key, None)
+            return None
+
+        self._completed.move_to_end(key)
+        self._hits += 1
+        logger.info(f"♻️ Escaneo repetido, devolviendo resultado guardado | hash={key[:12]}")
+        return entry
+
+    def inflight(self, key: str) -> Optional[Dict]:
+        """Entrada en curso ({"future", "job_id"}) o None"""
+        entry = self._inflight.get(key)
+        if entry:
+            self._coalesced += 1
+            logger.info(f"🔗 Escaneo idéntico en curso, uniéndose | hash={key[:12]}")
+        return entry
+
+    # ========================================
+    # REGISTRO
+    # ========================================
+    def start(self, key: str, job_id: Optional[str] = None) -> asyncio.Future:
+        """Marca el escaneo como en curso"""
+        self._misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = {"future": future, "job_id": job_id}
+        return future
+
+    def finish(
+        self,
+        key: str,
+        result: Optional[Dict] = None,
+        error: Optional[BaseException] = None
+    ):
+        """Resuelve a quienes esperan y guarda el resultado si hubo éxito"""
+        entry = self._inflight.pop(key, None)
+        if entry is None:
+            return
+
+        future = entry["future"]
+        if error is not None:
+            if isinstance(error, asyncio.CancelledError):
+                # La cancelación es del dueño, no de las peticiones que esperan
+                if not future.done():
+                    future.set_result(self.RETRY)
+                logger.info(f"↩️ Escaneo en curso cancelado, se libera para reintento | hash={key[:12]}")
+            elif not future.done():
+                future.set_exception(error)
+                future.exception()  # evita el warning si nadie esperaba
+            return
+
+        if not future.done():
+            future.set_result(result)
+
+        self._completed[key] = {
+            "result": result,
+            "job_id": entry["job_id"],
+            "expires_at": time.time() + self.ttl
+        }
+        self._completed.move_to_end(key)
+        while len(self._completed) > self.max_entries:
+            self._completed.popitem(last=False)
+
+    def stats(self) -> Dict:
+        lookups = self._hits + self._coalesced + self._misses
+        return {
+            "hits": self._hits,
+            "coalesced": self._coalesced,
+            "misses": self._misses,
+            "hit_ratio": round((self._hits + self._coalesced) / lookups, 3) if lookups else 0.0,
+            "inflight": len(self._inflight),
+            "stored": len(self._completed),
+        }
@@ -1,61 +1,223 @@
-import shutil
 import logging
 import asyncio
+import os
+import uuid
+import xxhash
 
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from fastapi import UploadFile
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # pragma: no cover
+    import multipart
+    from multipart.multipart import parse_options_header
+
 
 logger = logging.getLogger(__name__)
 
+
+class ImageTooLargeError(Exception):
+    """Una imagen del multipart supera el tamaño máximo permitido"""
+
+
+class _MultipartImageParser:
+    """
+    Parser incremental de multipart/form-data.
+    
+    Acumula cada parte en memoria (con su hash) y la deja en `completed`
+    apenas llega su delimitador, sin esperar al resto del body.
+    """
+
+    def __init__(self, boundary: bytes, max_part_size: int):
+        self.max_part_size = max_part_size
+        self.completed: List[Tuple[str, Optional[str], bytes, str]] = []
+
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._data = bytearray()
+        self._hasher = xxhash.xxh3_128()
+
+        self.parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+        })
+
+    def _on_part_begin(self):
+        self._disposition = b""
+        self._data = bytearray()
+        self._hasher = xxhash.xxh3_128()
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        chunk = data[start:end]
+        if len(self._data) + len(chunk) > self.max_part_size:
+            raise ImageTooLargeError(
+                f"Imagen mayor a {self.max_part_size // (1024 * 1024)} MB"
+            )
+        self._data.extend(chunk)
+        self._hasher.update(chunk)
+
+    def _on_part_end(self):
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        filename = options.get(b"filename")
+        self.completed.append((
+            name,
+            filename.decode("utf-8", errors="replace") if filename is not None else None,
+            bytes(self._data),
+            self._hasher.hexdigest()
+        ))
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+
 class ImageService:
-    def __init__(self, upload_dir: str = "uploads"):
+    def __init__(self, upload_dir: str = "uploads", executor: Optional[ThreadPoolExecutor] = None):
         base_dir = Path(__file__).resolve().parent.parent.parent
         self.upload_dir = base_dir / upload_dir
         self.upload_dir.mkdir(parents=True, exist_ok=True)
+        # Executor compartido de E/S (ResourceGovernor); sin él, uno por llamada
+        self.executor = executor
+        # ruta → escritura en segundo plano aún sin terminar
+        self._pending_writes: Dict[str, asyncio.Task] = {}
+    
+    def build_path(self, image_type: str, filename: Optional[str]) -> str:
+        """Ruta de destino única para una imagen subida"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Sufijo aleatorio: dos subidas en el mismo segundo no se pisan
+        name = f"{image_type}_{timestamp}_{uuid.uuid4().hex[:8]}_{filename or 'image.jpg'}"
+        return str(self.upload_dir / name)
+    
+    async def receive_uploads(
+        self,
+        files: List[UploadFile],
+        image_types: List[str]
+    ) -> Tuple[Dict[str, bytes], Dict[str, str], str]:
+        """
+        Lee las subidas a memoria (con hash) y agenda su escritura a disco
+        sin esperarla: el OCR trabaja sobre los bytes, no relee el archivo.
+        
+        Returns:
+            ({tipo: bytes}, {tipo: ruta}, hash del conjunto de imágenes)
+        """
+        image_buffers = {}
+        saved_images = {}
+        image_hashes = {}
+        
+        for file, img_type in zip(files, image_types):
+            if not file:
+                continue
+            data = await file.read()
+            image_buffers[img_type] = data
+            image_hashes[img_type] = xxhash.xxh3_128_hexdigest(data)
+            saved_images[img_type] = self.schedule_write(img_type, data, file.filename)
+        
+        return image_buffers, saved_images, self.image_set_hash(image_hashes)
     
-    def save_image(self, file: UploadFile, image_type: str) -> str:
+    def schedule_write(self, image_type: str, data: bytes, filename: Optional[str]) -> str:
+        """
+        Agenda la escritura a disco en segundo plano.
+        
+        Returns:
+            Ruta final (el archivo puede no existir todavía, ver wait_written)
+        """
+        file_path = self.build_path(image_type, filename)
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(loop.run_in_executor(self.executor, self.write_bytes, file_path, data))
+        self._pending_writes[file_path] = task
+        task.add_done_callback(lambda _, p=file_path: self._pending_writes.pop(p, None))
+        return file_path
+    
+    async def wait_written(self, saved_images: Dict[str, str]):
+        """Espera a que las escrituras pendientes de estas rutas terminen"""
+        tasks = [
+            self._pending_writes[path]
+            for path in saved_images.values()
+            if path in self._pending_writes
+        ]
+        if tasks:
+            await asyncio.gather(*tasks)
+    
+    def write_bytes(self, file_path: str, data: bytes):
+        """Escribe a disco una imagen que ya está en memoria"""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{image_type}_{timestamp}_{file.filename}"
-            file_path = self.upload_dir / filename
-            
             with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            logger.info(f"💾 Guardada: {filename}")
-            return str(file_path)
-            
+                buffer.write(data)
+            logger.info(f"💾 Guardada: {os.path.basename(file_path)}")
         except Exception as e:
-            logger.error(f"❌ Error guardando {image_type}: {e}")
+            logger.error(f"❌ Error guardando {file_path}: {e}")
             raise
     
-    async def save_multiple_images_async(
-        self, 
-        files: List[UploadFile], 
-        image_types: List[str]
-    ) -> Dict[str, str]:
-        loop = asyncio.get_event_loop()
-        
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            tasks = [
-                loop.run_in_executor(executor, self.save_image, file, img_type)
-                for file, img_type in zip(files, image_types)
-                if file
-            ]
-            
-            saved_paths = await asyncio.gather(*tasks)
-        
-        # Construir diccionario
-        saved_images = {}
-        idx = 0
-        for file, img_type in zip(files, image_types):
-            if file:
-                saved_images[img_type] = saved_paths[idx]
-                idx += 1
+    async def iter_multipart_images(
+        self,
+        stream: AsyncIterator[bytes],
+        content_type: str,
+        max_part_size: int
+    ) -> AsyncIterator[Tuple[str, Optional[str], bytes, str]]:
+        """
+        Recorre un body multipart a medida que llega.
+        
+        Cada parte se entrega apenas está completa, mientras las
+        siguientes siguen subiendo.
+        
+        Yields:
+            (campo, nombre de archivo, bytes, hash xxh3-128)
+        
+        Raises:
+            ValueError: Si el Content-Type no trae boundary
+            ImageTooLargeError: Si una parte supera max_part_size
+        """
+        _, params = parse_options_header(content_type)
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise ValueError("Content-Type multipart sin boundary")
+        
+        parser = _MultipartImageParser(boundary, max_part_size)
+        async for chunk in stream:
+            parser.parser.write(chunk)
+            while parser.completed:
+                yield parser.completed.pop(0)
         
-        logger.info(f"💾 {len(saved_images)} imágenes guardadas en paralelo")
-        return saved_images
\ No newline at end of file
+        parser.parser.finalize()
+        while parser.completed:
+            yield parser.completed.pop(0)
+    
+    def image_set_hash(self, image_hashes: Dict[str, str]) -> str:
+        """Hash del conjunto: misma foto en la misma vista → mismo escaneo"""
+        key = "|".join(f"{img_type}:{digest}" for img_type, digest in sorted(image_hashes.items()))
+        return xxhash.xxh3_128_hexdigest(key.encode())
+    
+    def discard(self, saved_images: Dict[str, str]):
+        """Elimina imágenes guardadas que no se van a procesar (escaneo repetido)"""
+        for path in saved_images.values():
+            pending = self._pending_writes.get(path)
+            if pending:
+                # Borrar cuando termine de escribirse
+                pending.add_done_callback(lambda _, p=path: self._remove(p))
+            else:
+                self._remove(path)
+    
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo eliminar {path}: {e}")
\ No newline at end of file
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+import uuid
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """La cola de trabajos alcanzó su capacidad máxima"""
+
+
+class ScanJob:
+    """
+    Trabajo de escaneo encolado.
+
+    ESTADOS:
+        queued → running → done | failed
+    """
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = "queued"
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.error_status: Optional[int] = None
+        self.timings: Dict[str, float] = {}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "timings": {k: round(v, 3) for k, v in self.timings.items()},
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobService:
+    """
+    Pool acotado de workers en proceso para el pipeline de escaneo.
+
+    - submit() encola y retorna el trabajo de inmediato
+    - N workers consumen la cola y ejecutan el handler registrado
+    - Los trabajos terminados se conservan (LRU) para poder consultarlos
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 20, retention: int = 200):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retention = retention
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._handler: Optional[Callable[[ScanJob], Awaitable[Dict]]] = None
+        self._jobs: "OrderedDict[str, ScanJob]" = OrderedDict()
+        self._running = 0
+
+        # stage → [conteo, tiempo acumulado]
+        self._stage_totals: Dict[str, List[float]] = {}
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+
+    # ========================================
+    # CICLO DE VIDA
+    # ========================================
+    async def start(self, handler: Callable[[ScanJob], Awaitable[Dict]]):
+        """Arranca los workers (llamar desde el lifespan de la app)"""
+        if self._workers:
+            return
+
+        self._handler = handler
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [
+            asyncio.create_task(self._worker(idx), name=f"scan-worker-{idx}")
+            for idx in range(self.max_workers)
+        ]
+        logger.info(
+            f"🧵 JobService iniciado | workers={self.max_workers} | cola_max={self.max_queue}"
+        )
+
+    async def stop(self):
+        """Cancela los workers pendientes"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("🛑 JobService detenido")
+
+    # ========================================
+    # API PÚBLICA
+    # ========================================
+    def submit(self, payload: Dict[str, Any]) -> ScanJob:
+        """
+        Encola un trabajo.
+
+        Raises:
+            JobQueueFullError: Si la cola está llena o el servicio no arrancó
+        """
+        if self._queue is None:
+            raise JobQueueFullError("El servicio de trabajos no está iniciado")
+
+        job = ScanJob(payload)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise JobQueueFullError(
+                f"Cola de escaneo llena ({self.max_queue} trabajos en espera)"
+            )
+
+        self._remember(job)
+        logger.info(f"📥 Trabajo encolado | id={job.id} | cola={self._queue.qsize()}")
+        return job
+
+    def record_done(self, result: Dict) -> ScanJob:
+        """
+        Registra como terminado un resultado que no pasó por la cola
+        (escaneo repetido servido por idempotencia), para que su job_id
+        se pueda consultar en /jobs/{job_id} como cualquier otro.
+        """
+        job = ScanJob({})
+        job.payload = None
+        job.status = "done"
+        job.result = result
+        job.started_at = job.finished_at = job.created_at
+        self._remember(job)
+        return job
+
+    def has_capacity(self) -> bool:
+        return self._queue is not None and not self._queue.full()
+
+    def get(self, job_id: str) -> Optional[ScanJob]:
+        return self._jobs.get(job_id)
+
+    def stats(self) -> Dict:
+        """Profundidad de cola y tiempos promedio por etapa"""
+        stage_avg = {
+            stage: round(total / count, 3)
+            for stage, (count, total) in self._stage_totals.items()
+            if count
+        }
+        return {
+            "workers": self.max_workers,
+            "running": self._running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_max": self.max_queue,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "stage_avg_seconds": stage_avg,
+        }
+
+    # ========================================
+    # INTERNOS
+    # ========================================
+    def _remember(self, job: ScanJob):
+        self._jobs[job.id] = job
+        # Descartar los trabajos terminados más antiguos
+        while len(self._jobs) > self.retention:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in ("queued", "running"):
+                break
+            self._jobs.pop(oldest_id)
+
+    def _record_timings(self, timings: Dict[str, float]):
+        for stage, seconds in timings.items():
+            totals = self._stage_totals.setdefault(stage, [0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+
+    async def _worker(self, idx: int):
+        while True:
+            job = await self._queue.get()
+            self._running += 1
+            job.status = "running"
+            job.started_at = time.time()
+            job.timings["queue_wait"] = job.started_at - job.created_at
+            logger.info(f"▶ [worker-{idx}] Procesando trabajo {job.id}")
+
+            try:
+                job.result = await self._handler(job)
+                job.status = "done"
+                self._completed += 1
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(getattr(e, "detail", e))
+                job.error_status = getattr(e, "status_code", 500)
+                self._failed += 1
+                logger.error(f"❌ [worker-{idx}] Trabajo {job.id} falló: {job.error}")
+            finally:
+                job.finished_at = time.time()
+                job.timings["total"] = job.finished_at - job.started_at
+                job.payload = None  # liberar referencias a las imágenes
+                self._record_timings(job.timings)
+                self._running -= 1
+                self._queue.task_done()
+
+            logger.info(
+                f"✅ [worker-{idx}] Trabajo {job.id} {job.status} | "
+                f"tiempos={ {k: round(v, 2) for k, v in job.timings.items()} }"
+            )
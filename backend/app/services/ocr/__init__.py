@@ -1,26 +1,170 @@
 import logging
-import easyocr
-import torch
 
+from typing import Optional
+
+from backend.app.core.config import settings
+from backend.app.core.resources import resource_governor
 from .ocr_service import OCRService
 from .normalizer_service import NormalizerService
+from .ocr_executor import OCRExecutor, OCRBusyError
+from .memory_budget import ImageMemoryBudget
+from .ocr_process_pool import OCRProcessPool
+from .ocr_batcher import OCRBatcher
+from .barcode_service import BarcodeService
+from .ocr_cache import OCRResultCache
+from .model_store import ModelStore, ModelStoreError, load_reader
 
 logger = logging.getLogger(__name__)
 
-logger.info("🔧 Inicializando EasyOCR...")
+# ========================================
+# FÁBRICAS (las usa el ServiceRegistry de backend.app.services)
+# ========================================
+# Nada de torch/EasyOCR se importa hasta que se crea el primer servicio de OCR
+
+
+def service_options() -> dict:
+    """Parámetros del procesamiento por imagen (local o en cada worker)"""
+    return {
+        "blur_threshold": settings.OCR_BLUR_THRESHOLD,
+        "blur_thumbnail_dim": settings.OCR_BLUR_THUMBNAIL_DIM,
+        "coarse_dim": settings.OCR_COARSE_DIM if settings.OCR_COARSE_TO_FINE else 0,
+        "refine_confidence": settings.OCR_REFINE_CONFIDENCE,
+        "default_profile": settings.OCR_DEFAULT_PROFILE,
+        "view_profiles": settings.OCR_VIEW_PROFILES,
+        "fast_engine": settings.OCR_FAST_ENGINE,
+        "fast_engine_min_confidence": settings.OCR_FAST_ENGINE_MIN_CONFIDENCE,
+    }
+
+
+def create_image_memory_budget() -> ImageMemoryBudget:
+    return ImageMemoryBudget(settings.OCR_IMAGE_MEMORY_MB * 1024 * 1024)
+
+
+def create_ocr_cache() -> Optional[OCRResultCache]:
+    if not settings.OCR_CACHE:
+        return None
+    return OCRResultCache(
+        settings.OCR_CACHE_DIR,
+        max_bytes=settings.OCR_CACHE_MAX_MB * 1024 * 1024,
+        max_distance=settings.OCR_CACHE_MAX_DISTANCE
+    )
+
+
+def create_model_store() -> Optional[ModelStore]:
+    """
+    Almacén verificado, o None: sin OCR_MODEL_DIR o con modelos ausentes o
+    corruptos el OCR usa la carga normal de EasyOCR.
+    """
+    if not settings.OCR_MODEL_DIR:
+        return None
+    store = ModelStore(settings.OCR_MODEL_DIR, mmap=settings.OCR_MODEL_MMAP)
+    # Los checksums se verifican aquí una vez, no en cada worker
+    if not store.check():
+        logger.warning(
+            f"⚠️ Almacén de modelos no válido en {store.directory}, "
+            f"se usa la carga normal de EasyOCR"
+        )
+        return None
+    return store
 
-try:
-    reader = easyocr.Reader(['en', 'es'], gpu=torch.backends.mps.is_available(), verbose=False)
-except Exception as e:
-    logger.error(f"❌ Error inicializando EasyOCR: {e}")
+
+def create_ocr_pool(model_store: Optional[ModelStore] = None) -> Optional[OCRProcessPool]:
+    """Pool de procesos (los Reader se cargan al llamar start()), o None"""
+    # Hilos de torch/OpenCV del proceso principal antes de cargar modelos
+    resource_governor.apply()
+    if not settings.OCR_PROCESS_POOL:
+        return None
+
+    import torch
+
+    return OCRProcessPool(
+        processes=resource_governor.ocr_processes,
+        threads_per_process=resource_governor.ocr_threads,
+        languages=['en', 'es'],
+        gpu=torch.backends.mps.is_available(),
+        start_method=settings.OCR_POOL_START_METHOD,
+        service_options=service_options(),
+        onnx_dir=settings.OCR_ONNX_DIR if settings.OCR_ONNX else "",
+        model_dir=str(model_store.directory) if model_store else "",
+        model_mmap=settings.OCR_MODEL_MMAP
+    )
+
+
+def create_ocr_service(
+    pool: Optional[OCRProcessPool],
+    memory_budget: ImageMemoryBudget,
+    cache: Optional[OCRResultCache],
+    model_store: Optional[ModelStore] = None
+) -> Optional[OCRService]:
+    """
+    OCRService con su batcher. Sin pool, carga un Reader local.
+
+    Returns:
+        El servicio, o None si EasyOCR no se pudo inicializar
+    """
+    logger.info("🔧 Inicializando EasyOCR...")
     reader = None
+    if pool is None:
+        try:
+            import torch
+            from . import onnx_backend
+
+            gpu = torch.backends.mps.is_available()
+            if model_store:
+                reader = model_store.create_reader(['en', 'es'], gpu=gpu)
+            else:
+                reader = load_reader(['en', 'es'], gpu=gpu)
+            if settings.OCR_ONNX:
+                onnx_backend.install(reader, settings.OCR_ONNX_DIR)
+        except Exception as e:
+            logger.error(f"❌ Error inicializando EasyOCR: {e}")
+            return None
+
+    service = OCRService(
+        reader,
+        memory_budget=memory_budget,
+        pool=pool,
+        cache=cache,
+        cache_views=settings.OCR_CACHE_VIEWS,
+        view_executor=resource_governor.executor("views"),
+        **service_options()
+    )
+    if settings.OCR_BATCHING:
+        service.batcher = OCRBatcher(
+            run_batch=pool.extract_batch if pool else service.extract_batch,
+            max_batch=settings.OCR_BATCH_MAX_IMAGES,
+            window_ms=settings.OCR_BATCH_WINDOW_MS,
+            # Un lote por proceso; con Reader local, uno a la vez
+            concurrency=pool.processes if pool else 1
+        )
+    logger.info("✅ OCR services inicializados")
+    return service
+
 
-ocr_service = OCRService(reader) if reader else None
-normalizer_service = NormalizerService()
+def create_ocr_executor() -> OCRExecutor:
+    return OCRExecutor(
+        max_concurrency=resource_governor.ocr_concurrency,
+        max_queue=settings.OCR_MAX_QUEUE,
+        retry_after=settings.OCR_RETRY_AFTER
+    )
 
-logger.info("✅ OCR services inicializados")
 
 __all__ = [
-    "ocr_service",
-    "normalizer_service"
-]
\ No newline at end of file
+    "OCRService",
+    "NormalizerService",
+    "BarcodeService",
+    "OCRExecutor",
+    "OCRProcessPool",
+    "OCRBatcher",
+    "OCRResultCache",
+    "ModelStore",
+    "ModelStoreError",
+    "ImageMemoryBudget",
+    "OCRBusyError",
+    "create_image_memory_budget",
+    "create_ocr_cache",
+    "create_model_store",
+    "create_ocr_pool",
+    "create_ocr_service",
+    "create_ocr_executor",
+]
@@ -0,0 +1,79 @@
+import logging
+import threading
+import time
+import cv2
+
+from typing import Dict, List, Optional
+from .image_decoder import ImageDecoder
+
+logger = logging.getLogger(__name__)
+
+# Códigos de producto (GTIN) que se pueden buscar en Product.barcode
+GTIN_TYPES = {"EAN_13", "EAN_8", "UPC_A", "UPC_E"}
+
+
+class BarcodeService:
+    """
+    Lectura de códigos de barras con el BarcodeDetector de OpenCV.
+
+    Corre antes del OCR: si una vista trae un EAN/UPC legible y el producto
+    ya existe, el escaneo no necesita EasyOCR ni el LLM.
+    """
+
+    def __init__(self, decoder: Optional[ImageDecoder] = None):
+        self.decoder = decoder or ImageDecoder()
+        # BarcodeDetector no es thread-safe: uno por hilo
+        self._local = threading.local()
+
+    def _detector(self):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = cv2.barcode.BarcodeDetector()
+        return detector
+
+    def detect(self, image_buffers: Dict[str, bytes]) -> Optional[str]:
+        """
+        Busca un EAN/UPC en las vistas (bytes JPEG/PNG).
+
+        Returns:
+            Primer código válido encontrado, o None
+        """
+        start = time.time()
+        for img_type, data in image_buffers.items():
+            img = self.decoder.decode(data)
+            if img is None:
+                continue
+
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            try:
+                found, codes, kinds, _ = self._detector().detectAndDecodeWithType(gray)
+            except cv2.error as e:
+                logger.warning(f"[BARCODE][{img_type}] Error de detección: {e}")
+                continue
+
+            if not found:
+                continue
+
+            for code, kind in zip(codes, kinds):
+                code = code.strip()
+                if kind in GTIN_TYPES and code.isdigit():
+                    logger.info(
+                        f"[BARCODE][{img_type}] ✅ {kind} {code} | "
+                        f"{time.time() - start:.3f}s"
+                    )
+                    return code
+
+        logger.info(f"[BARCODE] Sin código legible | {time.time() - start:.3f}s")
+        return None
+
+    @staticmethod
+    def variants(code: str) -> List[str]:
+        """
+        Formas equivalentes del mismo GTIN para buscar en BD:
+        UPC-A (12) ↔ EAN-13 con 0 inicial
+        """
+        if len(code) == 12:
+            return [code, "0" + code]
+        if len(code) == 13 and code.startswith("0"):
+            return [code, code[1:]]
+        return [code]
@@ -0,0 +1,118 @@
+import logging
+import cv2
+import numpy as np
+
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marcadores SOF de JPEG (excepto DHT=C4, JPG=C8, DAC=CC)
+_JPEG_SOF_MARKERS = {
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF
+}
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Factor de reducción → flag de OpenCV (libjpeg decodifica directo a escala)
+_REDUCED_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+
+class ImageDecoder:
+    """
+    Decodificación a resolución reducida.
+
+    Lee el tamaño desde la cabecera (JPEG/PNG) sin decodificar píxeles y
+    elige el IMREAD_REDUCED_* más agresivo que aún deje el lado mayor
+    >= target_dim, que es el tamaño al que el OCR redimensiona igual.
+
+    EJEMPLO:
+        4032x3024 con target 1600 → REDUCED_2 → 2016x1512
+        (9 MB de BGR en lugar de 36 MB)
+    """
+
+    def __init__(self, target_dim: int = 1600):
+        self.target_dim = target_dim
+
+    def dimensions(self, data: bytes) -> Optional[Tuple[int, int]]:
+        """(ancho, alto) según la cabecera, o None si no se reconoce"""
+        if data[:8] == _PNG_SIGNATURE and len(data) >= 24:
+            return (
+                int.from_bytes(data[16:20], "big"),
+                int.from_bytes(data[20:24], "big")
+            )
+        if data[:2] == b"\xff\xd8":
+            return self._jpeg_dimensions(data)
+        return None
+
+    def _jpeg_dimensions(self, data: bytes) -> Optional[Tuple[int, int]]:
+        i = 2
+        size = len(data)
+        while i + 9 < size:
+            if data[i] != 0xFF:
+                i += 1
+                continue
+            marker = data[i + 1]
+            # Relleno o marcadores sin longitud
+            if marker == 0xFF:
+                i += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                i += 2
+                continue
+            segment_len = int.from_bytes(data[i + 2:i + 4], "big")
+            if marker in _JPEG_SOF_MARKERS:
+                height = int.from_bytes(data[i + 5:i + 7], "big")
+                width = int.from_bytes(data[i + 7:i + 9], "big")
+                return width, height
+            i += 2 + segment_len
+        return None
+
+    def reduction_factor(self, dims: Optional[Tuple[int, int]]) -> int:
+        if not dims:
+            return 1
+        max_side = max(dims)
+        for factor, _ in _REDUCED_FLAGS:
+            if max_side // factor >= self.target_dim:
+                return factor
+        return 1
+
+    def estimate_bytes(self, dims: Optional[Tuple[int, int]], encoded_size: int) -> int:
+        """
+        Memoria aproximada mientras se procesa la imagen:
+        BGR decodificado + copias de preprocesamiento (≈ x2).
+        """
+        if not dims:
+            # Sin cabecera: JPEG típico comprime ~10:1
+            return encoded_size * 10
+        factor = self.reduction_factor(dims)
+        width, height = dims[0] // factor, dims[1] // factor
+        return width * height * 3 * 2
+
+    def decode(self, data: bytes, dims: Optional[Tuple[int, int]] = None):
+        """Decodifica con el factor de reducción adecuado (None si falla)"""
+        if dims is None:
+            dims = self.dimensions(data)
+        factor = self.reduction_factor(dims)
+        flag = dict(_REDUCED_FLAGS).get(factor, cv2.IMREAD_COLOR)
+
+        buffer = np.frombuffer(memoryview(data), dtype=np.uint8)
+        img = cv2.imdecode(buffer, flag)
+
+        if img is not None and factor > 1:
+            logger.debug(
+                f"[DECODE] {dims[0]}x{dims[1]} → {img.shape[1]}x{img.shape[0]} "
+                f"(REDUCED_{factor})"
+            )
+        return img
+
+    def thumbnail(self, image, max_dim: int):
+        """Miniatura con INTER_AREA (solo reduce)"""
+        height, width = image.shape[:2]
+        if max(height, width) <= max_dim:
+            return image
+        scale = max_dim / max(height, width)
+        return cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
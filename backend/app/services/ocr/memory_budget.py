@@ -0,0 +1,52 @@
+import logging
+import threading
+
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class ImageMemoryBudget:
+    """
+    Presupuesto de memoria por proceso para imágenes en vuelo.
+
+    Cada imagen reserva su tamaño estimado antes de decodificarse y lo
+    libera al terminar el OCR. Si no hay espacio, el hilo espera.
+    Una imagen más grande que todo el presupuesto pasa sola.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._in_use = 0
+        self._peak = 0
+        self._waits = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        with self._cond:
+            if self._in_use and self._in_use + nbytes > self.budget_bytes:
+                self._waits += 1
+                logger.debug(
+                    f"[MEM] Esperando presupuesto | pide={nbytes / 1e6:.1f}MB | "
+                    f"en_uso={self._in_use / 1e6:.1f}MB"
+                )
+            while self._in_use and self._in_use + nbytes > self.budget_bytes:
+                self._cond.wait()
+            self._in_use += nbytes
+            self._peak = max(self._peak, self._in_use)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_use -= nbytes
+                self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        return {
+            "budget_mb": round(self.budget_bytes / 1e6, 1),
+            "in_use_mb": round(self._in_use / 1e6, 1),
+            "peak_mb": round(self._peak / 1e6, 1),
+            "waits": self._waits,
+        }
@@ -0,0 +1,288 @@
+"""
+Almacén local de modelos de EasyOCR
+===================================
+
+Los pesos del detector CRAFT y del reconocedor se empaquetan una sola vez
+en una carpeta local, con un manifest.json de checksums (sha256). En el
+arranque no se descarga nada: EasyOCR se crea con download_enabled=False
+sobre esa carpeta y el manifest se verifica antes de cargar.
+
+Además de los .pth originales (EasyOCR les comprueba el md5), el
+empaquetado guarda una copia de cada state_dict en formato zip de torch
+(carpeta mmap/). Tras crear el Reader, sus parámetros se reasignan a esos
+tensores abiertos con torch.load(mmap=True): las páginas las comparte el
+page cache del sistema entre todos los workers de uvicorn y los procesos
+del pool de OCR, en lugar de una copia privada por proceso. Las capas que
+quantize_dynamic reemplaza (LSTM/Linear del reconocedor) siguen privadas.
+
+Empaquetar una vez por build/deploy (con red):
+    python -m backend.app.services.ocr.model_store models/easyocr
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+MMAP_DIR = "mmap"
+
+
+class ModelStoreError(Exception):
+    """Modelos ausentes, corruptos o sin empaquetar"""
+    pass
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _strip_module_prefix(state: Dict) -> Dict:
+    # Los .pth de EasyOCR vienen de DataParallel ("module.xxx")
+    return {
+        (key[len("module."):] if key.startswith("module.") else key): value
+        for key, value in state.items()
+    }
+
+
+class ModelStore:
+    """
+    Carpeta local de modelos de EasyOCR con checksums y pesos mapeados.
+
+    Args:
+        directory: Carpeta del almacén (model_storage_directory de EasyOCR)
+        mmap: Reasignar los pesos a tensores mapeados desde disco
+    """
+
+    def __init__(self, directory: str, mmap: bool = True):
+        self.directory = Path(directory)
+        self.mmap = mmap
+        self._verified: Optional[bool] = None
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / MANIFEST_FILE
+
+    def manifest(self) -> Dict:
+        """
+        Raises:
+            ModelStoreError: Si el almacén no está empaquetado
+        """
+        if not self.manifest_path.exists():
+            raise ModelStoreError(
+                f"No hay {MANIFEST_FILE} en {self.directory}; empaqueta los modelos con: "
+                f"python -m backend.app.services.ocr.model_store {self.directory}"
+            )
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def verify(self) -> Dict:
+        """
+        Comprueba tamaño y sha256 de cada fichero del manifest.
+
+        Returns:
+            El manifest
+
+        Raises:
+            ModelStoreError: Si falta un fichero o no coincide el checksum
+        """
+        manifest = self.manifest()
+        for name, expected in manifest["files"].items():
+            path = self.directory / name
+            if not path.exists():
+                raise ModelStoreError(f"Falta el modelo {path}")
+            if path.stat().st_size != expected["bytes"] or _sha256(path) != expected["sha256"]:
+                raise ModelStoreError(f"Checksum inválido en {path}, vuelve a empaquetar los modelos")
+        return manifest
+
+    def check(self) -> bool:
+        """verify() una sola vez por proceso; False (y log) si falla"""
+        with self._lock:
+            if self._verified is None:
+                start = time.time()
+                try:
+                    manifest = self.verify()
+                    self._verified = True
+                    logger.info(
+                        f"✅ Modelos OCR verificados | {self.directory} | "
+                        f"{len(manifest['files'])} ficheros | {time.time() - start:.2f}s"
+                    )
+                except ModelStoreError as e:
+                    self._verified = False
+                    logger.error(f"❌ {e}")
+            return self._verified
+
+    def create_reader(self, languages: List[str], gpu: bool = False, verify: bool = True, **kwargs):
+        """
+        easyocr.Reader sobre el almacén, sin descargas y con pesos mapeados.
+
+        Args:
+            languages: Idiomas del Reader
+            gpu: Usar GPU (los pesos mapeados solo aplican en CPU)
+            verify: Verificar checksums antes (los workers del pool no lo
+                repiten: ya lo hizo el proceso padre)
+
+        Raises:
+            ModelStoreError: Si los modelos no pasan la verificación
+        """
+        import easyocr
+
+        if verify and not self.check():
+            raise ModelStoreError(f"Modelos OCR no válidos en {self.directory}")
+
+        reader = easyocr.Reader(
+            languages,
+            gpu=gpu,
+            model_storage_directory=str(self.directory),
+            download_enabled=False,
+            verbose=False,
+            **kwargs
+        )
+        if self.mmap:
+            self.share_weights(reader)
+        return reader
+
+    def share_weights(self, reader) -> int:
+        """
+        Reasigna los pesos del detector y del reconocedor a tensores
+        mapeados desde mmap/ (copy-on-write, compartidos entre procesos).
+
+        Returns:
+            Bytes de pesos ahora mapeados (0 si no aplica)
+        """
+        import torch
+
+        if reader.device != "cpu":
+            return 0
+        entry = self.manifest().get("models", {}).get(reader.model_lang)
+        if not entry:
+            logger.warning(f"⚠️ Sin pesos mapeables para '{reader.model_lang}' en {self.directory}")
+            return 0
+
+        total = 0
+        for attr in ("detector", "recognizer"):
+            module = getattr(reader, attr, None)
+            if not isinstance(module, torch.nn.Module):
+                continue
+            state = torch.load(
+                str(self.directory / entry[attr]), map_location="cpu", mmap=True, weights_only=True
+            )
+            own = module.state_dict()
+            # Solo tensores que siguen en float: lo que quantize_dynamic
+            # reemplazó tiene otras claves y se queda como está
+            mapped = {
+                key: value for key, value in state.items()
+                if key in own and own[key].shape == value.shape and own[key].dtype == value.dtype
+            }
+            module.load_state_dict(mapped, strict=False, assign=True)
+            total += sum(value.numel() * value.element_size() for value in mapped.values())
+
+        logger.info(f"🗺️ Pesos OCR mapeados desde disco | {total / 1e6:.1f}MB compartidos")
+        return total
+
+    def bundle(self, languages: List[str]) -> Dict:
+        """
+        Descarga los modelos de los idiomas, guarda las copias para mmap y
+        reescribe el manifest (se puede repetir para otros idiomas).
+
+        Returns:
+            El manifest escrito
+        """
+        import easyocr
+        import torch
+        from easyocr.config import detection_models, recognition_models
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / MMAP_DIR).mkdir(exist_ok=True)
+
+        reader = easyocr.Reader(
+            languages,
+            gpu=False,
+            model_storage_directory=str(self.directory),
+            download_enabled=True,
+            quantize=False,
+            verbose=False
+        )
+        recognizer_file = next(
+            model["filename"]
+            for generation in recognition_models.values()
+            for model in generation.values()
+            if model["characters"] == reader.character
+        )
+        originals = {
+            "detector": detection_models[reader.detect_network]["filename"],
+            "recognizer": recognizer_file,
+        }
+
+        manifest = self.manifest() if self.manifest_path.exists() else {"files": {}, "models": {}}
+        entry = {}
+        for attr, filename in originals.items():
+            state = _strip_module_prefix(torch.load(str(self.directory / filename), map_location="cpu"))
+            mapped_name = f"{MMAP_DIR}/{Path(filename).stem}.pt"
+            torch.save(state, str(self.directory / mapped_name))
+            entry[attr] = mapped_name
+            for name in (filename, mapped_name):
+                path = self.directory / name
+                manifest["files"][name] = {"sha256": _sha256(path), "bytes": path.stat().st_size}
+
+        manifest["models"][reader.model_lang] = entry
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        self._verified = None
+        logger.info(f"📦 Modelos empaquetados | {reader.model_lang} | {self.directory}")
+        return manifest
+
+
+def load_reader(
+    languages: List[str],
+    gpu: bool = False,
+    model_dir: str = "",
+    mmap: bool = True,
+    verify: bool = True
+):
+    """
+    Reader de EasyOCR: desde el almacén local si hay model_dir, o con la
+    carga por defecto de EasyOCR (~/.EasyOCR, con descarga) si no.
+    """
+    if model_dir:
+        return ModelStore(model_dir, mmap=mmap).create_reader(languages, gpu=gpu, verify=verify)
+
+    import easyocr
+    return easyocr.Reader(languages, gpu=gpu, verbose=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Empaqueta los modelos de EasyOCR para uso offline")
+    parser.add_argument("model_dir", nargs="?", default="models/easyocr")
+    parser.add_argument("--languages", nargs="+", default=["en", "es"])
+    parser.add_argument("--verify", action="store_true", help="Solo verificar checksums")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = ModelStore(args.model_dir)
+    try:
+        manifest = store.verify() if args.verify else store.bundle(args.languages)
+    except ModelStoreError as e:
+        print(e)
+        return 1
+    for name, info in manifest["files"].items():
+        print(f"{name}: {info['bytes'] / 1e6:.1f}MB sha256={info['sha256'][:12]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import logging
+import queue
+import threading
+import time
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BatchRunner = Callable[[List[Tuple[str, bytes]]], List[Tuple[str, Dict]]]
+
+
+class OCRBatcher:
+    """
+    Agrupa imágenes en lotes para EasyOCR (readtext_batched).
+
+    Junta las vistas de un escaneo y las de escaneos concurrentes que
+    lleguen dentro de una ventana corta (window_ms), hasta max_batch
+    imágenes. Cada imagen recibe su propio Future, así el resultado vuelve
+    a quien la pidió aunque el lote mezcle varias solicitudes.
+
+    - concurrency: lotes en ejecución a la vez (procesos del pool, o 1 con
+      un Reader local). Mientras no hay hueco, las imágenes se siguen
+      acumulando, así que con carga los lotes crecen solos.
+    """
+
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        max_batch: int = 6,
+        window_ms: int = 30,
+        concurrency: int = 1
+    ):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.concurrency = concurrency
+
+        self._queue: "queue.Queue[Optional[Tuple[str, bytes, Future]]]" = queue.Queue()
+        self._slots = threading.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency,
+            thread_name_prefix="ocr-batch"
+        )
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._batches = 0
+        self._images = 0
+        self._largest = 0
+
+    def submit(self, img_type: str, data: bytes) -> Future:
+        """Encola una imagen; el Future resuelve a su dict de resultado"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((img_type, data, future))
+        return future
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._collect_loop,
+                    name="ocr-batcher",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _collect_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            # Esperar hueco antes de abrir la ventana: con los workers ocupados
+            # las imágenes que llegan se suman a este lote
+            self._slots.acquire()
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            stop = False
+
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._executor.submit(self._run, batch)
+            if stop:
+                break
+
+    def _run(self, batch: List[Tuple[str, bytes, Future]]):
+        try:
+            self._batches += 1
+            self._images += len(batch)
+            self._largest = max(self._largest, len(batch))
+            logger.debug(f"[OCR] Ejecutando lote | imagenes={len(batch)}")
+
+            results = self.run_batch([(img_type, data) for img_type, data, _ in batch])
+            for (_, _, future), (_, result) in zip(batch, results):
+                future.set_result(result)
+        except Exception as e:
+            logger.error(f"❌ Error en lote OCR: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self._batches,
+            "images": self._images,
+            "avg_batch_size": round(self._images / self._batches, 2) if self._batches else 0.0,
+            "largest_batch": self._largest,
+            "queued": self._queue.qsize(),
+        }
+
+    def shutdown(self):
+        self._queue.put(None)
+        self._executor.shutdown(wait=False)
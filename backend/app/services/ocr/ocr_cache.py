@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import threading
+import time
+import cv2
+import numpy as np
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OCRResultCache:
+    """
+    Caché en disco de resultados de OCR por hash perceptual (pHash).
+
+    El personal fotografía el mismo SKU varias veces por turno: dos fotos
+    de la misma cara no son idénticas byte a byte, pero su pHash queda a
+    pocos bits de distancia. Un hit dentro de `max_distance` (Hamming)
+    devuelve el dict que habría producido el OCR, sin pasar por EasyOCR.
+
+    - Una entrada = un archivo JSON `<vista>__<variante>__<hash>.json`
+    - La vista y la variante (perfil + huella de la configuración de OCR,
+      ver OCRService.cache_variant) forman parte de la clave: solo se
+      compara contra resultados obtenidos con el mismo preprocesamiento
+      y el mismo motor
+    - Qué vistas se guardan lo decide OCRService (sin lote ni vencimiento)
+    - LRU por mtime (se actualiza en cada hit) con tope de tamaño en disco
+    """
+
+    HASH_SIZE = 8      # 8x8 coeficientes → hash de 64 bits
+    DCT_SIZE = 32
+
+    def __init__(self, directory: str, max_bytes: int, max_distance: int = 4):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+
+        # nombre de archivo → {"view", "profile", "hash", "size"}
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+        self._load_index()
+
+    # ========================================
+    # HASH
+    # ========================================
+    @classmethod
+    def phash(cls, data: bytes) -> Optional[int]:
+        """
+        pHash de 64 bits de una imagen codificada (JPEG/PNG).
+
+        Se decodifica en grises a 1/8 (el hash solo mira frecuencias bajas),
+        se reduce a 32x32 y se toman los 8x8 coeficientes DCT de menor
+        frecuencia comparados contra su mediana.
+        """
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        gray = cv2.imdecode(buffer, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if gray is None:
+            return None
+
+        small = cv2.resize(gray, (cls.DCT_SIZE, cls.DCT_SIZE), interpolation=cv2.INTER_AREA)
+        dct = cv2.dct(np.float32(small))[:cls.HASH_SIZE, :cls.HASH_SIZE]
+        # El coeficiente DC (brillo medio) no entra en la mediana
+        median = np.median(dct.flatten()[1:])
+        value = 0
+        for bit in (dct.flatten() > median):
+            value = (value << 1) | int(bit)
+        return value
+
+    # ========================================
+    # CONSULTA / REGISTRO
+    # ========================================
+    def get(self, view: str, profile: str, image_hash: int) -> Optional[Dict]:
+        """Resultado de OCR de la imagen más cercana dentro de max_distance, o None"""
+        with self._lock:
+            best_name, best_distance = None, self.max_distance + 1
+            for name, entry in self._entries.items():
+                if entry["view"] != view or entry["profile"] != profile:
+                    continue
+                distance = (entry["hash"] ^ image_hash).bit_count()
+                if distance < best_distance:
+                    best_name, best_distance = name, distance
+
+            if best_name is None:
+                self._misses += 1
+                return None
+
+            try:
+                path = self.directory / best_name
+                result = json.loads(path.read_text(encoding="utf-8"))
+                os.utime(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"[OCR-CACHE] Entrada ilegible, se descarta | {best_name}: {e}")
+                self._remove(best_name)
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(best_name)
+            self._hits += 1
+
+        logger.info(f"[OCR-CACHE][{view}] ♻️ Hit | perfil={profile} | distancia={best_distance}")
+        result["cache_hit"] = True
+        result["cache_distance"] = best_distance
+        return result
+
+    def put(self, view: str, profile: str, image_hash: int, result: Dict):
+        """Guarda un resultado de OCR. No se guardan imágenes borrosas ni sin texto"""
+        if not result.get("text") or result.get("blur_detected"):
+            return
+
+        name = f"{view}__{profile}__{image_hash:016x}.json"
+        payload = json.dumps(result, ensure_ascii=False, default=float).encode("utf-8")
+
+        with self._lock:
+            try:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                tmp = self.directory / f".{name}.tmp"
+                tmp.write_bytes(payload)
+                os.replace(tmp, self.directory / name)
+            except OSError as e:
+                logger.warning(f"[OCR-CACHE] No se pudo guardar {name}: {e}")
+                return
+
+            previous = self._entries.pop(name, None)
+            if previous:
+                self._bytes -= previous["size"]
+            self._entries[name] = {
+                "view": view,
+                "profile": profile,
+                "hash": image_hash,
+                "size": len(payload),
+            }
+            self._bytes += len(payload)
+            self._stores += 1
+            self._evict()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self._bytes / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+                "stores": self._stores,
+                "evictions": self._evictions,
+            }
+
+    # ========================================
+    # ÍNDICE Y DESALOJO
+    # ========================================
+    def _load_index(self):
+        """Reconstruye el índice LRU desde disco (más antiguo primero por mtime)"""
+        if not self.directory.is_dir():
+            return
+
+        start = time.time()
+        files = []
+        for path in self.directory.glob("*.json"):
+            parts = path.stem.split("__")
+            if len(parts) != 3:
+                continue
+            try:
+                stat = path.stat()
+                files.append((stat.st_mtime, path.name, parts, stat.st_size))
+            except OSError:
+                continue
+
+        for _, name, (view, profile, hex_hash), size in sorted(files):
+            try:
+                image_hash = int(hex_hash, 16)
+            except ValueError:
+                continue
+            self._entries[name] = {"view": view, "profile": profile, "hash": image_hash, "size": size}
+            self._bytes += size
+
+        with self._lock:
+            self._evict()
+        logger.info(
+            f"[OCR-CACHE] Índice cargado | entradas={len(self._entries)} | "
+            f"{self._bytes / 1024:.1f}KB | {time.time() - start:.3f}s"
+        )
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            name = next(iter(self._entries))
+            self._remove(name)
+            self._evictions += 1
+
+    def _remove(self, name: str):
+        entry = self._entries.pop(name, None)
+        if entry:
+            self._bytes -= entry["size"]
+        try:
+            (self.directory / name).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"[OCR-CACHE] No se pudo borrar {name}: {e}")
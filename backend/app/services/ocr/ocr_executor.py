@@ -0,0 +1,135 @@
+import asyncio
+import functools
+import logging
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class OCRBusyError(Exception):
+    """El executor de OCR está saturado (cola de espera llena)"""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"OCR saturado, reintentar en {retry_after}s")
+
+
+class OCRSlot:
+    """
+    Turno de un escaneo en el executor de OCR.
+
+    Se admite una sola vez (cola acotada, OCRBusyError si está llena) y
+    todas sus vistas corren dentro del mismo turno con run(). El semáforo
+    se pide con la primera vista, así la admisión no bloquea (la ingesta
+    en streaming sigue leyendo el body mientras espera turno).
+    release() es idempotente.
+    """
+
+    def __init__(self, executor: "OCRExecutor"):
+        self._executor = executor
+        self._acquire: Optional[asyncio.Future] = None
+        self._released = False
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        if self._released:
+            raise RuntimeError("Turno de OCR ya liberado")
+        if self._acquire is None:
+            self._acquire = asyncio.ensure_future(self._executor._semaphore.acquire())
+        # shield: cancelar una vista no cancela el turno de las demás
+        await asyncio.shield(self._acquire)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor._executor,
+            functools.partial(fn, *args, **kwargs)
+        )
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        self._executor._pending -= 1
+        if self._acquire is None:
+            return
+        if self._acquire.done():
+            if not self._acquire.cancelled() and self._acquire.exception() is None:
+                self._executor._semaphore.release()
+        else:
+            self._acquire.cancel()
+
+
+class OCRExecutor:
+    """
+    Executor compartido para EasyOCR, fuera del event loop.
+
+    - max_concurrency: escaneos ejecutando OCR al mismo tiempo
+    - max_queue: escaneos esperando turno; por encima se rechaza de inmediato
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 4, retry_after: int = 5):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="ocr"
+        )
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending = 0  # en ejecución + en espera
+        self._rejected = 0
+
+    def has_capacity(self) -> bool:
+        return self._pending < self.max_concurrency + self.max_queue
+
+    def admit(self, wait: bool = False) -> OCRSlot:
+        """
+        Admite un escaneo y reserva su lugar en la cola (sin esperar turno).
+
+        Args:
+            wait: True → admitir aunque la cola esté llena
+                  (workers de trabajos, que ya tienen su propia cola)
+
+        Raises:
+            OCRBusyError: Si la cola está llena y wait=False
+        """
+        if not wait and not self.has_capacity():
+            self._rejected += 1
+            logger.warning(
+                f"🚦 OCR saturado | pendientes={self._pending} | "
+                f"limite={self.max_concurrency + self.max_queue}"
+            )
+            raise OCRBusyError(self.retry_after)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self._pending += 1
+        return OCRSlot(self)
+
+    async def run(self, fn: Callable[..., Any], *args, wait: bool = False, **kwargs) -> Any:
+        """
+        Ejecuta `fn` en el pool de OCR como un escaneo de una sola llamada.
+
+        Raises:
+            OCRBusyError: Si la cola está llena y wait=False
+        """
+        slot = self.admit(wait=wait)
+        try:
+            return await slot.run(fn, *args, **kwargs)
+        finally:
+            slot.release()
+
+    def stats(self) -> Dict:
+        running = min(self._pending, self.max_concurrency)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "running": running,
+            "waiting": self._pending - running,
+            "rejected": self._rejected,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
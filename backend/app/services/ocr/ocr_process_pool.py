@@ -0,0 +1,228 @@
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from backend.app.core.resources import available_cores
+
+logger = logging.getLogger(__name__)
+
+# OCRService propio de cada proceso worker (con su Reader precargado)
+_worker_service = None
+
+
+def _init_worker(
+    languages: List[str],
+    gpu: bool,
+    threads: int,
+    service_options: Dict,
+    onnx_dir: str = "",
+    model_dir: str = "",
+    model_mmap: bool = True
+):
+    """Initializer del proceso: carga EasyOCR una sola vez"""
+    global _worker_service
+
+    import cv2
+    import torch
+    from .model_store import load_reader
+    from .ocr_service import OCRService
+
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+
+    # El padre ya verificó los checksums del almacén
+    reader = load_reader(languages, gpu=gpu, model_dir=model_dir, mmap=model_mmap, verify=False)
+    if onnx_dir:
+        from . import onnx_backend
+        onnx_backend.install(reader, onnx_dir, threads=threads)
+    _worker_service = OCRService(reader, **service_options)
+    logger.info(f"🔧 Worker OCR listo | pid={os.getpid()} | hilos={threads}")
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Abre el segmento sin registrarlo en el resource_tracker: el dueño es
+    el proceso padre, que hace unlink. Antes de 3.13 no hay track=False
+    y el worker lo registraría como propio (bpo-39959).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _run_in_worker(shm_name: str, entries: List[Tuple[str, int, int]]) -> List[Tuple[str, Dict]]:
+    """
+    OCR en lote sobre los bytes que el proceso padre dejó en memoria
+    compartida. entries: [(img_type, offset, size), ...]
+    """
+    shm = _attach_shared_memory(shm_name)
+    views = [shm.buf[offset:offset + size] for _, offset, size in entries]
+    try:
+        return _worker_service.extract_batch([
+            (img_type, view) for (img_type, _, _), view in zip(entries, views)
+        ])
+    finally:
+        try:
+            for view in views:
+                view.release()
+            shm.close()
+        except BufferError:
+            # Algún array aún apunta al buffer (p.ej. retenido por un traceback);
+            # el mapeo se libera al recolectarse
+            logger.debug("Memoria compartida liberada de forma diferida")
+
+
+class OCRProcessPool:
+    """
+    Pool de procesos para EasyOCR, con un Reader precargado por proceso.
+
+    Cada vista (o lote de vistas) se procesa en un proceso distinto, sin
+    competir por el GIL ni por un único modelo. Los bytes de la imagen
+    viajan por memoria compartida (no se serializan con pickle) y el
+    worker decodifica directamente sobre ese buffer.
+
+    - processes: 0 → automático (núcleos disponibles / 2)
+    - threads_per_process: hilos de torch y OpenCV por proceso;
+      0 → núcleos / processes (normalmente lo fija el ResourceGovernor)
+    """
+
+    def __init__(
+        self,
+        processes: int = 0,
+        languages: Optional[List[str]] = None,
+        gpu: bool = False,
+        start_method: str = "spawn",
+        service_options: Optional[Dict] = None,
+        onnx_dir: str = "",
+        threads_per_process: int = 0,
+        model_dir: str = "",
+        model_mmap: bool = True
+    ):
+        cores = available_cores()
+        self.processes = processes or max(1, cores // 2)
+        self.threads_per_process = threads_per_process or max(1, cores // self.processes)
+        self.languages = languages or ['en', 'es']
+        self.gpu = gpu
+        self.start_method = start_method
+        self._initargs = (
+            self.languages,
+            gpu,
+            self.threads_per_process,
+            # kwargs del OCRService de cada worker (blur, escalera, ...)
+            service_options or {},
+            # Modelos ONNX int8 en lugar de torch ("" = PyTorch)
+            onnx_dir,
+            # Almacén local de modelos ("" = descarga de EasyOCR)
+            model_dir,
+            model_mmap
+        )
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                    initargs=self._initargs
+                )
+            return self._executor
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is broken:
+                self._restarts += 1
+                self._executor = None
+                broken.shutdown(wait=False, cancel_futures=True)
+
+    def start(self) -> bool:
+        """
+        Arranca todos los procesos y espera a que carguen el modelo.
+        Llamar en el arranque de la app para no pagarlo en el primer escaneo.
+        """
+        logger.info(
+            f"🔧 Iniciando pool OCR | procesos={self.processes} | "
+            f"hilos_por_proceso={self.threads_per_process} | metodo={self.start_method}"
+        )
+        executor = self._get_executor()
+        try:
+            # Envíos simultáneos → un proceso nuevo por cada uno
+            futures = [executor.submit(_ping) for _ in range(self.processes)]
+            pids = {future.result() for future in futures}
+        except BrokenProcessPool as e:
+            logger.error(f"❌ Error iniciando workers de EasyOCR: {e}")
+            self._restart(executor)
+            return False
+
+        logger.info(f"✅ Pool OCR listo | pids={sorted(pids)}")
+        return True
+
+    def extract(self, img_type: str, data: bytes) -> Tuple[str, Dict]:
+        """Procesa una imagen en algún worker (bloquea el hilo que llama)"""
+        return self.extract_batch([(img_type, data)])[0]
+
+    def extract_batch(self, items: List[Tuple[str, bytes]]) -> List[Tuple[str, Dict]]:
+        """
+        Procesa un lote en un mismo worker (readtext_batched).
+        Todas las imágenes van en un solo segmento de memoria compartida.
+        """
+        empty = [(img_type, {"text": "", "confidence_avg": 0.0}) for img_type, _ in items]
+        total = sum(len(data) for _, data in items)
+        if not total:
+            return empty
+
+        shm = shared_memory.SharedMemory(create=True, size=total)
+        try:
+            entries = []
+            offset = 0
+            for img_type, data in items:
+                size = len(data)
+                shm.buf[offset:offset + size] = data
+                entries.append((img_type, offset, size))
+                offset += size
+
+            executor = self._get_executor()
+            try:
+                return executor.submit(_run_in_worker, shm.name, entries).result()
+            except BrokenProcessPool as e:
+                logger.error(f"❌ Worker OCR caído | imagenes={len(items)}: {e}")
+                self._restart(executor)
+                return empty
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def stats(self) -> Dict:
+        return {
+            "processes": self.processes,
+            "threads_per_process": self.threads_per_process,
+            "start_method": self.start_method,
+            "restarts": self._restarts,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,126 @@
+import cv2
+import numpy as np
+
+from typing import Dict, List
+
+# ========================================
+# FILTROS (sobre escala de grises)
+# ========================================
+def _clahe(gray):
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+
+
+def _bilateral(gray):
+    return cv2.bilateralFilter(gray, 9, 75, 75)
+
+
+def _sharpen(gray):
+    kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+    return cv2.filter2D(gray, -1, kernel)
+
+
+def _otsu(gray):
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def _denoise(gray):
+    return cv2.fastNlMeansDenoising(gray, h=10)
+
+
+def _morph_close(gray):
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    return cv2.morphologyEx(gray, cv2.MORPH_CLOSE, kernel)
+
+
+FILTERS = {
+    "clahe": _clahe,
+    "bilateral": _bilateral,
+    "sharpen": _sharpen,
+    "otsu": _otsu,
+    "denoise": _denoise,
+    "morph_close": _morph_close,
+}
+
+# ========================================
+# PERFILES
+# ========================================
+# filters: cadena aplicada en orden tras pasar a grises
+# canvas_size / mag_ratio: tamaño de la imagen que ve el detector CRAFT
+# decoder: "greedy" (rápido) o "beamsearch" (más preciso, más lento)
+#
+# Referencia (notebooks/resultados_preprocesamiento.csv, conf / detecciones / tiempo):
+#   Grayscale 0.654 / 23 / 5.90s · CLAHE 0.590 / 23 / 5.32s · Otsu 0.756 / 14 / 4.77s
+# Otsu no es el perfil por defecto: su confianza media es mayor porque solo
+# sobreviven las 14 cajas más nítidas; la binarización pierde 9 de las 23 que
+# encuentra grises (17 palabras frente a 25), justo la letra fina del lote.
+PROFILES: Dict[str, Dict] = {
+    "grayscale": {
+        "filters": [],
+        "canvas_size": 2560,
+        "mag_ratio": 1.0,
+        "decoder": "greedy",
+    },
+    # Comportamiento anterior (CLAHE siempre)
+    "clahe": {
+        "filters": ["clahe"],
+        "canvas_size": 2560,
+        "mag_ratio": 1.0,
+        "decoder": "greedy",
+    },
+    # Texto grande de la cara frontal: detector sobre un canvas menor
+    "fast": {
+        "filters": [],
+        "canvas_size": 1280,
+        "mag_ratio": 1.0,
+        "decoder": "greedy",
+    },
+    "otsu": {
+        "filters": ["otsu"],
+        "canvas_size": 2560,
+        "mag_ratio": 1.0,
+        "decoder": "greedy",
+    },
+    # Letra pequeña y tablas de las caras laterales
+    "small_print": {
+        "filters": ["sharpen", "clahe"],
+        "canvas_size": 2560,
+        "mag_ratio": 1.5,
+        "decoder": "beamsearch",
+    },
+    "bilateral": {
+        "filters": ["bilateral"],
+        "canvas_size": 2560,
+        "mag_ratio": 1.0,
+        "decoder": "greedy",
+    },
+}
+
+
+def get_profile(name: str) -> Dict:
+    """
+    Raises:
+        ValueError: Si el perfil no existe
+    """
+    if name not in PROFILES:
+        raise ValueError(f"Perfil de OCR desconocido: '{name}' (disponibles: {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def apply_filters(gray, filters: List[str]):
+    for name in filters:
+        gray = FILTERS[name](gray)
+    return gray
+
+
+def detect_kwargs(profile: Dict) -> Dict:
+    """Parámetros de detección para readtext / readtext_batched"""
+    return {
+        "canvas_size": profile["canvas_size"],
+        "mag_ratio": profile["mag_ratio"],
+    }
+
+
+def recognize_kwargs(profile: Dict) -> Dict:
+    """Parámetros de reconocimiento (también valen para reader.recognize)"""
+    return {"decoder": profile["decoder"]}
@@ -1,124 +1,460 @@
+import hashlib
+import json
 import logging
 import cv2
 import time
 import re
 
 from backend.app.core.config import settings
-from typing import Dict, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+from contextlib import nullcontext
 from concurrent.futures import ThreadPoolExecutor
+from .image_decoder import ImageDecoder
+from .memory_budget import ImageMemoryBudget
+from .ocr_process_pool import OCRProcessPool
+from .ocr_batcher import OCRBatcher
+from .ocr_cache import OCRResultCache
+from .ocr_engines import EasyOCREngine, create_engine
+from .ocr_profiles import apply_filters, get_profile
 
 
 logger = logging.getLogger(__name__)
 
+# Texto de letra pequeña que vale la pena releer a resolución completa
+SMALL_PRINT_PATTERN = re.compile(r'\b(LOTE?|LOT|VENC|VTO|EXP|CAD|F\.?\s?V|BATCH)', re.IGNORECASE)
+
 class OCRService:
-    def __init__(self, reader):
+    MAX_DIM = 1600
+
+    def __init__(
+        self,
+        reader,
+        memory_budget: Optional[ImageMemoryBudget] = None,
+        blur_threshold: float = 100.0,
+        blur_thumbnail_dim: int = 512,
+        pool: Optional[OCRProcessPool] = None,
+        batcher: Optional[OCRBatcher] = None,
+        cache: Optional[OCRResultCache] = None,
+        cache_views: Optional[List[str]] = None,
+        view_executor: Optional[ThreadPoolExecutor] = None,
+        coarse_dim: int = 0,
+        refine_confidence: float = 0.5,
+        default_profile: str = "grayscale",
+        view_profiles: Optional[Dict[str, str]] = None,
+        fast_engine: str = "",
+        fast_engine_min_confidence: float = 0.75
+    ):
         self.reader = reader 
-        self.engine = "EasyOCR"
+        self.primary = EasyOCREngine(reader) if reader is not None else None
+        self.engine = self.primary.name if self.primary else EasyOCREngine.name
+        # Motor rápido opcional (p.ej. Tesseract): si su confianza no llega
+        # al umbral, la vista se relee con EasyOCR
+        self.fast_engine = create_engine(fast_engine) if fast_engine and reader is not None else None
+        self.fast_engine_name = fast_engine
+        self.fast_engine_min_confidence = fast_engine_min_confidence
+        # Con pool, el OCR corre en procesos worker (cada uno con su Reader)
+        self.pool = pool
+        # Con batcher, las imágenes se agrupan en lotes (readtext_batched)
+        self.batcher = batcher
+        # Caché por pHash: fotos repetidas de la misma cara no pasan por EasyOCR
+        self.cache = cache
+        # Solo vistas sin letra pequeña: el pHash no distingue dos lotes que
+        # cambian solo en "LOTE"/"VENC"
+        self.cache_views = set(cache_views if cache_views is not None else ["front"])
+        # Executor compartido para las vistas de un escaneo (ResourceGovernor);
+        # sin él, un pool por llamada
+        self.view_executor = view_executor
+        self.decoder = ImageDecoder(target_dim=self.MAX_DIM)
+        self.memory_budget = memory_budget
+        self.blur_threshold = blur_threshold
+        self.blur_thumbnail_dim = blur_thumbnail_dim
+        # Escalera de resolución: 0 → una sola pasada a MAX_DIM
+        self.coarse_dim = coarse_dim
+        self.refine_confidence = refine_confidence
+        # Perfil de preprocesamiento/EasyOCR por vista (ver ocr_profiles)
+        self.default_profile = default_profile
+        self.view_profiles = view_profiles or {}
+        for name in [default_profile, *self.view_profiles.values()]:
+            get_profile(name)
+        # Modo progresivo: escaneos resueltos solo con la vista frontal
+        self._front_only = 0
+        self._all_views = 0
     
     def _extract_single_image(self, img_type: str, img_path: str) -> Tuple[str, Dict]:
-        image_start = time.time()
         logger.info(f"[{img_type}] ▶ Iniciando procesamiento | path={img_path}")
 
-        img = cv2.imread(img_path)
-        if img is None:
+        try:
+            with open(img_path, "rb") as f:
+                data = f.read()
+        except OSError:
             logger.error(f"No se pudo leer: {img_path}")
             return img_type, {"text": "", "confidence_avg": 0.0}
-        logger.debug(f"[{img_type}] Dimensiones originales: {img.shape[1]}x{img.shape[0]}")
+        return self.extract_from_buffer(img_type, data)
+
+    def extract_from_buffer(self, img_type: str, data: bytes) -> Tuple[str, Dict]:
+        """
+        OCR de una imagen ya en memoria (bytes JPEG/PNG), sin pasar por disco.
+
+        Decodifica a resolución reducida según la cabecera y reserva su
+        tamaño estimado en el presupuesto de memoria mientras dura el OCR.
+        Si hay batcher, la imagen se suma a un lote; si hay pool de
+        procesos, se envía a un worker. Con caché, una foto casi idéntica
+        a una ya procesada (pHash) devuelve el resultado guardado.
+        """
+        logger.info(f"[{img_type}] ▶ Iniciando procesamiento | bytes={len(data)}")
+        if self.cache is None or img_type not in self.cache_views:
+            return self._extract_uncached(img_type, data)
+
+        variant = self.cache_variant(img_type)
+        image_hash = self.cache.phash(data)
+        if image_hash is None:
+            return self._extract_uncached(img_type, data)
+
+        cached = self.cache.get(img_type, variant, image_hash)
+        if cached is not None:
+            return img_type, cached
+
+        img_type, result = self._extract_uncached(img_type, data)
+        # Una vista con lote o vencimiento no se guarda: la siguiente foto
+        # casi idéntica puede ser de otro lote
+        if not SMALL_PRINT_PATTERN.search(result.get("text", "")):
+            self.cache.put(img_type, variant, image_hash, result)
+        return img_type, result
+
+    def cache_variant(self, img_type: str) -> str:
+        """
+        Perfil + huella de la configuración de OCR, para la clave de la caché.
+
+        Cambiar de motor, de escalera de resolución o activar ONNX produce
+        otra huella: no se reutilizan resultados obtenidos con otra
+        configuración.
+        """
+        profile_name = self.profile_name(img_type)
+        config = {
+            "profile": get_profile(profile_name),
+            "engine": self.engine,
+            "fast_engine": self.fast_engine_name,
+            "fast_engine_min_confidence": self.fast_engine_min_confidence,
+            "coarse_dim": self.coarse_dim,
+            "refine_confidence": self.refine_confidence,
+            "max_dim": self.MAX_DIM,
+            "onnx": settings.OCR_ONNX_DIR if settings.OCR_ONNX else "",
+        }
+        digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:10]
+        return f"{profile_name}-{digest}"
+
+    def _extract_uncached(self, img_type: str, data: bytes) -> Tuple[str, Dict]:
+        image_start = time.time()
+
+        dims = self.decoder.dimensions(data)
+        nbytes = self.decoder.estimate_bytes(dims, len(data))
+        with self._reserve(nbytes):
+            if self.batcher is not None:
+                return img_type, self.batcher.submit(img_type, data).result()
+            if self.pool is not None:
+                return self.pool.extract(img_type, data)
+
+            img = self.decoder.decode(data, dims)
+            if img is None:
+                logger.error(f"No se pudo decodificar la imagen {img_type}")
+                return img_type, {"text": "", "confidence_avg": 0.0}
+            return self._extract_from_array(img_type, img, image_start)
+
+    def _reserve(self, nbytes: int):
+        if self.memory_budget is None:
+            return nullcontext()
+        return self.memory_budget.reserve(nbytes)
+
+    def profile_name(self, img_type: str) -> str:
+        return self.view_profiles.get(img_type, self.default_profile)
+
+    def _extract_from_array(self, img_type: str, img, image_start: float) -> Tuple[str, Dict]:
+        profile_name = self.profile_name(img_type)
+        profile = get_profile(profile_name)
+        enhanced = self._preprocess(img_type, img, profile)
+        if enhanced is None:
+            return img_type, self._blurry_result()
+
+        fast = self._try_fast_engine(img_type, enhanced, profile_name, image_start)
+        if fast is not None:
+            return img_type, fast
+
+        try:
+            ocr_start = time.time()
+            coarse = self._coarse(enhanced)
+            results = self.primary.readtext(coarse, profile)
+            results, refined = self._refine(img_type, enhanced, coarse, results, profile)
+            ocr_time = time.time() - ocr_start
+            parsed = self._parse_results(img_type, results, ocr_time, image_start)
+            parsed["refined_regions"] = refined
+            parsed["profile"] = profile_name
+            parsed["engine"] = self.primary.name
+            return img_type, parsed
+
+        except Exception as e:
+            logger.error(f"❌ Error EasyOCR en {img_type}: {e}")
+            return img_type, {"text": "", "confidence_avg": 0.0}
+
+    def extract_batch(self, items: List[Tuple[str, bytes]]) -> List[Tuple[str, Dict]]:
+        """
+        OCR de varias imágenes en un solo lote de EasyOCR (readtext_batched).
+
+        Las imágenes pueden venir de distintos escaneos; se devuelven en el
+        mismo orden que `items`. readtext_batched exige el mismo tamaño, así
+        que se rellenan (abajo/derecha) hasta el mayor del lote en lugar de
+        deformarlas: las cajas quedan en coordenadas de la imagen original.
+        Se lanza un readtext_batched por perfil presente en el lote.
+        """
+        batch_start = time.time()
+        outputs: List[Optional[Tuple[str, Dict]]] = [None] * len(items)
+        groups: Dict[str, List] = {}
+
+        for index, (img_type, data) in enumerate(items):
+            img = self.decoder.decode(data)
+            if img is None:
+                logger.error(f"No se pudo decodificar la imagen {img_type}")
+                outputs[index] = (img_type, {"text": "", "confidence_avg": 0.0})
+                continue
+            profile_name = self.profile_name(img_type)
+            enhanced = self._preprocess(img_type, img, get_profile(profile_name))
+            if enhanced is None:
+                outputs[index] = (img_type, self._blurry_result())
+                continue
+            fast = self._try_fast_engine(img_type, enhanced, profile_name, batch_start)
+            if fast is not None:
+                outputs[index] = (img_type, fast)
+                continue
+            groups.setdefault(profile_name, []).append((index, img_type, enhanced))
+
+        for profile_name, prepared in groups.items():
+            profile = get_profile(profile_name)
+            coarse = [self._coarse(enhanced) for _, _, enhanced in prepared]
+            height = max(img.shape[0] for img in coarse)
+            width = max(img.shape[1] for img in coarse)
+            canvas = [
+                cv2.copyMakeBorder(
+                    img,
+                    0, height - img.shape[0],
+                    0, width - img.shape[1],
+                    cv2.BORDER_CONSTANT, value=0
+                )
+                for img in coarse
+            ]
+
+            try:
+                ocr_start = time.time()
+                batch_results = self.primary.readtext_batched(canvas, profile)
+                ocr_time = time.time() - ocr_start
+                logger.info(
+                    f"[OCR] Lote ejecutado | perfil={profile_name} | imagenes={len(canvas)} | "
+                    f"canvas={width}x{height} | tiempo={ocr_time:.3f}s"
+                )
+                for (index, img_type, enhanced), small, results in zip(prepared, coarse, batch_results):
+                    results, refined = self._refine(img_type, enhanced, small, results, profile)
+                    parsed = self._parse_results(img_type, results, ocr_time, batch_start)
+                    parsed["refined_regions"] = refined
+                    parsed["profile"] = profile_name
+                    parsed["engine"] = self.primary.name
+                    outputs[index] = (img_type, parsed)
+            except Exception as e:
+                logger.error(f"❌ Error EasyOCR en lote: {e}")
+                for index, img_type, _ in prepared:
+                    outputs[index] = (img_type, {"text": "", "confidence_avg": 0.0})
+
+        return outputs
+
+    def _try_fast_engine(self, img_type: str, enhanced, profile_name: str, image_start: float) -> Optional[Dict]:
+        """
+        Primer intento con el motor rápido.
+
+        Returns:
+            Resultado si alcanza fast_engine_min_confidence, o None para
+            continuar con EasyOCR
+        """
+        if self.fast_engine is None:
+            return None
+
+        try:
+            ocr_start = time.time()
+            results = self.fast_engine.readtext(enhanced, get_profile(profile_name))
+            ocr_time = time.time() - ocr_start
+        except Exception as e:
+            logger.warning(f"[{img_type}] ⚠️ Error {self.fast_engine.name}, usando {self.engine}: {e}")
+            return None
+
+        parsed = self._parse_results(img_type, results, ocr_time, image_start)
+        if not parsed["text"] or parsed["confidence_avg"] < self.fast_engine_min_confidence:
+            logger.info(
+                f"[{img_type}] ↪️ {self.fast_engine.name} insuficiente "
+                f"(conf={parsed['confidence_avg']:.3f} < {self.fast_engine_min_confidence}), "
+                f"releyendo con {self.engine}"
+            )
+            return None
+
+        parsed["profile"] = profile_name
+        parsed["engine"] = self.fast_engine.name
+        return parsed
+
+    def _coarse(self, enhanced):
+        """Imagen para la primera pasada (la misma si no hay escalera)"""
+        # Sin relectura por regiones en el motor principal, la escalera no aplica
+        if not self.coarse_dim or not self.primary.supports_recognize:
+            return enhanced
+        return self.decoder.thumbnail(enhanced, self.coarse_dim)
+
+    def _refine(self, img_type: str, fine, coarse, results, profile: Dict) -> Tuple[List, int]:
+        """
+        Segunda pasada de la escalera de resolución.
+
+        Relee a resolución completa (primary.recognize, sin volver a detectar)
+        solo las regiones de la pasada gruesa con confianza baja o con
+        pinta de letra pequeña (LOTE, VENC...). Se queda con la lectura de
+        mayor confianza; las cajas siguen en coordenadas de la pasada gruesa.
+
+        Returns:
+            (resultados, regiones releídas)
+        """
+        if coarse is fine or not results:
+            return results, 0
+        if not self.primary.supports_recognize:
+            return results, 0
+
+        targets = [
+            i for i, (_, text, conf) in enumerate(results)
+            if conf < self.refine_confidence or SMALL_PRINT_PATTERN.search(text)
+        ]
+        if not targets:
+            return results, 0
+
+        scale = fine.shape[1] / coarse.shape[1]
+        height, width = fine.shape[:2]
+        boxes = []
+        for i in targets:
+            bbox = results[i][0]
+            xs = [point[0] for point in bbox]
+            ys = [point[1] for point in bbox]
+            boxes.append([
+                max(0, int(min(xs) * scale)),
+                min(width, int(max(xs) * scale) + 1),
+                max(0, int(min(ys) * scale)),
+                min(height, int(max(ys) * scale) + 1)
+            ])
+
+        refine_start = time.time()
+        fine_results = self.primary.recognize(fine, boxes, profile)
+
+        refined = list(results)
+        improved = 0
+        for fine_bbox, text, conf in fine_results:
+            # recognize puede reordenar: emparejar por esquina superior izquierda
+            x, y = fine_bbox[0]
+            j = min(range(len(boxes)), key=lambda k: abs(boxes[k][0] - x) + abs(boxes[k][2] - y))
+            i = targets[j]
+            if conf > refined[i][2]:
+                refined[i] = (results[i][0], text, conf)
+                improved += 1
+
+        logger.debug(
+            f"[{img_type}] Escalera | releídas={len(targets)}/{len(results)} | "
+            f"mejoradas={improved} | {time.time() - refine_start:.3f}s"
+        )
+        return refined, len(targets)
+
+    def _blurry_result(self) -> Dict:
+        return {
+            "text": "",
+            "confidence_avg": 0.0,
+            "blur_detected": True
+        }
+
+    def _preprocess(self, img_type: str, img, profile: Dict):
+        """Blur check, resize y filtros del perfil. None si la imagen está borrosa"""
+        logger.debug(f"[{img_type}] Dimensiones decodificadas: {img.shape[1]}x{img.shape[0]}")
         blur_start = time.time()
         if self.is_blurry(img):
             logger.warning(f"Imagen {img_type} borrosa")
-            return img_type, {
-                "text": "",
-                "confidence_avg": 0.0,
-                "blur_detected": True
-            }
+            return None
         logger.debug(f"[{img_type}] Blur check OK | {time.time() - blur_start:.3f}s")
-        # Resize
-        height, width = img.shape[:2]
-        max_dim = 1600
-        if max(height, width) > max_dim:
-            scale = max_dim / max(height, width)
-            img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_LANCZOS4)
+        # Resize (INTER_AREA: solo reducimos y es más barato que LANCZOS4)
+        img = self.decoder.thumbnail(img, self.MAX_DIM)
         preprocess_start = time.time()
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
+        enhanced = apply_filters(gray, profile["filters"])
         logger.debug(f"[{img_type}] Preprocesamiento completado | {time.time() - preprocess_start:.3f}s")
+        return enhanced
 
+    def _parse_results(self, img_type: str, results, ocr_time: float, image_start: float) -> Dict:
+        """Filtra y ordena la salida de EasyOCR ([(bbox, texto, conf), ...])"""
+        logger.info(f"[{img_type}] OCR ejecutado | elementos_detectados={len(results)} | tiempo={ocr_time:.3f}s")
 
-        try:
-            ocr_start = time.time()
-            results = self.reader.readtext(enhanced, detail=1, paragraph=False)
-            ocr_time = time.time() - ocr_start
-
-            logger.info(f"[{img_type}] OCR ejecutado | elementos_detectados={len(results)} | tiempo={ocr_time:.3f}s")
+        lines = []
+        confidences = []
+        
+        filtered_short = 0
+        filtered_symbols = 0
 
-            lines = []
-            confidences = []
-            
-            filtered_short = 0
-            filtered_symbols = 0
+        for item in results:
+            if isinstance(item, (list, tuple)) and len(item) >= 3:
+                bbox, text, conf = item[0], item[1], item[2]
+                text = text.strip()
+                conf = float(conf)
 
-            for item in results:
-                if isinstance(item, (list, tuple)) and len(item) >= 3:
-                    bbox, text, conf = item[0], item[1], item[2]
-                    text = text.strip()
-                    conf = float(conf)
+                if len(text) <= 2:
+                    continue
 
-                    if len(text) <= 2:
-                        continue
+                if re.match(r'^[^a-zA-Z0-9]+$', text):
+                    continue
 
-                    if re.match(r'^[^a-zA-Z0-9]+$', text):
-                        continue
+                y_min = min(point[1] for point in bbox)
 
-                    y_min = min(point[1] for point in bbox)
+                lines.append((y_min, text, conf))
+                confidences.append(conf)
+        logger.debug(
+            f"[{img_type}] Filtrado | cortos={filtered_short} | simbolos={filtered_symbols} | validos={len(lines)}"
+        )
+        # ordenar verticalmente
+        lines.sort(key=lambda x: x[0])
 
-                    lines.append((y_min, text, conf))
-                    confidences.append(conf)
-            logger.debug(
-                f"[{img_type}] Filtrado | cortos={filtered_short} | simbolos={filtered_symbols} | validos={len(lines)}"
-            )
-            # ordenar verticalmente
-            lines.sort(key=lambda x: x[0])
-
-            ordered_text = [line[1] for line in lines]
-            full_text = "\n".join(ordered_text)
-
-            if confidences:
-                avg_conf = sum(confidences) / len(confidences)
-                min_conf = min(confidences)
-                max_conf = max(confidences)
-            else:
-                avg_conf = min_conf = max_conf = 0.0
-            total_time = time.time() - image_start
-            logger.info(
-                f"[{img_type}] ✅ Finalizado | "
-                f"textos={len(ordered_text)} | "
-                f"avg_conf={avg_conf:.3f} | "
-                f"min_conf={min_conf:.3f} | "
-                f"max_conf={max_conf:.3f} | "
-                f"tiempo_total={total_time:.3f}s"
-            )
+        ordered_text = [line[1] for line in lines]
+        full_text = "\n".join(ordered_text)
 
-            return img_type, {
-                "text": full_text,
-                "confidence_avg": avg_conf,
-                "confidence_min": min_conf,
-                "confidence_max": max_conf
-            }
+        if confidences:
+            avg_conf = sum(confidences) / len(confidences)
+            min_conf = min(confidences)
+            max_conf = max(confidences)
+        else:
+            avg_conf = min_conf = max_conf = 0.0
+        total_time = time.time() - image_start
+        logger.info(
+            f"[{img_type}] ✅ Finalizado | "
+            f"textos={len(ordered_text)} | "
+            f"avg_conf={avg_conf:.3f} | "
+            f"min_conf={min_conf:.3f} | "
+            f"max_conf={max_conf:.3f} | "
+            f"tiempo_total={total_time:.3f}s"
+        )
 
-        except Exception as e:
-            logger.error(f"❌ Error EasyOCR en {img_type}: {e}")
-            return img_type, {"text": "", "confidence_avg": 0.0}
+        return {
+            "text": full_text,
+            # Una por línea de `text` (la compactación previa al LLM descarta ruido)
+            "line_confidences": [round(line[2], 3) for line in lines],
+            "confidence_avg": avg_conf,
+            "confidence_min": min_conf,
+            "confidence_max": max_conf
+        }
         
-    def is_blurry(self, image, threshold: float = 100.0) -> bool:
+    def is_blurry(self, image, threshold: Optional[float] = None) -> bool:
         """
         Detecta si una imagen está borrosa usando la varianza del Laplaciano.
+        Se calcula sobre una miniatura (blur_thumbnail_dim), no a tamaño completo.
         threshold bajo = más permisivo
         threshold alto = más estricto
         """
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if threshold is None:
+            threshold = self.blur_threshold
+        thumb = self.decoder.thumbnail(image, self.blur_thumbnail_dim)
+        gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
         laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
         
         logger.debug(f"[BLUR] Varianza Laplaciano={laplacian_var:.3f} | threshold={threshold}")
@@ -126,13 +462,18 @@ class OCRService:
         return laplacian_var < threshold
 
     
+    def _view_pool(self, views: int):
+        if self.view_executor is not None:
+            return nullcontext(self.view_executor)
+        return ThreadPoolExecutor(max_workers=max(1, min(views, 4)))
+
     def extract_from_multiple_images(self, image_paths: Dict[str, str]) -> Dict:
         start_time = time.time()
         logger.info(f"[OCR] ▶ Inicio procesamiento paralelo | total_imagenes={len(image_paths)}")
 
         results = {}
         # Procesar en paralelo
-        with ThreadPoolExecutor(max_workers=4) as executor:
+        with self._view_pool(len(image_paths)) as executor:
             futures = [
                 executor.submit(self._extract_single_image, img_type, img_path)
                 for img_type, img_path in image_paths.items()
@@ -142,6 +483,82 @@ class OCRService:
                 img_type, result = future.result()
                 results[img_type] = result
         
+        return self.combine_results(results, start_time)
+
+    def extract_from_multiple_buffers(self, image_buffers: Dict[str, bytes]) -> Dict:
+        """Igual que extract_from_multiple_images, pero desde bytes en memoria"""
+        start_time = time.time()
+        logger.info(f"[OCR] ▶ Inicio procesamiento paralelo (memoria) | total_imagenes={len(image_buffers)}")
+
+        results = {}
+        with self._view_pool(len(image_buffers)) as executor:
+            futures = [
+                executor.submit(self.extract_from_buffer, img_type, data)
+                for img_type, data in image_buffers.items()
+            ]
+
+            for future in futures:
+                img_type, result = future.result()
+                results[img_type] = result
+
+        return self.combine_results(results, start_time)
+
+    def extract_progressive(
+        self,
+        image_buffers: Dict[str, bytes],
+        is_enough: Callable[[str, float], bool],
+        first_view: str = "front"
+    ) -> Dict:
+        """
+        OCR por orden de valor esperado: primero la vista frontal y, solo si
+        `is_enough(texto, confianza)` dice que faltan datos, las laterales.
+        
+        Las vistas omitidas se devuelven vacías con "skipped": True, así
+        combine_results y la extracción las ignoran.
+        """
+        start_time = time.time()
+        if first_view not in image_buffers:
+            first_view = next(iter(image_buffers))
+
+        _, first_result = self.extract_from_buffer(first_view, image_buffers[first_view])
+        results = {first_view: first_result}
+        rest = {
+            img_type: data
+            for img_type, data in image_buffers.items()
+            if img_type != first_view
+        }
+
+        if rest and is_enough(first_result.get("text", ""), first_result.get("confidence_avg", 0.0)):
+            self._front_only += 1
+            logger.info(f"[OCR] ⏭️ Vista {first_view} suficiente, se omiten: {list(rest)}")
+            for img_type in rest:
+                results[img_type] = {"text": "", "confidence_avg": 0.0, "skipped": True}
+        elif rest:
+            self._all_views += 1
+            logger.info(f"[OCR] Faltan datos tras {first_view}, procesando: {list(rest)}")
+            with self._view_pool(len(rest)) as executor:
+                futures = [
+                    executor.submit(self.extract_from_buffer, img_type, data)
+                    for img_type, data in rest.items()
+                ]
+                for future in futures:
+                    img_type, result = future.result()
+                    results[img_type] = result
+
+        # Mantener el orden original de las vistas
+        ordered = {img_type: results[img_type] for img_type in image_buffers}
+        return self.combine_results(ordered, start_time)
+
+    def progressive_stats(self) -> Dict:
+        total = self._front_only + self._all_views
+        return {
+            "front_only": self._front_only,
+            "all_views": self._all_views,
+            "front_only_ratio": round(self._front_only / total, 3) if total else 0.0,
+        }
+
+    def combine_results(self, results: Dict[str, Dict], start_time: float) -> Dict:
+        """Une los resultados por vista y calcula la confianza global"""
         # Calcular confianza promedio
         confidences = [
             r["confidence_avg"]
@@ -149,6 +566,8 @@ class OCRService:
             if r["text"].strip()
         ]
         avg_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        # Motores que realmente produjeron texto (p.ej. "Tesseract+EasyOCR")
+        engines = sorted({r["engine"] for r in results.values() if r.get("engine")})
         
         elapsed = time.time() - start_time
         logger.info(
@@ -169,13 +588,14 @@ class OCRService:
         for img_type, data in results.items():
             logger.debug(
                 f"   └─ {img_type}: "
-                f"avg={data['confidence_avg']:.2f} "
-                f"min={data['confidence_min']:.2f} "
-                f"max={data['confidence_max']:.2f} "
-                f"text_len={len(data['text'])}"
+                f"avg={data.get('confidence_avg', 0):.2f} "
+                f"min={data.get('confidence_min', 0):.2f} "
+                f"max={data.get('confidence_max', 0):.2f} "
+                f"text_len={len(data.get('text', ''))}"
             )
         
         return {
             "images": results,
-            "overall_confidence": avg_confidence
+            "overall_confidence": avg_confidence,
+            "engine": "+".join(engines) or self.engine
         }
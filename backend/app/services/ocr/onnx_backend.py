@@ -0,0 +1,192 @@
+"""
+Backend ONNX Runtime (int8) para los modelos de EasyOCR
+=======================================================
+
+Exporta el detector CRAFT y el reconocedor CRNN de EasyOCR a ONNX, los
+cuantiza a int8 (pesos) y los sirve con ONNX Runtime. Los modelos
+exportados reemplazan a reader.detector y reader.recognizer: el resto de
+EasyOCR (pre/postproceso, decoder, readtext_batched) no cambia, así que
+OCRService sigue usando la misma API.
+
+Exportar una vez por máquina (requiere torch, onnx y onnxruntime):
+    python -m backend.app.services.ocr.onnx_backend models/onnx
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+logger = logging.getLogger(__name__)
+
+DETECTOR_FILE = "craft.int8.onnx"
+RECOGNIZER_FILE = "recognizer_{lang}.int8.onnx"
+
+
+class OnnxDetector:
+    """Sustituto de reader.detector: misma firma que CRAFT (y, feature)"""
+
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, x):
+        import torch
+
+        y = self.session.run(None, {self.input_name: x.cpu().numpy()})[0]
+        # El feature map solo se usa al entrenar; EasyOCR lo ignora
+        return torch.from_numpy(y), None
+
+
+class OnnxRecognizer:
+    """Sustituto de reader.recognizer: model(image, text) → logits por paso"""
+
+    def __init__(self, session):
+        self.session = session
+        self.input_names = [node.name for node in session.get_inputs()]
+
+    def eval(self):
+        return self
+
+    def __call__(self, image, text=None):
+        import torch
+
+        feed = {self.input_names[0]: image.cpu().numpy()}
+        # Si el export conservó la entrada de texto, hay que alimentarla
+        if len(self.input_names) > 1 and text is not None:
+            feed[self.input_names[1]] = text.cpu().numpy()
+        preds = self.session.run(None, feed)[0]
+        return torch.from_numpy(preds)
+
+
+def _session(path: Path, threads: int):
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    return onnxruntime.InferenceSession(
+        str(path), sess_options=options, providers=["CPUExecutionProvider"]
+    )
+
+
+def model_paths(model_dir: str, lang: str) -> Dict[str, Path]:
+    directory = Path(model_dir)
+    return {
+        "detector": directory / DETECTOR_FILE,
+        "recognizer": directory / RECOGNIZER_FILE.format(lang=lang),
+    }
+
+
+def install(reader, model_dir: str, threads: int = 0) -> bool:
+    """
+    Reemplaza los modelos torch del Reader por sesiones ONNX int8.
+
+    Args:
+        reader: easyocr.Reader ya inicializado
+        model_dir: Carpeta con los .onnx exportados
+        threads: Hilos intra-op de ONNX Runtime (0 = automático)
+
+    Returns:
+        True si se instaló; False si falta onnxruntime o los modelos
+        (el Reader queda con torch)
+    """
+    if onnxruntime is None:
+        logger.warning("⚠️ onnxruntime no está instalado, EasyOCR sigue en PyTorch")
+        return False
+
+    paths = model_paths(model_dir, reader.model_lang)
+    missing = [str(path) for path in paths.values() if not path.exists()]
+    if missing:
+        logger.warning(f"⚠️ Modelos ONNX no encontrados ({', '.join(missing)}), EasyOCR sigue en PyTorch")
+        return False
+
+    reader.detector = OnnxDetector(_session(paths["detector"], threads))
+    reader.recognizer = OnnxRecognizer(_session(paths["recognizer"], threads))
+    reader.onnx_backend = True
+    logger.info(f"✅ EasyOCR sobre ONNX Runtime int8 | {model_dir} | hilos={threads or 'auto'}")
+    return True
+
+
+def export(model_dir: str, languages: List[str], height: int = 608, width: int = 800) -> Dict[str, Path]:
+    """
+    Exporta CRAFT y el CRNN del idioma a ONNX fp32 y los cuantiza a int8.
+
+    Se parte de un Reader sin quantize_dynamic de torch (los módulos
+    cuantizados de torch no se pueden exportar). Ejes dinámicos: lote,
+    alto y ancho en el detector; lote y ancho en el reconocedor.
+    """
+    import easyocr
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    reader = easyocr.Reader(languages, gpu=False, quantize=False, verbose=False)
+    paths = model_paths(model_dir, reader.model_lang)
+    Path(model_dir).mkdir(parents=True, exist_ok=True)
+
+    exports = {
+        "detector": (
+            reader.detector,
+            (torch.rand(1, 3, height, width),),
+            {"input": {0: "batch", 2: "height", 3: "width"}, "output": {0: "batch", 1: "h", 2: "w"}},
+        ),
+        "recognizer": (
+            reader.recognizer,
+            # imgH=64; el texto de entrada no se usa en generation2
+            (torch.rand(1, 1, 64, 256), torch.zeros(1, 26, dtype=torch.long)),
+            {
+                "input": {0: "batch", 3: "width"},
+                "text": {0: "batch", 1: "length"},
+                "output": {0: "batch", 1: "steps"},
+            },
+        ),
+    }
+
+    for name, (model, dummy, axes) in exports.items():
+        fp32_path = paths[name].with_name(paths[name].name.replace(".int8", ".fp32"))
+        model.eval()
+        with torch.no_grad():
+            torch.onnx.export(
+                model, dummy, str(fp32_path),
+                input_names=["input"] + (["text"] if name == "recognizer" else []),
+                output_names=["output"],
+                dynamic_axes=axes,
+                opset_version=17,
+                do_constant_folding=True,
+            )
+        quantize_dynamic(str(fp32_path), str(paths[name]), weight_type=QuantType.QInt8)
+        logger.info(
+            f"📦 {name}: {fp32_path.stat().st_size / 1e6:.1f}MB fp32 → "
+            f"{paths[name].stat().st_size / 1e6:.1f}MB int8"
+        )
+        os.remove(fp32_path)
+
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta EasyOCR a ONNX int8")
+    parser.add_argument("model_dir", nargs="?", default="models/onnx")
+    parser.add_argument("--languages", nargs="+", default=["en", "es"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    paths = export(args.model_dir, args.languages)
+    for name, path in paths.items():
+        print(f"{name}: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import threading
+import time
+
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """
+    Registro perezoso de servicios.
+
+    Importar backend.app.services solo registra fábricas: ningún modelo,
+    cliente HTTP ni conexión se crea hasta que alguien pide el servicio
+    (services.ocr_service) o el lifespan lo precalienta con warm().
+    Cada servicio se crea una sola vez por proceso.
+
+    - factory: crea la instancia (puede devolver None si el servicio
+      no está disponible, p.ej. Ollama apagado)
+    - warmup: trabajo extra opcional al precalentar (p.ej. arrancar los
+      procesos del pool de OCR); no corre en la creación perezosa
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._warmups: Dict[str, Callable[[Any], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._status: Dict[str, Dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        warmup: Optional[Callable[[Any], Any]] = None
+    ):
+        self._factories[name] = factory
+        if warmup:
+            self._warmups[name] = warmup
+        self._locks[name] = threading.Lock()
+        self._status[name] = {"created": False, "warm": False, "seconds": None, "error": None}
+
+    def __getattr__(self, name: str) -> Any:
+        # Solo se llama si el atributo no existe: servicio aún sin crear
+        if name.startswith("_") or name not in self._factories:
+            raise AttributeError(name)
+        return self.get(name)
+
+    def get(self, name: str) -> Any:
+        """
+        Instancia del servicio, creándola la primera vez.
+
+        Raises:
+            KeyError: Si el servicio no está registrado
+        """
+        if name in self._instances:
+            return self._instances[name]
+
+        with self._locks[name]:
+            if name in self._instances:
+                return self._instances[name]
+
+            start = time.time()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                self._status[name]["error"] = str(e)
+                logger.exception(f"❌ Error creando {name}: {e}")
+                raise
+
+            elapsed = time.time() - start
+            self._instances[name] = instance
+            self._status[name].update(created=True, seconds=round(elapsed, 3), error=None)
+            # Accesos siguientes como atributo normal, sin pasar por __getattr__
+            self.__dict__[name] = instance
+            logger.info(f"🧩 {name} creado | {elapsed:.2f}s")
+            return instance
+
+    def peek(self, name: str) -> Any:
+        """Instancia si ya fue creada, o None (sin crearla)"""
+        return self._instances.get(name)
+
+    def warm(self, name: str) -> bool:
+        """Crea el servicio y ejecuta su warmup. False si falla o no está disponible"""
+        start = time.time()
+        try:
+            instance = self.get(name)
+            if instance is None:
+                # La fábrica devolvió None: el servicio no está disponible
+                logger.warning(f"⚠️ {name} no disponible, no se precalienta")
+                return False
+            warmup = self._warmups.get(name)
+            if warmup:
+                warmup(instance)
+        except Exception as e:
+            self._status[name]["error"] = str(e)
+            logger.error(f"❌ No se pudo precalentar {name}: {e}")
+            return False
+
+        self._status[name]["warm"] = True
+        logger.info(f"🔥 {name} listo | {time.time() - start:.2f}s")
+        return True
+
+    async def warm_all(self, names: Iterable[str]) -> Dict[str, bool]:
+        """Precalienta varios servicios en paralelo, fuera del event loop"""
+        names = list(names)
+        results = await asyncio.gather(*(asyncio.to_thread(self.warm, name) for name in names))
+        return dict(zip(names, results))
+
+    def status(self) -> Dict[str, Dict]:
+        """Estado por servicio: creado, precalentado, disponible, tiempo y error"""
+        return {
+            name: {
+                **status,
+                "available": self._instances.get(name) is not None,
+            }
+            for name, status in self._status.items()
+        }
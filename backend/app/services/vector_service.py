@@ -41,6 +41,3 @@ class VectorService:
         except Exception as e:
             logger.error(f"❌ Error buscando similares: {e}")
             return None
-
-# Instancia global
-vector_service = VectorService()
\ No newline at end of file
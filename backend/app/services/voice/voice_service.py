@@ -39,6 +39,3 @@ class VoiceService:
         except Exception as e:
             logger.error(f"❌ Error generando audio: {e}")
             return None
-
-# Instancia global
-voice_service = VoiceService()
\ No newline at end of file
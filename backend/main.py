@@ -1,10 +1,15 @@
+import asyncio
 import logging
 
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from backend.app.core.database import engine, Base
+from backend.app.core.config import settings
+from backend.app.core.database import engine, Base, apply_schema_upgrades
+from backend.app.core.resources import resource_governor
 from backend.app.api import inventory
+from backend.app.services import services
 
 # --------------------------------------------------
 # Logging
@@ -24,8 +29,25 @@ async def lifespan(app: FastAPI):
     # Startup
     Base.metadata.create_all(bind=engine)
     logger.info("✅ Tablas de base de datos creadas")
+    # Restricciones que create_all no añade a tablas existentes (uq_product_batch)
+    apply_schema_upgrades()
+    # Modelos y clientes pesados en paralelo; el resto se crea al primer uso
+    await services.warm_all(settings.SERVICES_WARMUP)
+    await services.job_service.start(inventory.process_scan_job)
     yield
-    # Shutdown
+    # Shutdown (solo lo que llegó a crearse)
+    await services.job_service.stop()
+    if services.peek("ocr_executor"):
+        services.peek("ocr_executor").shutdown()
+    # El batcher (hilo + executor) es del OCRService que lo creó
+    ocr_service = services.peek("ocr_service")
+    if ocr_service and ocr_service.batcher:
+        ocr_service.batcher.shutdown()
+    if services.peek("ocr_pool"):
+        services.peek("ocr_pool").shutdown()
+    if services.peek("llama_client"):
+        await services.peek("llama_client").aclose()
+    resource_governor.shutdown()
     logger.info("🛑 Aplicación detenida")
 
 # --------------------------------------------------
@@ -62,6 +84,18 @@ async def root():
     return {"status": "ok", "service": "Agente Inventario IA"}
 
 
+@app.get("/health/ready")
+async def readiness():
+    """Listo cuando los servicios de SERVICES_WARMUP están creados y precalentados (503 si no)"""
+    status = services.status()
+    ready = all(
+        status[name]["warm"] and status[name]["available"]
+        for name in settings.SERVICES_WARMUP
+    )
+    body = {"ready": ready, "services": status}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
 from fastapi.staticfiles import StaticFiles
 
 app.mount("/", StaticFiles(directory="frontend", html=True), name="static")
\ No newline at end of file
@@ -0,0 +1,140 @@
+"""
+Benchmark de decodificación y blur check
+=========================================
+
+Compara el camino anterior (decodificación completa + Laplaciano a tamaño
+completo + LANCZOS4) contra el actual (IMREAD_REDUCED_* según cabecera +
+Laplaciano sobre miniatura + INTER_AREA). Mide tiempo y pico de memoria
+de numpy/OpenCV (tracemalloc) por imagen.
+
+También imprime la varianza del Laplaciano en ambos caminos, para
+recalibrar OCR_BLUR_THRESHOLD con fotos reales.
+
+Uso:
+    python -m benchmarks.bench_decode                 # fotos sintéticas 4032x3024
+    python -m benchmarks.bench_decode ruta/a/fotos    # JPEG/PNG reales
+    python -m benchmarks.bench_decode ruta --repeat 10
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from backend.app.services.ocr.image_decoder import ImageDecoder
+
+MAX_DIM = 1600
+THUMBNAIL_DIM = 512
+
+
+def synthetic_images(count: int = 3):
+    """JPEGs de 12 MP con texto, similares a una foto de celular"""
+    rng = np.random.default_rng(0)
+    images = []
+    for i in range(count):
+        img = np.full((3024, 4032, 3), 235, dtype=np.uint8)
+        img += rng.integers(0, 15, img.shape, dtype=np.uint8)
+        for row in range(12):
+            cv2.putText(
+                img, f"LOTE A{i}{row:03d}  VENC 12/2027  EAN 7861234567890",
+                (150, 250 + row * 220), cv2.FONT_HERSHEY_SIMPLEX, 3.0, (20, 20, 20), 6
+            )
+        ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        images.append((f"sintetica_{i}.jpg", encoded.tobytes()))
+    return images
+
+
+def load_images(folder: Path):
+    paths = sorted(
+        p for p in folder.iterdir()
+        if p.suffix.lower() in (".jpg", ".jpeg", ".png")
+    )
+    return [(p.name, p.read_bytes()) for p in paths]
+
+
+def baseline(data: bytes):
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    variance = cv2.Laplacian(gray, cv2.CV_64F).var()
+    height, width = img.shape[:2]
+    if max(height, width) > MAX_DIM:
+        scale = MAX_DIM / max(height, width)
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_LANCZOS4)
+    return img, variance
+
+
+def reduced(decoder: ImageDecoder, data: bytes):
+    img = decoder.decode(data)
+    thumb = decoder.thumbnail(img, THUMBNAIL_DIM)
+    gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+    variance = cv2.Laplacian(gray, cv2.CV_64F).var()
+    img = decoder.thumbnail(img, MAX_DIM)
+    return img, variance
+
+
+def measure(fn, *args, repeat: int):
+    times = []
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(times), peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("folder", nargs="?", help="Carpeta con fotos (por defecto sintéticas)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    images = load_images(Path(args.folder)) if args.folder else synthetic_images()
+    if not images:
+        print("No se encontraron imágenes")
+        return 1
+
+    decoder = ImageDecoder(target_dim=MAX_DIM)
+
+    print(f"{'imagen':<24}{'dims':>12}{'red':>5}"
+          f"{'base ms':>10}{'red ms':>9}{'base MB':>10}{'red MB':>9}"
+          f"{'var base':>10}{'var mini':>10}")
+
+    totals = {"base_t": 0.0, "red_t": 0.0, "base_m": 0, "red_m": 0}
+    for name, data in images:
+        dims = decoder.dimensions(data)
+        factor = decoder.reduction_factor(dims)
+
+        base_t, base_m, (base_img, base_var) = measure(baseline, data, repeat=args.repeat)
+        red_t, red_m, (red_img, red_var) = measure(reduced, decoder, data, repeat=args.repeat)
+
+        totals["base_t"] += base_t
+        totals["red_t"] += red_t
+        totals["base_m"] = max(totals["base_m"], base_m)
+        totals["red_m"] = max(totals["red_m"], red_m)
+
+        dims_text = f"{dims[0]}x{dims[1]}" if dims else "?"
+        print(f"{name[:23]:<24}{dims_text:>12}{factor:>5}"
+              f"{base_t * 1000:>10.1f}{red_t * 1000:>9.1f}"
+              f"{base_m / 1e6:>10.1f}{red_m / 1e6:>9.1f}"
+              f"{base_var:>10.1f}{red_var:>10.1f}")
+
+    print()
+    print(f"Tiempo total:  base={totals['base_t'] * 1000:.1f}ms | "
+          f"reducido={totals['red_t'] * 1000:.1f}ms | "
+          f"x{totals['base_t'] / max(totals['red_t'], 1e-9):.2f}")
+    print(f"Pico memoria:  base={totals['base_m'] / 1e6:.1f}MB | "
+          f"reducido={totals['red_m'] / 1e6:.1f}MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Benchmark EasyOCR: PyTorch vs ONNX Runtime int8
+===============================================
+
+Procesa el mismo set de fotos con dos Readers: el de PyTorch (el que usa
+hoy la app en CPU, con quantize_dynamic de torch) y uno con los modelos
+exportados por backend.app.services.ocr.onnx_backend. Mide la latencia
+mediana por imagen, la confianza media y cuánto coincide el texto
+(recall de palabras del texto de PyTorch dentro del de ONNX). Si hay un
+.txt con el texto esperado junto a la foto, también el recall contra él.
+
+Uso:
+    python -m backend.app.services.ocr.onnx_backend models/onnx   # una vez
+    python -m benchmarks.bench_onnx ../datasets
+    python -m benchmarks.bench_onnx ../datasets --model-dir models/onnx --threads 4 --repeat 3
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import easyocr
+import torch
+
+from backend.app.services.ocr import onnx_backend
+from backend.app.services.ocr.ocr_service import OCRService
+from benchmarks.bench_profiles import WORD_PATTERN, load_images, recall
+
+
+def run(service: OCRService, images, repeat: int):
+    rows = []
+    for view, name, data, truth in images:
+        times = []
+        result = {}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _, result = service.extract_from_buffer(view, data)
+            times.append(time.perf_counter() - start)
+        rows.append({
+            "name": name,
+            "latency": statistics.median(times),
+            "confidence": result.get("confidence_avg", 0.0),
+            "text": result.get("text", ""),
+            "truth": truth,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("folder", help="Carpeta con fotos (se recorre recursivamente)")
+    parser.add_argument("--model-dir", default="models/onnx")
+    parser.add_argument("--threads", type=int, default=0, help="Hilos de torch y ONNX Runtime (0 = automático)")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    images = load_images(Path(args.folder))
+    if not images:
+        print("No se encontraron imágenes")
+        return 1
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    torch_reader = easyocr.Reader(["en", "es"], gpu=False, verbose=False)
+    onnx_reader = easyocr.Reader(["en", "es"], gpu=False, verbose=False)
+    if not onnx_backend.install(onnx_reader, args.model_dir, threads=args.threads):
+        print(f"No se pudieron cargar los modelos ONNX de {args.model_dir}")
+        return 1
+
+    services = {"pytorch": OCRService(torch_reader), "onnx-int8": OCRService(onnx_reader)}
+    # Calentamiento: la primera inferencia reserva memoria y compila kernels
+    for service in services.values():
+        service.extract_from_buffer("front", images[0][2])
+
+    results = {backend: run(service, images, args.repeat) for backend, service in services.items()}
+
+    print(f"{'imagen':<32}{'torch s':>9}{'onnx s':>9}{'x':>6}{'conf t':>8}{'conf o':>8}{'acuerdo':>9}")
+    for base, fast in zip(results["pytorch"], results["onnx-int8"]):
+        agreement = recall(fast["text"], set(WORD_PATTERN.findall(base["text"].lower())))
+        print(f"{base['name'][:31]:<32}{base['latency']:>9.3f}{fast['latency']:>9.3f}"
+              f"{base['latency'] / max(fast['latency'], 1e-9):>6.2f}"
+              f"{base['confidence']:>8.3f}{fast['confidence']:>8.3f}{agreement:>9.3f}")
+
+    print()
+    for backend, rows in results.items():
+        latency = statistics.mean(row["latency"] for row in rows)
+        confidence = statistics.mean(row["confidence"] for row in rows)
+        line = f"{backend:<10} latencia={latency:.3f}s | confianza={confidence:.3f}"
+        truths = [recall(row["text"], row["truth"]) for row in rows if row["truth"] is not None]
+        if truths:
+            line += f" | recall={statistics.mean(truths):.3f}"
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Benchmark de perfiles de OCR
+============================
+
+Corre cada perfil de services/ocr/ocr_profiles.py (cadena de filtros,
+canvas_size, mag_ratio y decoder) sobre un set local de fotos y mide,
+por vista, la latencia mediana y la confianza media de EasyOCR.
+
+La vista se infiere del nombre del archivo (front.jpeg, side_left.jpeg,
+side_right.jpeg, como en datasets/<producto>/). Si junto a la foto hay
+un .txt con el texto esperado, también se mide el recall de palabras.
+
+Al final recomienda, por vista, el perfil más rápido que cumple el
+umbral de confianza (y de recall, si hay texto esperado). El resultado
+se lleva a OCR_VIEW_PROFILES en el .env.
+
+Uso:
+    python -m benchmarks.bench_profiles ../datasets
+    python -m benchmarks.bench_profiles ../datasets --profiles grayscale otsu fast
+    python -m benchmarks.bench_profiles ../datasets --min-confidence 0.65 --repeat 3
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import easyocr
+
+from backend.app.services.ocr.ocr_profiles import PROFILES
+from backend.app.services.ocr.ocr_service import OCRService
+
+VIEWS = ("front", "left", "right")
+WORD_PATTERN = re.compile(r"\w{3,}")
+
+
+def view_of(path: Path) -> str:
+    stem = path.stem.lower()
+    for view in VIEWS:
+        if view in stem:
+            return view
+    return "front"
+
+
+def load_images(folder: Path):
+    """(vista, nombre, bytes, palabras esperadas o None) de todas las fotos"""
+    images = []
+    for path in sorted(folder.rglob("*")):
+        if path.suffix.lower() not in (".jpg", ".jpeg", ".png"):
+            continue
+        truth_path = path.with_suffix(".txt")
+        truth = None
+        if truth_path.exists():
+            truth = set(WORD_PATTERN.findall(truth_path.read_text(encoding="utf-8").lower()))
+        name = str(path.relative_to(folder))
+        images.append((view_of(path), name, path.read_bytes(), truth))
+    return images
+
+
+def recall(text: str, truth) -> float:
+    if not truth:
+        return 0.0
+    found = set(WORD_PATTERN.findall(text.lower()))
+    return len(found & truth) / len(truth)
+
+
+def run_profile(reader, profile: str, images, repeat: int, coarse_dim: int):
+    """Métricas por vista para un perfil"""
+    per_view = {}
+    for view, name, data, truth in images:
+        service = OCRService(reader, view_profiles={view: profile}, coarse_dim=coarse_dim)
+        times = []
+        result = {}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            _, result = service.extract_from_buffer(view, data)
+            times.append(time.perf_counter() - start)
+
+        stats = per_view.setdefault(view, {"times": [], "confidences": [], "recalls": []})
+        stats["times"].append(statistics.median(times))
+        stats["confidences"].append(result.get("confidence_avg", 0.0))
+        if truth is not None:
+            stats["recalls"].append(recall(result.get("text", ""), truth))
+
+    return {
+        view: {
+            "images": len(stats["times"]),
+            "latency": statistics.mean(stats["times"]),
+            "confidence": statistics.mean(stats["confidences"]),
+            "recall": statistics.mean(stats["recalls"]) if stats["recalls"] else None,
+        }
+        for view, stats in per_view.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("folder", help="Carpeta con fotos (se recorre recursivamente)")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--min-confidence", type=float, default=0.6)
+    parser.add_argument("--min-recall", type=float, default=0.0)
+    parser.add_argument("--coarse-dim", type=int, default=0,
+                        help="Lado de la pasada gruesa (0 = sin coarse-to-fine)")
+    parser.add_argument("--gpu", action="store_true")
+    args = parser.parse_args()
+
+    images = load_images(Path(args.folder))
+    if not images:
+        print("No se encontraron imágenes")
+        return 1
+
+    reader = easyocr.Reader(["en", "es"], gpu=args.gpu)
+
+    # Calentamiento: la primera inferencia carga pesos y reserva memoria
+    OCRService(reader).extract_from_buffer("front", images[0][2])
+
+    results = {}
+    for profile in args.profiles:
+        results[profile] = run_profile(reader, profile, images, args.repeat, args.coarse_dim)
+
+    print(f"{'perfil':<14}{'vista':<8}{'imgs':>5}{'lat s':>9}{'conf':>8}{'recall':>8}")
+    for profile, per_view in results.items():
+        for view in VIEWS:
+            if view not in per_view:
+                continue
+            row = per_view[view]
+            recall_text = f"{row['recall']:.3f}" if row["recall"] is not None else "-"
+            print(f"{profile:<14}{view:<8}{row['images']:>5}"
+                  f"{row['latency']:>9.3f}{row['confidence']:>8.3f}{recall_text:>8}")
+
+    print()
+    print(f"Recomendación (conf >= {args.min_confidence}, recall >= {args.min_recall}):")
+    recommended = {}
+    for view in VIEWS:
+        candidates = [
+            (per_view[view]["latency"], profile)
+            for profile, per_view in results.items()
+            if view in per_view
+            and per_view[view]["confidence"] >= args.min_confidence
+            and (per_view[view]["recall"] is None or per_view[view]["recall"] >= args.min_recall)
+        ]
+        if not candidates:
+            if any(view in per_view for per_view in results.values()):
+                print(f"  {view}: ningún perfil cumple el umbral")
+            continue
+        latency, profile = min(candidates)
+        recommended[view] = profile
+        print(f"  {view}: {profile} ({latency:.3f}s)")
+
+    if recommended:
+        pairs = ", ".join(f'"{view}": "{profile}"' for view, profile in recommended.items())
+        print(f"\nOCR_VIEW_PROFILES={{{pairs}}}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
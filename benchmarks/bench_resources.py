@@ -0,0 +1,129 @@
+"""
+Benchmark del ResourceGovernor
+==============================
+
+Lanza 4, 8 y 16 escaneos concurrentes (3 vistas cada uno) contra un
+Reader local de EasyOCR, con y sin reparto de núcleos:
+
+- sin gobernador: torch y OpenCV con un hilo por núcleo, un pool de
+  hilos por escaneo para las vistas y todos los escaneos a la vez
+  (como asyncio.to_thread sin límite)
+- con gobernador: hilos de torch/OpenCV, executor de vistas compartido
+  y concurrencia de OCR según ResourceGovernor (modo sin pool)
+
+Mide throughput (escaneos/min) y latencia p50/p95 por escaneo.
+
+Uso:
+    python -m benchmarks.bench_resources                  # fotos sintéticas
+    python -m benchmarks.bench_resources ruta/a/fotos --levels 4 8 16
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import easyocr
+import torch
+
+from backend.app.core.resources import ResourceGovernor, available_cores
+from backend.app.services.ocr.ocr_service import OCRService
+from benchmarks.bench_decode import load_images, synthetic_images
+
+VIEWS = ("front", "left", "right")
+
+
+def scan_buffers(images):
+    """Reparte las fotos en escaneos de 3 vistas (cíclico si faltan)"""
+    return {view: images[i % len(images)][1] for i, view in enumerate(VIEWS)}
+
+
+def run_level(service: OCRService, buffers, scans: int, admission: int):
+    """
+    Lanza `scans` escaneos a la vez; como mucho `admission` en OCR.
+
+    Returns:
+        (segundos totales, latencias por escaneo)
+    """
+    gate = threading.Semaphore(admission)
+    latencies = []
+
+    def scan():
+        start = time.perf_counter()
+        with gate:
+            service.extract_from_multiple_buffers(buffers)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=scans) as clients:
+        for future in [clients.submit(scan) for _ in range(scans)]:
+            future.result()
+    return time.perf_counter() - start, latencies
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("folder", nargs="?", help="Carpeta con fotos (por defecto sintéticas)")
+    parser.add_argument("--levels", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--cores", type=int, default=0, help="Presupuesto de núcleos (0 = disponibles)")
+    args = parser.parse_args()
+
+    images = load_images(Path(args.folder)) if args.folder else synthetic_images()
+    if not images:
+        print("No se encontraron imágenes")
+        return 1
+    buffers = scan_buffers(images)
+
+    cores = args.cores or available_cores()
+    governor = ResourceGovernor(cores=cores, process_pool=False)
+    reader = easyocr.Reader(["en", "es"], gpu=False, verbose=False)
+
+    modes = {
+        "sin gobernador": {
+            "threads": cores,
+            "service": OCRService(reader),
+            "admission": None,
+        },
+        "con gobernador": {
+            "threads": governor.ocr_threads,
+            "service": OCRService(reader, view_executor=governor.executor("views")),
+            "admission": governor.ocr_concurrency,
+        },
+    }
+
+    print(f"núcleos={cores} | asignación={governor.allocation()}")
+    # Calentamiento
+    OCRService(reader).extract_from_buffer("front", buffers["front"])
+
+    print(f"\n{'modo':<16}{'escaneos':>9}{'total s':>9}{'esc/min':>9}{'p50 s':>8}{'p95 s':>8}")
+    throughput = {}
+    for level in args.levels:
+        for name, mode in modes.items():
+            torch.set_num_threads(mode["threads"])
+            cv2.setNumThreads(mode["threads"])
+            total, latencies = run_level(mode["service"], buffers, level, mode["admission"] or level)
+            rate = level / total * 60
+            throughput[(name, level)] = rate
+            print(f"{name:<16}{level:>9}{total:>9.2f}{rate:>9.1f}"
+                  f"{statistics.median(latencies):>8.2f}{percentile(latencies, 0.95):>8.2f}")
+
+    print()
+    for level in args.levels:
+        gain = throughput[("con gobernador", level)] / max(throughput[("sin gobernador", level)], 1e-9)
+        print(f"{level:>3} escaneos: throughput x{gain:.2f}")
+
+    governor.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Benchmark de Llama: texto libre vs salida estructurada (JSON schema)
+====================================================================
+
+Extrae los mismos textos OCR con dos LlamaClient contra el mismo Ollama:
+
+- texto libre: prompt con la estructura de ejemplo, num_predict=1024 y
+  limpieza de markdown/regex de la respuesta
+- esquema: PRODUCT_SCHEMA en el parámetro "format" (JSON válido por
+  construcción) y num_predict=384
+
+Mide la latencia mediana por escaneo, los tokens de salida, reintentos,
+reparaciones (respuesta fuera del esquema) y fallos, y cuánto tiempo se
+ahorra por escaneo. Requiere Ollama corriendo con el modelo descargado.
+
+Uso:
+    python -m benchmarks.bench_structured                  # textos de ejemplo
+    python -m benchmarks.bench_structured ruta/a/textos    # un .txt por escaneo
+    python -m benchmarks.bench_structured --model llama3.2:3b --repeat 3
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from backend.app.services.ai.llama_client import LlamaClient
+
+SAMPLE_TEXTS = [
+    "LECHE GLORIA\nENTERA\nUHT\n1000 ml\nS/ 5.50\nLOTE A1234\nVENC 12/05/2026\n7751271001234",
+    "Coca-Cola\nSin Azúcar\n500 ml\nCONTENIDO NETO\nEAN 7750182001234\nVTO 03/2026",
+    "JABÓN BOLIVAR\nPARA ROPA\nACTIVE CARE\n190 g\nLOTE 25B017\nHECHO EN PERU",
+    "GALLETAS\nSODA FIELD\n6 paquetes x 34 g\nInformación nutricional\n"
+    "Energía 150 kcal Proteína 3 g Grasa 5 g Sodio 210 mg",
+]
+
+
+def load_texts(folder: Path):
+    return [p.read_text(encoding="utf-8") for p in sorted(folder.glob("*.txt"))]
+
+
+async def run(client: LlamaClient, texts, repeat: int):
+    """Latencias por escaneo (segundos); los fallos cuentan en stats()"""
+    latencies = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            try:
+                await client.aextract(text)
+            except Exception:
+                pass
+            latencies.append(time.perf_counter() - start)
+    await client.aclose()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("folder", nargs="?", help="Carpeta con textos OCR (.txt)")
+    parser.add_argument("--model", default="llama3.2:latest")
+    parser.add_argument("--base-url", default="http://localhost:11434")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    texts = load_texts(Path(args.folder)) if args.folder else SAMPLE_TEXTS
+    if not texts:
+        print("No se encontraron textos")
+        return 1
+
+    clients = {
+        "texto libre": LlamaClient(args.model, args.base_url, structured_output=False),
+        "esquema": LlamaClient(args.model, args.base_url, structured_output=True),
+    }
+    if not all(client.is_available() for client in clients.values()):
+        print(f"Ollama o el modelo '{args.model}' no están disponibles en {args.base_url}")
+        return 1
+
+    # Calentamiento: carga el modelo en Ollama antes de medir
+    asyncio.run(run(LlamaClient(args.model, args.base_url), texts[:1], 1))
+
+    print(f"\n{'modo':<14}{'p50 s':>8}{'media s':>9}{'tok salida':>12}{'reintentos':>12}{'reparados':>11}{'fallos':>8}")
+    medians = {}
+    for name, client in clients.items():
+        latencies = asyncio.run(run(client, texts, args.repeat))
+        stats = client.stats()
+        medians[name] = statistics.median(latencies)
+        print(
+            f"{name:<14}{medians[name]:>8.2f}{statistics.mean(latencies):>9.2f}"
+            f"{stats['avg_output_tokens']:>12.0f}{stats['retries']:>12}"
+            f"{stats['repairs']:>11}{stats['failures']:>8}"
+        )
+
+    saved = medians["texto libre"] - medians["esquema"]
+    print(f"\nAhorro por escaneo (p50): {saved:.2f}s ({saved / max(medians['texto libre'], 1e-9):.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
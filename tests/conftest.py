@@ -0,0 +1,5 @@
+import os
+
+# Settings exige estas variables; las pruebas no llaman a servicios externos
+for name in ("DATABASE_URL", "GEMINI_API_KEY", "OPENAI_API_KEY", "ELEVENLABS_API_KEY", "VOICE_ID_API_KEY"):
+    os.environ.setdefault(name, "test")
@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from backend.app.api import inventory
+from backend.app.core.database import SCHEMA_UPGRADES
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_batch_number_from_label_is_kept():
+    assert inventory._resolve_batch_number({"batch": " L2503A "}) == "L2503A"
+
+
+def test_missing_batch_number_is_stable_so_the_upsert_increments():
+    assert inventory._resolve_batch_number({}) == inventory.NO_BATCH_NUMBER
+    assert inventory._resolve_batch_number({"batch": None}) == inventory._resolve_batch_number({"batch": ""})
+    # Distinto vencimiento → distinto lote
+    assert inventory._resolve_batch_number({"expiry_date": "2026-05-12"}) == "SIN-LOTE-20260512"
+
+
+def test_upsert_statement_conflicts_on_product_and_batch():
+    sql = _sql(inventory._batch_upsert_statement(1, "L1", {"expiry_date": "2026-05-12"}))
+    assert "ON CONFLICT (product_id, batch_number) DO UPDATE" in sql
+    assert "stock_quantity = (product_batches.stock_quantity +" in sql
+    assert "(xmax = 0) AS inserted" in sql
+
+
+def test_upsert_statement_never_inserts_null_batch_number():
+    stmt = inventory._batch_upsert_statement(1, None, {})
+    params = stmt.compile(dialect=postgresql.dialect()).params
+    assert params["batch_number"] == inventory.NO_BATCH_NUMBER
+
+
+def test_schema_upgrade_adds_the_upsert_constraint_idempotently():
+    names = [name for name, _ in SCHEMA_UPGRADES]
+    assert "uq_product_batch" in names
+    statement = dict(SCHEMA_UPGRADES)["uq_product_batch"]
+    assert "IF NOT EXISTS" in statement
+    assert "UNIQUE (product_id, batch_number)" in statement
+
+
+# ========================================
+# Contra PostgreSQL real (TEST_DATABASE_URL=postgresql+asyncpg://...)
+# ========================================
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL no definido")
+def test_upsert_inserts_then_increments_on_postgres():
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from backend.app.core.database import Base
+    from backend.app.models.models import Product
+
+    async def scenario():
+        engine = create_async_engine(TEST_DATABASE_URL)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+            for _, statement in SCHEMA_UPGRADES:
+                await conn.execute(text(statement))
+        async with AsyncSession(engine) as db:
+            product = Product(name="Leche", brand="Gloria", size="1L")
+            db.add(product)
+            await db.flush()
+
+            first = await inventory._upsert_batch(db, product.id, None, {})
+            second = await inventory._upsert_batch(db, product.id, None, {})
+            await db.rollback()
+        await engine.dispose()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.inserted and first.stock_quantity == 1
+    assert not second.inserted and second.stock_quantity == 2
+    assert second.batch_number == inventory.NO_BATCH_NUMBER
+
+
+def test_barcode_fast_path_only_increments_a_single_open_batch():
+    sql = " ".join(_sql(inventory._open_batch_increment_statement(5)).split())
+    assert sql.startswith("UPDATE product_batches SET stock_quantity=(product_batches.stock_quantity +")
+    # Solo lotes abiertos, y solo si hay exactamente uno
+    assert "WHERE product_batches.product_id = %(product_id_1)s AND product_batches.stock_quantity >" in sql
+    assert "(SELECT count(*) AS count_1 FROM product_batches WHERE product_batches.product_id =" in sql
+    assert ") = %(param_1)s" in sql
@@ -0,0 +1,70 @@
+import pytest
+
+from backend.app.services.ai import extraction_cache as module
+from backend.app.services.ai.extraction_cache import ExtractionCache
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "extractions.sqlite3")
+
+
+def test_key_ignores_whitespace_and_case_but_not_strategy_or_prompt():
+    key = ExtractionCache.key("LECHE  Gloria\n1 L", "llama", 1)
+    assert key == ExtractionCache.key("leche gloria 1 l ", "llama", 1)
+    assert key != ExtractionCache.key("leche gloria 1 l", "gemini", 1)
+    assert key != ExtractionCache.key("leche gloria 1 l", "llama", 2)
+
+
+def test_hit_returns_a_marked_copy(path):
+    cache = ExtractionCache(path)
+    key = cache.key("leche", "llama", 1)
+    cache.put(key, "llama", {"name": "Leche", "tags": ["a"], "_cached": True}, latency=2.5)
+
+    hit = cache.get(key)
+    assert hit == {"name": "Leche", "tags": ["a"], "_cached": True}
+    hit["tags"].append("b")
+    assert cache.get(key)["tags"] == ["a"]
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 2
+    assert stats["saved_seconds"] == 5.0
+
+
+def test_disk_tier_is_shared_and_promoted_to_memory(path):
+    ExtractionCache(path).put("k", "llama", {"name": "Leche"}, latency=1.0)
+
+    other = ExtractionCache(path)
+    assert other.get("k")["name"] == "Leche"
+    assert other.get("k")["name"] == "Leche"
+    stats = other.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["disk_entries"]) == (1, 1, 1)
+
+
+def test_expired_entries_miss(path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+    cache = ExtractionCache(path, memory_ttl=10, disk_ttl=100)
+    cache.put("k", "llama", {"name": "Leche"}, latency=1.0)
+
+    now[0] += 50    # fuera de memoria, todavía en disco
+    assert cache.get("k") is not None
+    assert cache.stats()["disk_hits"] == 1
+
+    now[0] += 200   # fuera de ambos niveles
+    assert cache.get("k") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_memory_lru_and_disk_cap(path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(module.time, "time", lambda: now[0])
+    cache = ExtractionCache(path, memory_entries=2, disk_max_entries=2)
+    for index in range(3):
+        now[0] += 1
+        cache.put(f"k{index}", "llama", {"name": str(index)}, latency=0.1)
+
+    stats = cache.stats()
+    assert stats["memory_entries"] == 2
+    assert stats["disk_entries"] == 2
+    assert ExtractionCache(path).get("k0") is None
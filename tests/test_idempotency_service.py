@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from backend.app.api import inventory
+from backend.app.services.idempotency_service import IdempotencyService
+
+
+def test_completed_result_is_reused_until_it_expires(monkeypatch):
+    async def scenario():
+        service = IdempotencyService(ttl=10)
+        service.start("h", job_id="job-1")
+        service.finish("h", result={"id": 1})
+        return service
+
+    service = asyncio.run(scenario())
+    entry = service.cached("h")
+    assert entry["result"] == {"id": 1}
+    assert entry["job_id"] == "job-1"
+    assert service.inflight("h") is None
+
+    monkeypatch.setattr("backend.app.services.idempotency_service.time.time", lambda: 1e12)
+    assert service.cached("h") is None
+
+
+def test_oldest_results_are_evicted():
+    async def scenario():
+        service = IdempotencyService(max_entries=2)
+        for key in ("a", "b", "c"):
+            service.start(key)
+            service.finish(key, result={"key": key})
+        return service
+
+    service = asyncio.run(scenario())
+    assert service.cached("a") is None
+    assert service.cached("c")["result"] == {"key": "c"}
+
+
+def test_waiters_get_the_owner_result_or_error():
+    async def scenario():
+        service = IdempotencyService()
+        future = service.start("ok")
+        service.finish("ok", result={"id": 7})
+        assert await future == {"id": 7}
+
+        future = service.start("bad")
+        service.finish("bad", error=ValueError("ocr"))
+        with pytest.raises(ValueError):
+            await future
+        # Los errores no se guardan: el próximo escaneo vuelve a intentar
+        assert service.cached("bad") is None
+
+    asyncio.run(scenario())
+
+
+def test_owner_cancellation_wakes_waiters_with_retry():
+    async def scenario():
+        service = IdempotencyService()
+        future = service.start("h")
+        service.finish("h", error=asyncio.CancelledError())
+        assert await future is IdempotencyService.RETRY
+        assert service.inflight("h") is None
+        assert service.cached("h") is None
+
+    asyncio.run(scenario())
+
+
+class _Images:
+    def discard(self, saved_images):
+        pass
+
+
+def test_waiter_reruns_the_pipeline_when_the_owner_is_cancelled(monkeypatch):
+    """Un cliente que se desconecta no deja sin respuesta a quien esperaba su escaneo"""
+    calls = []
+
+    class _Result:
+        def __init__(self, name):
+            self.name = name
+
+        def model_dump(self):
+            return {"by": self.name}
+
+    async def pipeline(saved_images, db, timings, **kwargs):
+        calls.append(saved_images["front"])
+        if saved_images["front"] == "owner":
+            await asyncio.sleep(10)
+        return _Result(saved_images["front"])
+
+    async def scenario():
+        monkeypatch.setattr(inventory.services, "idempotency_service", IdempotencyService())
+        monkeypatch.setattr(inventory.services, "image_service", _Images())
+        monkeypatch.setattr(inventory, "_run_scan_pipeline", pipeline)
+
+        owner = asyncio.ensure_future(inventory._run_scan_once("h", {"front": "owner"}, None, {}))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(inventory._run_scan_once("h", {"front": "waiter"}, None, {}))
+        await asyncio.sleep(0)
+
+        owner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        return await asyncio.wait_for(waiter, 1)
+
+    assert asyncio.run(scenario()) == {"by": "waiter"}
+    assert calls == ["owner", "waiter"]
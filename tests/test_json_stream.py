@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.app.services.ai.json_stream import IncrementalJSONParser
+from backend.app.services.ai.llama_client import LlamaClient
+
+
+def _feed_chars(parser: IncrementalJSONParser, text: str):
+    completed = []
+    for char in text:
+        completed += parser.feed(char)
+    return completed
+
+
+def test_fields_complete_as_their_value_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('```json\n{"name": "Leche"') == []
+    assert parser.feed(', "size": "1 L",') == ["name", "size"]
+    assert parser.fields == {"name": "Leche", "size": "1 L"}
+    assert not parser.done
+
+    assert parser.feed(' "batch": null}\n```') == ["batch"]
+    assert parser.done
+    assert parser.fields["batch"] is None
+
+
+def test_strings_with_braces_commas_and_escapes():
+    text = '{"name": "Galleta \\"Soda\\", {x}", "brand": "A,B"}'
+    parser = IncrementalJSONParser()
+    assert _feed_chars(parser, text) == ["name", "brand"]
+    assert parser.fields == json.loads(text)
+
+
+def test_nested_values_are_parsed_whole():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"nutritional_info": {"calories": 120, "fat": "3g"}') == []
+    assert parser.feed(', "name": "Leche"') == ["nutritional_info"]
+    assert parser.fields["nutritional_info"] == {"calories": 120, "fat": "3g"}
+    assert not parser.done
+
+
+def test_invalid_value_is_skipped():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"size": 1 L, "brand": "Gloria"}') == ["brand"]
+    assert "size" not in parser.fields
+
+
+# ========================================
+# STREAM DE OLLAMA
+# ========================================
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(LlamaClient, "_check_ollama_server", lambda self: False)
+    return LlamaClient()
+
+
+def _ollama(fragments, final=None):
+    lines = [json.dumps({"response": fragment, "done": False}) for fragment in fragments]
+    if final is not None:
+        lines.append(json.dumps({"response": "", "done": True, **final}))
+    body = "\n".join(lines).encode("utf-8")
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    return httpx.AsyncClient(transport=transport, base_url="http://ollama")
+
+
+FRAGMENTS = ['{"name": "Leche",', ' "brand": "Gloria",', ' "size": "1 L"}', "\n"]
+
+
+def _stream(client, http, stop_fields):
+    async def scenario():
+        async with http:
+            return await client._generate_stream(http, {}, 0.0, None, stop_fields)
+    return asyncio.run(scenario())
+
+
+def test_closed_object_reads_until_done_and_keeps_real_tokens(client):
+    http = _ollama(FRAGMENTS, final={"eval_count": 42, "prompt_eval_count": 300})
+    result, meta = _stream(client, http, [])
+
+    assert result["brand"] == "Gloria"
+    assert meta["eval_count"] == 42
+    assert meta["prompt_eval_count"] == 300
+    assert client.stats()["early_stops"] == 0
+
+
+def test_stop_fields_cut_early_without_inventing_tokens(client):
+    http = _ollama(FRAGMENTS, final={"eval_count": 42})
+    result, meta = _stream(client, http, ["name"])
+
+    assert result["name"] == "Leche"
+    assert result["size"] is None
+    assert "eval_count" not in meta
+    assert client.stats()["early_stops"] == 1
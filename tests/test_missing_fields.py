@@ -0,0 +1,28 @@
+import pytest
+
+from backend.app.services.ai.ai_extractor_service import AIExtractorService
+
+
+@pytest.fixture(scope="module")
+def extractor():
+    return AIExtractorService()
+
+
+def test_fields_found_by_regex_are_not_missing(extractor):
+    text = "LECHE GLORIA ENTERA\n1000 ml\nLOTE A1234\nVENC 12/05/2026\n7751271001234"
+    fields = ["name", "brand", "size", "barcode", "batch", "expiry_date"]
+    assert extractor.missing_fields(text, fields) == []
+
+
+def test_guessed_first_line_name_counts_as_missing(extractor):
+    # El mock toma "Contenido neto" como nombre; no es un nombre encontrado
+    assert extractor._extract_with_mock("Contenido neto\nAceite Primor\n1 L")["name"] == "Contenido neto"
+    assert extractor.missing_fields("Contenido neto\nAceite Primor\n1 L", ["name", "size"]) == ["name"]
+
+
+def test_mock_placeholders_count_as_missing(extractor):
+    assert extractor.missing_fields("GALLETAS DE AGUA\nSODA", ["brand", "size"]) == ["brand", "size"]
+
+
+def test_empty_text_misses_everything(extractor):
+    assert extractor.missing_fields("  ", ["name", "brand"]) == ["name", "brand"]
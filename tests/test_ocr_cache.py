@@ -0,0 +1,93 @@
+import cv2
+import numpy as np
+import pytest
+
+from backend.app.services.ocr.ocr_cache import OCRResultCache
+from backend.app.services.ocr.ocr_service import OCRService
+
+
+def _jpeg(seed: int = 0, noise: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    img = np.full((240, 320), 255, dtype=np.uint8)
+    cv2.putText(img, "LECHE GLORIA", (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 3)
+    cv2.rectangle(img, (20, 150), (200, 220), 80, -1)
+    if noise:
+        img = np.clip(img.astype(int) + rng.integers(-noise, noise + 1, img.shape), 0, 255).astype(np.uint8)
+    return cv2.imencode(".jpg", img)[1].tobytes()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return OCRResultCache(str(tmp_path), max_bytes=1024 * 1024, max_distance=4)
+
+
+def test_near_duplicate_photo_hits(cache):
+    result = {"text": "LECHE GLORIA", "confidence_avg": 0.9}
+    cache.put("front", "grayscale-x", cache.phash(_jpeg()), result)
+
+    hit = cache.get("front", "grayscale-x", cache.phash(_jpeg(seed=1, noise=6)))
+    assert hit["text"] == "LECHE GLORIA"
+    assert hit["cache_hit"] is True
+
+
+def test_view_and_variant_are_part_of_the_key(cache):
+    image_hash = cache.phash(_jpeg())
+    cache.put("front", "grayscale-a", image_hash, {"text": "LECHE"})
+
+    assert cache.get("left", "grayscale-a", image_hash) is None
+    assert cache.get("front", "grayscale-b", image_hash) is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_empty_or_blurry_results_are_not_stored(cache):
+    cache.put("front", "p", 1, {"text": ""})
+    cache.put("front", "p", 2, {"text": "LECHE", "blur_detected": True})
+    assert cache.stats()["entries"] == 0
+
+
+def test_index_survives_restart_and_evicts_lru(tmp_path):
+    cache = OCRResultCache(str(tmp_path), max_bytes=1024 * 1024)
+    cache.put("front", "p", 0xFFFF, {"text": "A"})
+    reopened = OCRResultCache(str(tmp_path), max_bytes=1024 * 1024)
+    assert reopened.get("front", "p", 0xFFFF)["text"] == "A"
+
+    tiny = OCRResultCache(str(tmp_path), max_bytes=1)
+    assert tiny.stats()["entries"] == 0
+
+
+class _CountingService(OCRService):
+    def __init__(self, text: str, **kwargs):
+        super().__init__(None, **kwargs)
+        self.text = text
+        self.calls = 0
+
+    def _extract_uncached(self, img_type, data):
+        self.calls += 1
+        return img_type, {"text": self.text, "confidence_avg": 0.9}
+
+
+def test_side_views_are_not_cached(cache):
+    service = _CountingService("Ingredientes: leche", cache=cache)
+    service.extract_from_buffer("left", _jpeg())
+    service.extract_from_buffer("left", _jpeg())
+    assert service.calls == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_views_with_batch_or_expiry_are_not_cached(cache):
+    service = _CountingService("LECHE GLORIA\nLOTE A1234 VENC 12/05/2026", cache=cache)
+    service.extract_from_buffer("front", _jpeg())
+    service.extract_from_buffer("front", _jpeg())
+    assert service.calls == 2
+
+
+def test_front_view_is_reused_only_with_the_same_config(cache):
+    service = _CountingService("LECHE GLORIA", cache=cache)
+    service.extract_from_buffer("front", _jpeg())
+    service.extract_from_buffer("front", _jpeg())
+    assert service.calls == 1
+
+    other = _CountingService("LECHE GLORIA", cache=cache, coarse_dim=960)
+    assert other.cache_variant("front") != service.cache_variant("front")
+    other.extract_from_buffer("front", _jpeg())
+    assert other.calls == 1
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.app.services.ocr.ocr_executor import OCRBusyError, OCRExecutor
+
+
+def test_admit_rejects_when_queue_is_full():
+    async def scenario():
+        executor = OCRExecutor(max_concurrency=1, max_queue=1, retry_after=7)
+        first = executor.admit()
+        second = executor.admit()
+        with pytest.raises(OCRBusyError) as error:
+            executor.admit()
+        assert error.value.retry_after == 7
+        assert executor.stats()["rejected"] == 1
+
+        # wait=True (workers de trabajos) entra aunque la cola esté llena
+        executor.admit(wait=True).release()
+
+        first.release()
+        second.release()
+        assert executor.has_capacity()
+        executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_views_of_one_scan_share_a_single_admission():
+    async def scenario():
+        executor = OCRExecutor(max_concurrency=1, max_queue=0)
+        slot = executor.admit()
+        results = await asyncio.gather(*(slot.run(lambda v=v: v * 2) for v in range(3)))
+        assert results == [0, 2, 4]
+        assert executor.stats()["running"] == 1
+        # Un segundo escaneo no entra mientras el primero tiene el turno
+        with pytest.raises(OCRBusyError):
+            executor.admit()
+        slot.release()
+        slot.release()  # idempotente
+        assert await executor.run(lambda: "ok") == "ok"
+        executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_release_before_turn_does_not_leak_the_semaphore():
+    async def scenario():
+        executor = OCRExecutor(max_concurrency=1, max_queue=2)
+        gate = threading.Event()
+        running = asyncio.ensure_future(executor.run(gate.wait))
+        await asyncio.sleep(0.05)
+
+        waiting = executor.admit()
+        view = asyncio.ensure_future(waiting.run(lambda: None))
+        await asyncio.sleep(0.05)
+        view.cancel()
+        waiting.release()
+
+        gate.set()
+        await running
+        assert await asyncio.wait_for(executor.run(lambda: "libre"), 1) == "libre"
+        assert executor.stats()["waiting"] == 0
+        executor.shutdown()
+
+    asyncio.run(scenario())